@@ -0,0 +1,54 @@
+# SPDX-FileCopyrightText: Copyright (c) 2023 Pat Satyshur
+#
+# SPDX-License-Identifier: Unlicense
+
+# Measures how long it takes to import the library on Linux (Blinka). Each import is timed in a
+# fresh interpreter, since Python caches modules after the first import.
+#
+# This is meant to be run on a Linux computer, not on a CircuitPython board.
+
+import statistics
+import subprocess
+import sys
+
+RUNS = 10
+
+# The statements to time. The digitalio import is included for reference, that is what the
+# drivers used to import.
+STATEMENTS = (
+    "import i2c_expanders",
+    "from i2c_expanders.PCA9555 import PCA9555",
+    "from i2c_expanders.PCAL9555 import PCAL9555",
+    "from i2c_expanders import Pull",
+    "import digitalio",
+)
+
+TIMER = """
+import time
+start = time.perf_counter()
+{statement}
+print((time.perf_counter() - start) * 1000)
+"""
+
+
+def time_import(statement):
+    """Returns the time in ms to run the statement in a new interpreter."""
+    result = subprocess.run(
+        [sys.executable, "-c", TIMER.format(statement=statement)],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+for stmt in STATEMENTS:
+    try:
+        times = [time_import(stmt) for _ in range(RUNS)]
+    except subprocess.CalledProcessError as err:
+        print(f"{stmt:48s} failed: {err.stderr.strip().splitlines()[-1]}")
+        continue
+    print(
+        f"{stmt:48s} median {statistics.median(times):7.2f} ms, "
+        f"min {min(times):7.2f} ms"
+    )
@@ -0,0 +1,102 @@
+# SPDX-FileCopyrightText: Copyright (c) 2023 Pat Satyshur
+#
+# SPDX-License-Identifier: Unlicense
+
+# Measures the memory used by each expander object and each pin object using tracemalloc.
+# The expanders are created on a simulated I2C bus, so no hardware is needed.
+#
+# This is meant to be run on a Linux computer with Blinka installed, not on a CircuitPython board.
+# CPython objects are larger than CircuitPython objects, so use this to compare changes, not to
+# estimate the memory use on a board.
+
+import tracemalloc
+
+from i2c_expanders.i2c_expander import I2c_Expander
+from i2c_expanders.PCA9554 import PCA9554
+from i2c_expanders.PCA9555 import PCA9555
+from i2c_expanders.PCAL9555 import PCAL9555
+
+EXPANDERS = 16
+
+
+class SimulatedI2C:
+    """A minimal stand in for busio.I2C. Every address responds, and all registers read as
+    zero."""
+
+    def __init__(self):
+        self._locked = False
+
+    def try_lock(self):
+        if self._locked:
+            return False
+        self._locked = True
+        return True
+
+    def unlock(self):
+        self._locked = False
+
+    # pylint: disable=unused-argument
+    def writeto(self, address, buffer, *, start=0, end=None):
+        pass
+
+    def readfrom_into(self, address, buffer, *, start=0, end=None):
+        if end is None:
+            end = len(buffer)
+        for i in range(start, end):
+            buffer[i] = 0
+
+    def writeto_then_readfrom(
+        self,
+        address,
+        buffer_out,
+        buffer_in,
+        *,
+        out_start=0,
+        out_end=None,
+        in_start=0,
+        in_end=None,
+    ):
+        self.readfrom_into(address, buffer_in, start=in_start, end=in_end)
+
+
+def measure(create):
+    """Returns the number of bytes allocated by create(), which is called with a new bus, and the
+    objects it created."""
+    # Run once first, so things like the first import of a module are not counted.
+    create(SimulatedI2C())
+    i2c = SimulatedI2C()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    objects = create(i2c)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    used = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    return used, objects
+
+
+def make_expanders(i2c, cls):
+    """Create the expanders, without touching the registers."""
+    return [cls(i2c, address=0x20 + i % 8, reset=False) for i in range(EXPANDERS)]
+
+
+def make_pins(expanders):
+    """Get every pin of every expander. The result is a flat list of pins, it does not keep the
+    expanders, but the pins do."""
+    return [exp.get_pin(pin) for exp in expanders for pin in range(exp.maxpins + 1)]
+
+
+for cls in (PCA9554, PCA9555, PCAL9555):
+    for shared in (False, True):
+        I2c_Expander.share_buffers = shared
+        I2c_Expander._shared_buffers.clear()  # pylint: disable=protected-access
+
+        expander_bytes, _ = measure(lambda i2c, c=cls: make_expanders(i2c, c))
+        # The pins are cached by the expander, so new expanders are needed to measure them.
+        total_bytes, pin_list = measure(
+            lambda i2c, c=cls: make_pins(make_expanders(i2c, c))
+        )
+        print(
+            f"{cls.__name__:9s} shared buffers: {str(shared):5s} "
+            f"{expander_bytes / EXPANDERS:7.1f} bytes per expander, "
+            f"{(total_bytes - expander_bytes) / len(pin_list):6.1f} bytes per pin"
+        )
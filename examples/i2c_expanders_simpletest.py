@@ -20,7 +20,7 @@ PCAL9555_Address = 0x20
 
 # Initialize the device and get pins
 # Change this if you are not using a PCAL9555
-IOEXP1_dev = PCAL9555.PCAL9555(i2c, address=PCAL9555_Address)
+IOEXP1_dev = PCAL9555(i2c, address=PCAL9555_Address)
 pin0 = IOEXP1_dev.get_pin(0)
 pin1 = IOEXP1_dev.get_pin(1)
 pin2 = IOEXP1_dev.get_pin(2)
@@ -21,7 +21,8 @@ The PCA9554 is a basic 8 pin I2C expander.
 * Pin change interrupts. An interrupt is generated on any pin change for a pin configured
   as an input. The interrupt signal is cleared by a change back to the original value of
   the input pin or a read to the GPIO register.This will have to be detected and tracked in
-  user code. There is no way to tell from the device what pin caused the interrupt.
+  user code. There is no way to tell from the device what pin caused the interrupt. The driver
+  can track this in software, see :meth:`PCA9554.set_int_pin`.
 
 Use this class if you are using a PCA9554 or compatible expander. This class is also used
 as the base class for the PCAL9554 expander.
@@ -49,7 +50,7 @@ Heavily based on the code written by Tony DiCola for the MCP230xx library.
 
 # TODO: Fix these imports.
 from micropython import const
-from i2c_expanders.i2c_expander import I2c_Expander
+from i2c_expanders.i2c_expander import _InterruptTracking
 from i2c_expanders.helpers import _enable_bit, Capability
 
 __version__ = "0.0.0+auto.0"
@@ -64,15 +65,26 @@ _PCA9554_IPOL = const(0x02)  # Polarity inversion register
 _PCA9554_IODIR = const(0x03)  # Configuration (direction) register
 
 
-class PCA9554(I2c_Expander):
+class PCA9554(_InterruptTracking):
     """The class for the PCA9554 expander. Instantiate one of these for each expander on the bus.
     Make sure you get the address right.
     """
 
+    __slots__ = ()
+
+    _maxpins = 7
+    _capability = _enable_bit(0x00, Capability.INVERT_POL)
+    _ports = 1
+    _input_reg = _PCA9554_INPUT
+    _output_reg = _PCA9554_OUTPUT
+    _ipol_reg = _PCA9554_IPOL
+    _iodir_reg = _PCA9554_IODIR
+    _volatile_regs = (_PCA9554_INPUT,)
+    _config_regs = ((_PCA9554_OUTPUT, 1), (_PCA9554_IPOL, 1), (_PCA9554_IODIR, 1))
+    _signature_regs = ((_PCA9554_IODIR, 1, 0xFF), (_PCA9554_IPOL, 1, 0x00))
+
     def __init__(self, i2c, address=_PCA9554_DEFAULT_ADDRESS, reset=True):
         super().__init__(i2c, address)
-        self._maxpins = 7
-        self._capability = _enable_bit(0x00, Capability.INVERT_POL)
         if reset:
             self.reset_to_defaults()
 
@@ -98,11 +110,11 @@ class PCA9554(I2c_Expander):
 
         Register address (write): 0x01
         """
-        return self._read_u8(_PCA9554_INPUT)
+        return self._read_inputs()
 
     @gpio.setter
     def gpio(self, val):
-        self._write_u8(_PCA9554_OUTPUT, val)
+        self._write_port(_PCA9554_OUTPUT, val)
 
     @property
     def ipol(self):
@@ -112,11 +124,11 @@ class PCA9554(I2c_Expander):
 
         Register address: 0x02
         """
-        return self._read_u8(_PCA9554_IPOL)
+        return self._read_port(_PCA9554_IPOL)
 
     @ipol.setter
     def ipol(self, val):
-        self._write_u8(_PCA9554_IPOL, val)
+        self._write_port(_PCA9554_IPOL, val)
 
     @property
     def iodir(self):
@@ -125,8 +137,8 @@ class PCA9554(I2c_Expander):
 
         Register address: 0x03
         """
-        return self._read_u8(_PCA9554_IODIR)
+        return self._read_port(_PCA9554_IODIR)
 
     @iodir.setter
     def iodir(self, val):
-        self._write_u8(_PCA9554_IODIR, val)
+        self._write_port(_PCA9554_IODIR, val)
@@ -20,7 +20,8 @@ The PCA9555 is a basic 16 pin I2C expander.
 * Pin change interrupts. An interrupt is generated on any pin change for a pin configured
   as an input. The interrupt signal is cleared by a change back to the original value of
   the input pin or a read to the GPIO register.This will have to be detected and tracked in
-  user code. There is no way to tell from the device what pin caused the interrupt.
+  user code. There is no way to tell from the device what pin caused the interrupt. The driver
+  can track this in software, see :meth:`PCA9555.set_int_pin`.
 
 Use this class if you are using a PCA9555 or compatible expander. This class is also used
 as the base class for the PCAL9555 expander.
@@ -47,7 +48,7 @@ Heavily based on the code written by Tony DiCola for the MCP230xx library.
 
 from micropython import const
 
-from i2c_expanders.i2c_expander import I2c_Expander
+from i2c_expanders.i2c_expander import _InterruptTracking
 from i2c_expanders.helpers import _enable_bit, Capability
 
 __version__ = "0.0.0+auto.0"
@@ -66,15 +67,26 @@ _PCA9555_IODIR0 = const(0x06)  # Configuration (direction) register 0
 _PCA9555_IODIR1 = const(0x07)  # Configuration (direction) register 1
 
 
-class PCA9555(I2c_Expander):
+class PCA9555(_InterruptTracking):
     """The class for the PCA9555 expander. Instantiate one of these for each expander on the bus.
     Make sure you get the address right.
     """
 
+    __slots__ = ()
+
+    _maxpins = 15
+    _capability = _enable_bit(0x00, Capability.INVERT_POL)
+    _ports = 2
+    _input_reg = _PCA9555_INPUT0
+    _output_reg = _PCA9555_OUTPUT0
+    _ipol_reg = _PCA9555_IPOL0
+    _iodir_reg = _PCA9555_IODIR0
+    _volatile_regs = (_PCA9555_INPUT0,)
+    _config_regs = ((_PCA9555_OUTPUT0, 2), (_PCA9555_IPOL0, 2), (_PCA9555_IODIR0, 2))
+    _signature_regs = ((_PCA9555_IODIR0, 2, 0xFFFF), (_PCA9555_IPOL0, 2, 0x0000))
+
     def __init__(self, i2c, address=_PCA9555_DEFAULT_ADDRESS, reset=True):
         super().__init__(i2c, address)
-        self._maxpins = 15
-        self._capability = _enable_bit(0x00, Capability.INVERT_POL)
         if reset:
             self.reset_to_defaults()
 
@@ -99,11 +111,11 @@ class PCA9555(I2c_Expander):
 
         Register address (write): 0x02, 0x03
         """
-        return self._read_u16le(_PCA9555_INPUT0)
+        return self._read_inputs()
 
     @gpio.setter
     def gpio(self, val):
-        self._write_u16le(_PCA9555_OUTPUT0, val)
+        self._write_port(_PCA9555_OUTPUT0, val)
 
     @property
     def ipol(self):
@@ -113,11 +125,11 @@ class PCA9555(I2c_Expander):
 
         Register address: 0x04, 0x05
         """
-        return self._read_u16le(_PCA9555_IPOL0)
+        return self._read_port(_PCA9555_IPOL0)
 
     @ipol.setter
     def ipol(self, val):
-        self._write_u16le(_PCA9555_IPOL0, val)
+        self._write_port(_PCA9555_IPOL0, val)
 
     @property
     def iodir(self):
@@ -126,8 +138,8 @@ class PCA9555(I2c_Expander):
 
         Register address: 0x06, 0x07
         """
-        return self._read_u16le(_PCA9555_IODIR0)
+        return self._read_port(_PCA9555_IODIR0)
 
     @iodir.setter
     def iodir(self, val):
-        self._write_u16le(_PCA9555_IODIR0, val)
+        self._write_port(_PCA9555_IODIR0, val)
@@ -65,7 +65,6 @@ Heavily based on the code written by Tony DiCola for the MCP230xx library.
 # are still unused.
 # pylint: disable=unused-import
 from micropython import const
-import digitalio
 
 from i2c_expanders.PCAL9554 import PCAL9554
 from i2c_expanders.helpers import Capability, _get_bit, _enable_bit, _clear_bit
@@ -83,15 +82,18 @@ class PCAL9538(PCAL9554):
     Make sure you get the address right.
     """
 
+    __slots__ = ()
+
+    _capability = (
+        _enable_bit(0x00, Capability.PULL_UP)
+        | _enable_bit(0x00, Capability.PULL_DOWN)
+        | _enable_bit(0x00, Capability.INVERT_POL)
+    )
+
     def __init__(self, i2c, address=_PCAL9538_DEFAULT_ADDRESS, reset=True):
         super().__init__(
             i2c, address, False
         )  # This initializes the PCA9554 compatible registers.
-        self._capability = (
-            _enable_bit(0x00, Capability.PULL_UP)
-            | _enable_bit(0x00, Capability.PULL_DOWN)
-            | _enable_bit(0x00, Capability.INVERT_POL)
-        )
 
         if reset:
             self.reset_to_defaults()
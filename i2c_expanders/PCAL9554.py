@@ -64,10 +64,16 @@ Heavily based on the code written by Tony DiCola for the MCP230xx library.
 # are still unused.
 # pylint: disable=unused-import
 from micropython import const
-import digitalio
 
 from i2c_expanders.PCA9554 import PCA9554
-from i2c_expanders.helpers import Capability, _get_bit, _enable_bit, _clear_bit
+from i2c_expanders.helpers import (
+    Capability,
+    DriveMode,
+    Pull,
+    _get_bit,
+    _enable_bit,
+    _clear_bit,
+)
 
 
 __version__ = "0.0.0+auto.0"
@@ -91,15 +97,33 @@ class PCAL9554(PCA9554):
     Make sure you get the address right.
     """
 
+    __slots__ = ()
+
+    _capability = (
+        _enable_bit(0x00, Capability.PULL_UP)
+        | _enable_bit(0x00, Capability.PULL_DOWN)
+        | _enable_bit(0x00, Capability.INVERT_POL)
+    )
+    _pupd_en_reg = _PCAL9554_PUPD_EN
+    _pupd_sel_reg = _PCAL9554_PUPD_SEL
+    _volatile_regs = PCA9554._volatile_regs + (_PCAL9554_IRQ_STATUS,)
+    _config_regs = PCA9554._config_regs + (
+        (_PCAL9554_OUTPUT_DRIVE_1, 2),
+        (_PCAL9554_INPUT_LATCH, 1),
+        (_PCAL9554_PUPD_EN, 1),
+        (_PCAL9554_PUPD_SEL, 1),
+        (_PCAL9554_IRQ_MASK, 1),
+        (_PCAL9554_OUTPUT_PORT_CONFIG, 1),
+    )
+    _signature_regs = (
+        (PCA9554._iodir_reg, 1, 0xFF),
+        (_PCAL9554_IRQ_MASK, 1, 0xFF),
+    )
+
     def __init__(self, i2c, address=_PCAL9554_DEFAULT_ADDRESS, reset=True):
         super().__init__(
             i2c, address, False
         )  # This initializes the PCA9554 compatible registers.
-        self._capability = (
-            _enable_bit(0x00, Capability.PULL_UP)
-            | _enable_bit(0x00, Capability.PULL_DOWN)
-            | _enable_bit(0x00, Capability.INVERT_POL)
-        )
 
         if reset:
             self.reset_to_defaults()
@@ -117,12 +141,13 @@ class PCAL9554(PCA9554):
         if not isinstance(latch, (bool)):
             raise ValueError("latch must be True or False")
 
-        self.irq_mask = _clear_bit(self.irq_mask, pin)
+        with self:
+            self.irq_mask = _clear_bit(self.irq_mask, pin)
 
-        if latch:
-            self.input_latch = _enable_bit(self.input_latch, pin)
-        else:
-            self.input_latch = _clear_bit(self.input_latch, pin)
+            if latch:
+                self.input_latch = _enable_bit(self.input_latch, pin)
+            else:
+                self.input_latch = _clear_bit(self.input_latch, pin)
 
     def clear_int_pin(self, pin):
         """Disable interrupts on a pin.
@@ -131,7 +156,8 @@ class PCAL9554(PCA9554):
         :return:        Nothing.
         """
         self._validate_pin(pin)
-        self.irq_mask = _enable_bit(self.irq_mask, pin)
+        with self:
+            self.irq_mask = _enable_bit(self.irq_mask, pin)
 
     def get_interrupts(self):
         """Returns a list of pins causing an interruptn along with the value of those pins.
@@ -142,10 +168,11 @@ class PCAL9554(PCA9554):
                         interrupts are triggered, this function returns none.
         """
         output = []
-        int_status = self.irq_status
-        pin_values = self.gpio
+        with self:
+            int_status = self.irq_status
+            pin_values = self.gpio
 
-        for i in range(self.maxpins):
+        for i in range(self.maxpins + 1):
             if bool((int_status >> i) & 1):
                 pin_val = bool(((pin_values >> i) & 1))
                 output.append({"pin": i, "value": pin_val})
@@ -161,7 +188,7 @@ class PCAL9554(PCA9554):
         """
         output = []
         reg = self.irq_status
-        for i in range(self.maxpins):
+        for i in range(self.maxpins + 1):
             if ((reg >> i) & 1) == 1:
                 output.append(i)
         return output
@@ -174,7 +201,8 @@ class PCAL9554(PCA9554):
         :return:        Nothing.
         """
         self._validate_pin(pin)
-        self.input_latch = _enable_bit(self.input_latch, pin)
+        with self:
+            self.input_latch = _enable_bit(self.input_latch, pin)
 
     def clear_int_latch(self, pin):
         """Set the interrupt on 'pin' to non-latching operation. Note this does not enable
@@ -184,23 +212,25 @@ class PCAL9554(PCA9554):
         :return:        Nothing.
         """
         self._validate_pin(pin)
-        self.input_latch = _clear_bit(self.input_latch, pin)
+        with self:
+            self.input_latch = _clear_bit(self.input_latch, pin)
 
     def get_pupd(self, pin):
         """Checks the state of a pin to see if pull up/down is enabled.
 
         :param pin:     Pin number to check.
-        :return:        Returns 'digitalio.Pull.UP', 'digitalio.Pull.DOWN' or 'None'
-                        to indicate the state of the pin.
+        :return:        Returns 'Pull.UP', 'Pull.DOWN' or 'None' to indicate the state
+                        of the pin. These are the digitalio constants once digitalio is
+                        imported.
         """
         self._validate_pin(pin)
         # The else statements here are extaneous, but without them, it is harder to tell
         # what the code is doing. Disable pylint for that error here only.
         if _get_bit(self.pupd_en, pin):
             if _get_bit(self.pupd_sel, pin):  # pylint: disable=no-else-return
-                return digitalio.Pull.UP
+                return Pull.UP.public()
             else:
-                return digitalio.Pull.DOWN
+                return Pull.DOWN.public()
         else:
             return None
 
@@ -209,24 +239,29 @@ class PCAL9554(PCA9554):
 
         :param pin:     Pin number to modify.
         :param status:  The new state of the pull up/down resistors. Should be one of
-                        'digitalio.Pull.UP', 'digitalio.Pull.DOWN' or 'None'.
+                        'Pull.UP', 'Pull.DOWN' or 'None'. The digitalio constants
+                        can also be used.
         :return:        Nothing.
         """
         self._validate_pin(pin)
 
         if status is None:
-            self.pupd_en = _clear_bit(self.pupd_en, pin)
+            with self:
+                self.pupd_en = _clear_bit(self.pupd_en, pin)
             return
 
-        self.pupd_en = _enable_bit(self.pupd_en, pin)
-
-        if status == digitalio.Pull.UP:
-            self.pupd_sel = _enable_bit(self.pupd_sel, pin)
-        elif status == digitalio.Pull.DOWN:
-            self.pupd_sel = _clear_bit(self.pupd_sel, pin)
-        else:
+        # Keep the library constants on the left side of the comparisons, see helpers.
+        # pylint: disable-next=consider-using-in
+        if not ((Pull.UP == status) or (Pull.DOWN == status)):
             raise ValueError("Expected UP, DOWN, or None for pull state.")
 
+        with self:
+            if Pull.UP == status:
+                self.pupd_sel = _enable_bit(self.pupd_sel, pin)
+            else:
+                self.pupd_sel = _clear_bit(self.pupd_sel, pin)
+            self.pupd_en = _enable_bit(self.pupd_en, pin)
+
     def set_output_drive(self, pin, drive):
         """Sets the output drive strength of a pin.
 
@@ -244,7 +279,8 @@ class PCAL9554(PCA9554):
         val = drive << loc  # Value to set shifted to the proper location
         mask = ~(3 << loc) & 0xFFFF  # Mask to clear the two bits we need to set.
 
-        self.out_drive = ((self.out_drive) & (mask)) | val
+        with self:
+            self.out_drive = ((self.out_drive) & (mask)) | val
 
     def get_output_drive(self, pin):
         """Reads the drive strength value of the given pin.
@@ -270,10 +306,12 @@ class PCAL9554(PCA9554):
         :return:        Nothing.
         """
 
-        if mode == digitalio.DriveMode.PUSH_PULL:
-            self.out_port_config = _clear_bit(self.out_port_config, 0)
-        elif mode == digitalio.DriveMode.OPEN_DRAIN:
-            self.out_port_config = _enable_bit(self.out_port_config, 0)
+        if DriveMode.PUSH_PULL == mode:
+            with self:
+                self.out_port_config = _clear_bit(self.out_port_config, 0)
+        elif DriveMode.OPEN_DRAIN == mode:
+            with self:
+                self.out_port_config = _enable_bit(self.out_port_config, 0)
         else:
             raise ValueError(
                 "Invalid drive mode. It should be either 'digitalio.DriveMode.PUSH_PULL' "
@@ -283,12 +321,13 @@ class PCAL9554(PCA9554):
     def get_drive_mode(self):
         """Returns the drive mode of the output bank. This is the drive mode of all pins.
 
-        :return:        The drive mode. Either 'digitalio.DriveMode.PUSH_PULL'
-                        or 'digitalio.DriveMode.OPEN_DRAIN'.
+        :return:        The drive mode. Either 'DriveMode.PUSH_PULL' or
+                        'DriveMode.OPEN_DRAIN', the digitalio constants once digitalio is
+                        imported.
         """
         if _get_bit(self.out_port_config, 0) == 0x01:
-            return digitalio.DriveMode.OPEN_DRAIN
-        return digitalio.DriveMode.PUSH_PULL
+            return DriveMode.OPEN_DRAIN.public()
+        return DriveMode.PUSH_PULL.public()
 
     def reset_to_defaults(self):
         """Reset all registers to their default state. This is also
@@ -416,4 +455,4 @@ class PCAL9554(PCA9554):
 
     @out_port_config.setter
     def out_port_config(self, val):
-        self._write_u8((_PCAL9554_OUTPUT_PORT_CONFIG & 0x01), val)
+        self._write_u8(_PCAL9554_OUTPUT_PORT_CONFIG, val & 0x01)
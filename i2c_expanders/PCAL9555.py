@@ -62,10 +62,16 @@ Heavily based on the code written by Tony DiCola for the MCP230xx library.
 """
 
 from micropython import const
-import digitalio
 
 from i2c_expanders.PCA9555 import PCA9555
-from i2c_expanders.helpers import Capability, _get_bit, _enable_bit, _clear_bit
+from i2c_expanders.helpers import (
+    Capability,
+    DriveMode,
+    Pull,
+    _get_bit,
+    _enable_bit,
+    _clear_bit,
+)
 
 __version__ = "0.0.0+auto.0"
 __repo__ = "https://github.com/ilikecake/CircuitPython_I2C_Expanders.git"
@@ -116,14 +122,33 @@ class PCAL9555(PCA9555):
     Make sure you get the address right.
     """
 
+    __slots__ = ()
+
+    _capability = (
+        _enable_bit(0x00, Capability.PULL_UP)
+        | _enable_bit(0x00, Capability.PULL_DOWN)
+        | _enable_bit(0x00, Capability.INVERT_POL)
+    )
+    _pupd_en_reg = _PCAL9555_PUPD_EN_0
+    _pupd_sel_reg = _PCAL9555_PUPD_SEL_0
+    _volatile_regs = PCA9555._volatile_regs + (_PCAL9555_IRQ_STATUS_0,)
+    _config_regs = PCA9555._config_regs + (
+        (_PCAL9555_OUTPUT_DRIVE_0_0, 2),
+        (_PCAL9555_OUTPUT_DRIVE_1_0, 2),
+        (_PCAL9555_INPUT_LATCH_0, 2),
+        (_PCAL9555_PUPD_EN_0, 2),
+        (_PCAL9555_PUPD_SEL_0, 2),
+        (_PCAL9555_IRQ_MASK_0, 2),
+        (_PCAL9555_OUTPUT_PORT_CONFIG, 1),
+    )
+    _signature_regs = (
+        (PCA9555._iodir_reg, 2, 0xFFFF),
+        (_PCAL9555_IRQ_MASK_0, 2, 0xFFFF),
+    )
+
     def __init__(self, i2c, address=_PCAL9555_DEFAULT_ADDRESS, reset=True):
         # Initialize the PCA9555 compatible registers.
         super().__init__(i2c, address, False)
-        self._capability = (
-            _enable_bit(0x00, Capability.PULL_UP)
-            | _enable_bit(0x00, Capability.PULL_DOWN)
-            | _enable_bit(0x00, Capability.INVERT_POL)
-        )
         if reset:
             self.reset_to_defaults()
 
@@ -140,12 +165,13 @@ class PCAL9555(PCA9555):
         if not isinstance(latch, (bool)):
             raise ValueError("latch must be True or False")
 
-        self.irq_mask = _clear_bit(self.irq_mask, pin)
+        with self:
+            self.irq_mask = _clear_bit(self.irq_mask, pin)
 
-        if latch:
-            self.input_latch = _enable_bit(self.input_latch, pin)
-        else:
-            self.input_latch = _clear_bit(self.input_latch, pin)
+            if latch:
+                self.input_latch = _enable_bit(self.input_latch, pin)
+            else:
+                self.input_latch = _clear_bit(self.input_latch, pin)
 
     def clear_int_pin(self, pin):
         """Disable interrupts on a pin.
@@ -154,7 +180,8 @@ class PCAL9555(PCA9555):
         :return:        Nothing.
         """
         self._validate_pin(pin)
-        self.irq_mask = _enable_bit(self.irq_mask, pin)
+        with self:
+            self.irq_mask = _enable_bit(self.irq_mask, pin)
 
     def get_interrupts(self):
         """Returns a list of pins causing an interruptn along with the value of those pins.
@@ -165,10 +192,11 @@ class PCAL9555(PCA9555):
                         interrupts are triggered, this function returns none.
         """
         output = []
-        int_status = self.irq_status
-        pin_values = self.gpio
+        with self:
+            int_status = self.irq_status
+            pin_values = self.gpio
 
-        for i in range(self.maxpins):
+        for i in range(self.maxpins + 1):
             if bool((int_status >> i) & 1):
                 pin_val = bool(((pin_values >> i) & 1))
                 output.append({"pin": i, "value": pin_val})
@@ -184,7 +212,7 @@ class PCAL9555(PCA9555):
         """
         output = []
         reg = self.irq_status
-        for i in range(self.maxpins):
+        for i in range(self.maxpins + 1):
             if ((reg >> i) & 1) == 1:
                 output.append(i)
         return output
@@ -197,7 +225,8 @@ class PCAL9555(PCA9555):
         :return:        Nothing.
         """
         self._validate_pin(pin)
-        self.input_latch = _enable_bit(self.input_latch, pin)
+        with self:
+            self.input_latch = _enable_bit(self.input_latch, pin)
 
     def clear_int_latch(self, pin):
         """Set the interrupt on 'pin' to non-latching operation. Note this does not enable
@@ -207,23 +236,25 @@ class PCAL9555(PCA9555):
         :return:        Nothing.
         """
         self._validate_pin(pin)
-        self.input_latch = _clear_bit(self.input_latch, pin)
+        with self:
+            self.input_latch = _clear_bit(self.input_latch, pin)
 
     def get_pupd(self, pin):
         """Checks the state of a pin to see if pull up/down is enabled.
 
         :param pin:     Pin number to check.
-        :return:        Returns 'digitalio.Pull.UP', 'digitalio.Pull.DOWN' or 'None'
-                        to indicate the state of the pin.
+        :return:        Returns 'Pull.UP', 'Pull.DOWN' or 'None' to indicate the state
+                        of the pin. These are the digitalio constants once digitalio is
+                        imported.
         """
         self._validate_pin(pin)
         # The else statements here are extaneous, but without them, it is harder to tell
         # what the code is doing. Disable pylint for that error here only.
         if _get_bit(self.pupd_en, pin):
             if _get_bit(self.pupd_sel, pin):  # pylint: disable=no-else-return
-                return digitalio.Pull.UP
+                return Pull.UP.public()
             else:
-                return digitalio.Pull.DOWN
+                return Pull.DOWN.public()
         else:
             return None
 
@@ -232,24 +263,29 @@ class PCAL9555(PCA9555):
 
         :param pin:     Pin number to modify.
         :param status:  The new state of the pull up/down resistors. Should be one of
-                        'digitalio.Pull.UP', 'digitalio.Pull.DOWN' or 'None'.
+                        'Pull.UP', 'Pull.DOWN' or 'None'. The digitalio constants
+                        can also be used.
         :return:        Nothing.
         """
         self._validate_pin(pin)
 
         if status is None:
-            self.pupd_en = _clear_bit(self.pupd_en, pin)
+            with self:
+                self.pupd_en = _clear_bit(self.pupd_en, pin)
             return
 
-        self.pupd_en = _enable_bit(self.pupd_en, pin)
-
-        if status == digitalio.Pull.UP:
-            self.pupd_sel = _enable_bit(self.pupd_sel, pin)
-        elif status == digitalio.Pull.DOWN:
-            self.pupd_sel = _clear_bit(self.pupd_sel, pin)
-        else:
+        # Keep the library constants on the left side of the comparisons, see helpers.
+        # pylint: disable-next=consider-using-in
+        if not ((Pull.UP == status) or (Pull.DOWN == status)):
             raise ValueError("Expected UP, DOWN, or None for pull state.")
 
+        with self:
+            if Pull.UP == status:
+                self.pupd_sel = _enable_bit(self.pupd_sel, pin)
+            else:
+                self.pupd_sel = _clear_bit(self.pupd_sel, pin)
+            self.pupd_en = _enable_bit(self.pupd_en, pin)
+
     def set_output_drive(self, pin, drive):
         """Sets the output drive strength of a pin.
 
@@ -274,10 +310,11 @@ class PCAL9555(PCA9555):
         val = drive << loc  # Value to set shifted to the proper location
         mask = ~(3 << loc) & 0xFFFF  # Mask to clear the two bits we need to set.
 
-        if port == 0:
-            self.out0_drive = ((self.out0_drive) & (mask)) | val
-        elif port == 1:
-            self.out1_drive = ((self.out1_drive) & (mask)) | val
+        with self:
+            if port == 0:
+                self.out0_drive = ((self.out0_drive) & (mask)) | val
+            elif port == 1:
+                self.out1_drive = ((self.out1_drive) & (mask)) | val
 
     def get_output_drive(self, pin):
         """Reads the drive strength value of the given pin.
@@ -317,10 +354,12 @@ class PCAL9555(PCA9555):
         if (bank > 1) or (bank < 0):
             raise ValueError("Bank should be either 0 (pins 0-7) or 1 (pins 8-15).")
 
-        if mode == digitalio.DriveMode.PUSH_PULL:
-            self.out_port_config = _clear_bit(self.out_port_config, bank)
-        elif mode == digitalio.DriveMode.OPEN_DRAIN:
-            self.out_port_config = _enable_bit(self.out_port_config, bank)
+        if DriveMode.PUSH_PULL == mode:
+            with self:
+                self.out_port_config = _clear_bit(self.out_port_config, bank)
+        elif DriveMode.OPEN_DRAIN == mode:
+            with self:
+                self.out_port_config = _enable_bit(self.out_port_config, bank)
         else:
             raise ValueError(
                 "Invalid drive mode. It should be either 'digitalio.DriveMode.PUSH_PULL' "
@@ -332,15 +371,16 @@ class PCAL9555(PCA9555):
         1 (pins 8-15) are set to the same mode.
 
         :param bank:    The bank to set. Should be 0 or 1.
-        :return:        The drive mode. Either 'digitalio.DriveMode.PUSH_PULL'
-                        or 'digitalio.DriveMode.OPEN_DRAIN'.
+        :return:        The drive mode. Either 'DriveMode.PUSH_PULL' or
+                        'DriveMode.OPEN_DRAIN', the digitalio constants once digitalio is
+                        imported.
         """
         if (bank > 1) or (bank < 0):
             raise ValueError("Bank should be either 0 (pins 0-7) or 1 (pins 8-15).")
 
         if _get_bit(self.out_port_config, bank) == 0x01:
-            return digitalio.DriveMode.OPEN_DRAIN
-        return digitalio.DriveMode.PUSH_PULL
+            return DriveMode.OPEN_DRAIN.public()
+        return DriveMode.PUSH_PULL.public()
 
     def reset_to_defaults(self):
         """Reset all registers to their default state. This is also
@@ -483,4 +523,4 @@ class PCAL9555(PCA9555):
 
     @out_port_config.setter
     def out_port_config(self, val):
-        self._write_u8((_PCAL9555_OUTPUT_PORT_CONFIG & 0x03), val)
+        self._write_u8(_PCAL9555_OUTPUT_PORT_CONFIG, val & 0x03)
@@ -0,0 +1,139 @@
+# SPDX-FileCopyrightText: 2023 Pat Satyshur
+# SPDX-FileCopyrightText: 2017 Tony DiCola for Adafruit Industries
+# SPDX-FileCopyrightText: 2019 Carter Nelson
+#
+# SPDX-License-Identifier: MIT
+
+# pylint: disable=too-many-public-methods, duplicate-code
+
+"""
+`TCA6424`
+====================================================
+
+CircuitPython module for the TCA6424 and compatible expanders.
+The TCA6424 is a basic 24 pin I2C expander. The register layout is the same as the PCA9555, but
+with three banks per register instead of two.
+
+* Configurable pins as input or output
+* Per pin polarity inversion. This inverts the value that is returned when an input port
+  is read. Does not affect the pins set as outputs.
+* Pin change interrupts. An interrupt is generated on any pin change for a pin configured
+  as an input. The interrupt signal is cleared by a change back to the original value of
+  the input pin or a read to the GPIO register. This will have to be detected and tracked in
+  user code. There is no way to tell from the device what pin caused the interrupt.
+
+Unlike the 8 and 16 pin devices, this device only increments the register address on multi-byte
+transfers if the auto-increment bit is set in the command byte. This is handled by the driver, all
+three banks of a register are read or written in a single transaction.
+
+Required library files (.py or their .mpy equivalent):
+
+* TCA6424.py
+* i2c_expander.py
+* digital_inout.py
+* helpers.py
+
+Compatible Devices
+
+* TCA6424
+
+Make sure you check the i2c address and default register state. The address is 0x22 with the ADDR
+pin low, and 0x23 with the ADDR pin high.
+
+* Author(s): Pat Satyshur
+"""
+
+from micropython import const
+
+from i2c_expanders.i2c_expander import I2c_Expander
+from i2c_expanders.helpers import _enable_bit, Capability
+
+__version__ = "0.0.0+auto.0"
+__repo__ = "https://github.com/ilikecake/CircuitPython_I2C_Expanders.git"
+
+# This is the default address for the TCA6424 with the addr pin grounded.
+_TCA6424_DEFAULT_ADDRESS = const(0x22)
+
+_TCA6424_INPUT0 = const(0x00)  # Input registers 0-2
+_TCA6424_OUTPUT0 = const(0x04)  # Output registers 0-2
+_TCA6424_IPOL0 = const(0x08)  # Polarity inversion registers 0-2
+_TCA6424_IODIR0 = const(0x0C)  # Configuration (direction) registers 0-2
+
+
+class TCA6424(I2c_Expander):
+    """The class for the TCA6424 expander. Instantiate one of these for each expander on the bus.
+    Make sure you get the address right.
+    """
+
+    __slots__ = ()
+
+    _maxpins = 23
+    _capability = _enable_bit(0x00, Capability.INVERT_POL)
+    _ports = 3
+    _auto_increment = 0x80
+    _input_reg = _TCA6424_INPUT0
+    _output_reg = _TCA6424_OUTPUT0
+    _ipol_reg = _TCA6424_IPOL0
+    _iodir_reg = _TCA6424_IODIR0
+    _volatile_regs = (_TCA6424_INPUT0,)
+    _config_regs = ((_TCA6424_OUTPUT0, 3), (_TCA6424_IPOL0, 3), (_TCA6424_IODIR0, 3))
+    _signature_regs = ((_TCA6424_IODIR0, 3, 0xFFFFFF), (_TCA6424_IPOL0, 3, 0x000000))
+
+    def __init__(self, i2c, address=_TCA6424_DEFAULT_ADDRESS, reset=True):
+        super().__init__(i2c, address)
+        if reset:
+            self.reset_to_defaults()
+
+    def reset_to_defaults(self):
+        """Reset all registers to their default state. This is also
+        done with a power cycle, but it can be called by software here.
+
+        :return:        Nothing.
+        """
+        self.gpio = 0xFFFFFF
+        self.ipol = 0x000000
+        self.iodir = 0xFFFFFF
+
+    @property
+    def gpio(self):
+        """The raw GPIO port registers.  Each bit represents the value of the associated pin
+        (0 = low, 1 = high). Read this register to get the value of all pins. Write to this
+        register to set the value of any pins configured as outputs.
+        Read and written as a 24 bit number.
+
+        Register address (read):  0x00, 0x01, 0x02
+
+        Register address (write): 0x04, 0x05, 0x06
+        """
+        return self._read_port(_TCA6424_INPUT0)
+
+    @gpio.setter
+    def gpio(self, val):
+        self._write_port(_TCA6424_OUTPUT0, val)
+
+    @property
+    def ipol(self):
+        """The raw 'polarity inversion' register. Each bit represents the polarity value of the
+        associated pin (0 = normal, 1 = inverted). This only applies to pins configured as inputs.
+        Read and written as a 24 bit number.
+
+        Register address: 0x08, 0x09, 0x0A
+        """
+        return self._read_port(_TCA6424_IPOL0)
+
+    @ipol.setter
+    def ipol(self, val):
+        self._write_port(_TCA6424_IPOL0, val)
+
+    @property
+    def iodir(self):
+        """The raw pin configuration register. Each bit represents direction of a pin, either 1
+        for an input or 0 for an output. Read and written as a 24 bit number.
+
+        Register address: 0x0C, 0x0D, 0x0E
+        """
+        return self._read_port(_TCA6424_IODIR0)
+
+    @iodir.setter
+    def iodir(self, val):
+        self._write_port(_TCA6424_IODIR0, val)
@@ -0,0 +1,61 @@
+# SPDX-FileCopyrightText: 2023 Pat Satyshur
+#
+# SPDX-License-Identifier: MIT
+
+"""
+`i2c_expanders`
+====================================================
+
+Drivers for various I2C GPIO expanders.
+
+The driver classes and the digitalio style constants can be imported directly from the package:
+
+.. code-block:: python
+
+    from i2c_expanders import PCAL9555, Pull
+
+Nothing is imported until it is used, and then only the module that it comes from. Importing one
+driver does not load the others.
+
+The drivers are in modules with the same names as their classes, so importing a driver from the
+package gives its module. The driver modules can be used in place of the class: calling one
+creates the driver, and isinstance and subclassing work. Everything else in the module works the
+same as it always has (``i2c_expanders.PCAL9555.PCAL9555``,
+``from i2c_expanders.PCAL9555 import PCAL9555``). On CircuitPython, use the module path.
+
+* Author(s): Pat Satyshur
+"""
+
+__version__ = "0.0.0+auto.0"
+__repo__ = "https://github.com/ilikecake/CircuitPython_I2C_Expanders.git"
+
+# Names that can be imported from the package, and the module they are in.
+_EXPORTS = {
+    "PCA9554": "PCA9554",
+    "PCA9555": "PCA9555",
+    "PCAL9538": "PCAL9538",
+    "PCAL9554": "PCAL9554",
+    "PCAL9555": "PCAL9555",
+    "TCA6424": "TCA6424",
+    "DigitalInOut": "digital_inout",
+    "Direction": "helpers",
+    "Pull": "helpers",
+    "DriveMode": "helpers",
+}
+
+
+def __getattr__(name):
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module = __import__(__name__ + "." + module_name, None, None, [name])
+    if module_name == name:
+        # A driver. Importing the module put it in the package already.
+        return module
+    value = getattr(module, name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
@@ -0,0 +1,249 @@
+# SPDX-FileCopyrightText: 2023 Pat Satyshur
+#
+# SPDX-License-Identifier: MIT
+
+"""
+`bus_worker`
+====================================================
+
+A worker thread that owns an I2C bus and does all of the register operations for the expanders on
+it. Operations are queued with a priority and run one at a time, highest priority first. Each call
+returns a future that is completed when the operation has run.
+
+Without this, a thread that does a lot of bus traffic (polling inputs, dumping registers) holds up
+other threads that need to change an output, since they all wait on the same bus lock in whatever
+order they get it. With the worker, an urgent write only waits for the one operation that is
+running when it is queued.
+
+Operations are only interleaved between queued calls, so break long jobs up into many small
+calls. For example, queue one read per register instead of one call that reads all of them.
+
+This is meant for Linux (Blinka). CircuitPython does not have threads.
+
+.. code-block:: python
+
+    from i2c_expanders.bus_worker import BusWorker
+
+    worker = BusWorker()
+    inputs = worker.read_port(expander, 0x00)      # Polled at the default priority
+    worker.write_port(expander, 0x02, 0x00FF)      # Runs first, if inputs has not started
+    print(inputs.result())
+    worker.close()
+
+All operations on the expanders on the bus should go through the worker, or the expanders should
+use :meth:`~i2c_expanders.i2c_expander.I2c_Expander.enable_locking`.
+
+* Author(s): Pat Satyshur
+"""
+
+import itertools
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+__version__ = "0.0.0+auto.0"
+__repo__ = "https://github.com/ilikecake/CircuitPython_I2C_Expanders.git"
+
+
+class WorkerStats:  # pylint: disable=too-few-public-methods
+    """Counters for a :class:`BusWorker`. The lists have one entry per priority level.
+
+    * completed: Number of operations that have run (including ones that raised an error).
+    * max_wait_ns: The longest time an operation waited in the queue before it started, in
+      nanoseconds.
+    * total_wait_ns: Total time operations waited in the queue, in nanoseconds.
+    """
+
+    __slots__ = ("completed", "max_wait_ns", "total_wait_ns")
+
+    def __init__(self, levels):
+        self.completed = [0] * levels
+        self.max_wait_ns = [0] * levels
+        self.total_wait_ns = [0] * levels
+
+    def reset(self):
+        """Set all of the counters back to zero.
+
+        :return:        Nothing.
+        """
+        levels = len(self.completed)
+        self.completed = [0] * levels
+        self.max_wait_ns = [0] * levels
+        self.total_wait_ns = [0] * levels
+
+
+class BusWorker:
+    """Runs expander operations from a priority queue in a worker thread.
+
+    :param name:    The name of the worker thread.
+    :param start:   Start the worker thread now. If False, call :meth:`start` later.
+    """
+
+    # Priority levels. Lower numbers run first. Any integer from URGENT to BACKGROUND can be used.
+    URGENT = 0
+    NORMAL = 1
+    POLL = 2
+    BACKGROUND = 3
+
+    # Sorts after everything else, so close() runs the queued operations first.
+    _STOP = BACKGROUND + 1
+
+    def __init__(self, name="i2c-bus-worker", start=True):
+        self._queue = queue.PriorityQueue()
+        # Keeps operations with the same priority in the order they were submitted.
+        self._sequence = itertools.count()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        # Guards _closed, so nothing is queued after the stop marker.
+        self._close_lock = threading.Lock()
+        self._closed = False
+        self.stats = WorkerStats(self._STOP)
+        if start:
+            self.start()
+
+    def start(self):
+        """Start the worker thread.
+
+        :return:        Nothing.
+        """
+        with self._close_lock:
+            if self._closed:
+                raise RuntimeError("The bus worker is closed.")
+            self._thread.start()
+
+    def close(self, wait=True):
+        """Stop the worker thread once the operations already queued have run. No new operations
+        can be submitted after this. If the worker thread was never started, the queued
+        operations fail with a RuntimeError instead.
+
+        :param wait:    Wait for the worker thread to finish.
+        :return:        Nothing.
+        """
+        with self._close_lock:
+            if not self._closed:
+                self._closed = True
+                self._queue.put(
+                    (self._STOP, next(self._sequence), 0, None, None, None, None)
+                )
+            started = self._thread.ident is not None
+        if not started:
+            self._fail_queued()
+        elif wait and self._thread.is_alive():
+            self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+    def submit(self, func, *args, priority=NORMAL, **kwargs):
+        """Queue a call to func(*args, **kwargs) on the worker thread.
+
+        :param func:        The function to call. It is run on the worker thread.
+        :param priority:    The priority of the call, URGENT to BACKGROUND. Lower runs first.
+        :return:            A concurrent.futures.Future with the result of the call.
+        """
+        if not self.URGENT <= priority <= self.BACKGROUND:
+            raise ValueError(
+                f"Invalid priority {priority}. Should be {self.URGENT}-{self.BACKGROUND}."
+            )
+        future = Future()
+        with self._close_lock:
+            if self._closed:
+                raise RuntimeError("The bus worker is closed.")
+            self._queue.put(
+                (
+                    priority,
+                    next(self._sequence),
+                    time.monotonic_ns(),
+                    future,
+                    func,
+                    args,
+                    kwargs,
+                )
+            )
+        return future
+
+    # pylint: disable=protected-access
+    def read_port(self, expander, register, width=None, *, priority=POLL):
+        """Queue a read of a register of an expander. See :meth:`submit`.
+
+        :param expander:    The expander to read from.
+        :param register:    The (first) register to read.
+        :param width:       The number of 8-bit registers to read. Defaults to the number of
+                            ports on the expander.
+        :param priority:    The priority of the read. Defaults to POLL.
+        :return:            A future with the value read, as an integer.
+        """
+        return self.submit(expander._read_port, register, width, priority=priority)
+
+    def write_port(self, expander, register, value, width=None, *, priority=URGENT):
+        """Queue a write of a register of an expander. See :meth:`submit`.
+
+        :param expander:    The expander to write to.
+        :param register:    The (first) register to write.
+        :param value:       The value to write.
+        :param width:       The number of 8-bit registers to write. Defaults to the number of
+                            ports on the expander.
+        :param priority:    The priority of the write. Defaults to URGENT.
+        :return:            A future with the result None.
+        """
+        return self.submit(
+            expander._write_port, register, value, width, priority=priority
+        )
+
+    # pylint: disable-next=too-many-arguments
+    def update_port(
+        self, expander, register, mask, bits, width=None, *, priority=URGENT
+    ):
+        """Queue a change of some of the bits of a register of an expander. The bits set in mask
+        are set to the value of the matching bits in 'bits'. See :meth:`submit`.
+
+        :param expander:    The expander to write to.
+        :param register:    The (first) register to change.
+        :param mask:        The bits to change.
+        :param bits:        The new value of the bits.
+        :param width:       The number of 8-bit registers. Defaults to the number of ports on the
+                            expander.
+        :param priority:    The priority of the change. Defaults to URGENT.
+        :return:            A future with the result None.
+        """
+        return self.submit(
+            expander._update_port, register, mask, bits, width, priority=priority
+        )
+
+    # pylint: enable=protected-access
+
+    def _run(self):
+        stats = self.stats
+        while True:
+            priority, _, queued, future, func, args, kwargs = self._queue.get()
+            if priority == self._STOP:
+                self._fail_queued()
+                return
+            if not future.set_running_or_notify_cancel():
+                continue
+            wait = time.monotonic_ns() - queued
+            stats.total_wait_ns[priority] += wait
+            if wait > stats.max_wait_ns[priority]:
+                stats.max_wait_ns[priority] = wait
+            try:
+                result = func(*args, **kwargs)
+            except BaseException as err:  # pylint: disable=broad-exception-caught
+                future.set_exception(err)
+            else:
+                future.set_result(result)
+            stats.completed[priority] += 1
+
+    def _fail_queued(self):
+        # Fail the futures of operations that will never run. Nothing can be queued once the
+        # worker is closed, so this empties the queue for good.
+        while True:
+            try:
+                priority, _, _, future, _, _, _ = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if priority != self._STOP and future.set_running_or_notify_cancel():
+                future.set_exception(RuntimeError("The bus worker is closed."))
@@ -15,17 +15,25 @@ Heavily based on the version written by Tony DiCola for the MCP230xx library.
 * Author(s): Pat Satyshur
 """
 
-import digitalio
-from i2c_expanders.helpers import Capability, _get_bit, _enable_bit, _clear_bit
+from i2c_expanders.helpers import Capability, Direction, Pull
 
 __version__ = "0.0.0+auto.0"
 __repo__ = "https://github.com/ilikecake/CircuitPython_I2C_Expanders.git"
 
+# Capability bit masks, computed once so the properties below only need a single AND.
+_PULL_UP = 1 << Capability.PULL_UP
+_PULL_DOWN = 1 << Capability.PULL_DOWN
+_INVERT_POL = 1 << Capability.INVERT_POL
+
+# The pins work directly with the register helpers of the expander they belong to.
+# pylint: disable=protected-access
+
 
 class DigitalInOut:
     """The interface is exactly the same as the digitalio.DigitalInOut
     class. However Some devices do not support pull up/down resistors
-    or setting the pin to open drain.
+    or setting the pin to open drain. The direction and pull values can be either
+    the digitalio constants, or the matching constants from :mod:`i2c_expanders.helpers`.
 
     :param pin_number: The pin number. Starts at zero.
     :type pin_number: int
@@ -34,11 +42,21 @@ class DigitalInOut:
     :type ioexpander_class: gpio class object
 
     Exceptions will be thrown when attempting to set unsupported configurations.
+
+    Use :meth:`I2c_Expander.get_pin` to get instances of this class. The expander caches the pin
+    objects, so there is only ever one instance per pin.
     """
 
+    # Expanders with a lot of pins will have a lot of these objects. Using slots avoids a dict per
+    # object on CPython/Blinka.
+    __slots__ = ("_pin", "_mask", "_ioexp", "_cap")
+
     def __init__(self, pin_number, ioexpander_class):
         self._pin = pin_number
+        self._mask = 1 << pin_number
         self._ioexp = ioexpander_class
+        # The capability of the expander does not change, so look it up once here.
+        self._cap = ioexpander_class.capability
 
     # TODO: Not sure if this is still true. Can't we just use the same arguments as the 'real'
     # DigitalInout class expects, and then not use the ones we don't need? Leaving it along for now.
@@ -51,19 +69,53 @@ class DigitalInOut:
     def switch_to_output(self, value=False, **kwargs):
         """Switch the pin state to a digital output with the provided starting
         value (True/False for high or low, default is False/low).
+
+        The output latch is written before the direction, so the pin never drives a stale
+        value. Registers that already have the requested value are not written, and the
+        bus is only locked once for the whole operation.
         """
-        self.direction = digitalio.Direction.OUTPUT
-        self.value = value
+        ioexp = self._ioexp
+        with ioexp:
+            ioexp._update_port(
+                ioexp._output_reg, self._mask, self._mask if value else 0
+            )
+            ioexp._update_port(ioexp._iodir_reg, self._mask, 0)
 
     def switch_to_input(self, pull=None, invert_polarity=False, **kwargs):
         """Switch the pin state to a digital input with the provided starting
         pull up/down resistor state (optional, none by default) and input polarity.
         Attempting to set a pull up/down resistor here for an expander that does not
         support it will throw an error.
+
+        The pull up/down resistors and polarity are set before the direction, so the pin
+        does not float while it is changed to an input. Registers that already have the
+        requested value are not written, and the bus is only locked once for the whole
+        operation.
         """
-        self.direction = digitalio.Direction.INPUT
-        self.pull = pull
-        self.invert_polarity = invert_polarity
+        # Check everything before touching the device, so an unsupported request does not leave
+        # the pin half configured.
+        set_pull = self._check_pull(pull)
+        if invert_polarity and (not self._cap & _INVERT_POL):
+            raise ValueError("Polarity inversion not supported.")
+
+        ioexp = self._ioexp
+        mask = self._mask
+        with ioexp:
+            if set_pull:
+                if pull is None:
+                    ioexp._update_port(ioexp._pupd_en_reg, mask, 0)
+                else:
+                    ioexp._update_port(
+                        ioexp._pupd_sel_reg,
+                        mask,
+                        mask if Pull.UP == pull else 0,
+                    )
+                    ioexp._update_port(ioexp._pupd_en_reg, mask, mask)
+            if self._cap & _INVERT_POL:
+                ioexp._update_port(
+                    ioexp._ipol_reg, mask, mask if invert_polarity else 0
+                )
+            ioexp._update_port(ioexp._iodir_reg, mask, mask)
 
     # pylint: enable=unused-argument
 
@@ -73,30 +125,32 @@ class DigitalInOut:
         low.  Note you must configure as an output or input appropriately
         before reading and writing this value.
         """
-        return _get_bit(self._ioexp.gpio, self._pin)
+        return (self._ioexp.gpio & self._mask) != 0
 
     @value.setter
     def value(self, val):
-        if val:
-            self._ioexp.gpio = _enable_bit(self._ioexp.gpio, self._pin)
-        else:
-            self._ioexp.gpio = _clear_bit(self._ioexp.gpio, self._pin)
+        # Modify the output register rather than writing back what was read from the input
+        # register. The input register does not necessarily match what the other outputs are
+        # set to (e.g. an open drain output held low by something else).
+        ioexp = self._ioexp
+        ioexp._update_port(ioexp._output_reg, self._mask, self._mask if val else 0)
 
     @property
     def direction(self):
         """The direction of the pin, either True for an input or
         False for an output.
         """
-        if _get_bit(self._ioexp.iodir, self._pin):
-            return digitalio.Direction.INPUT
-        return digitalio.Direction.OUTPUT
+        if self._ioexp.iodir & self._mask:
+            return Direction.INPUT.public()
+        return Direction.OUTPUT.public()
 
     @direction.setter
     def direction(self, val):
-        if val == digitalio.Direction.INPUT:
-            self._ioexp.iodir = _enable_bit(self._ioexp.iodir, self._pin)
-        elif val == digitalio.Direction.OUTPUT:
-            self._ioexp.iodir = _clear_bit(self._ioexp.iodir, self._pin)
+        ioexp = self._ioexp
+        if Direction.INPUT == val:
+            ioexp._update_port(ioexp._iodir_reg, self._mask, self._mask)
+        elif Direction.OUTPUT == val:
+            ioexp._update_port(ioexp._iodir_reg, self._mask, 0)
         else:
             raise ValueError(
                 "Expected 'digitalio.Direction.INPUT' or 'digitalio.Direction.OUTPUT'."
@@ -107,58 +161,55 @@ class DigitalInOut:
         """Returns the setup of internal pull up/down resistors. If pull up/down resistors
         are not supported, this function will raise an error.
         """
-        if (not _get_bit(self._ioexp.capability, Capability.PULL_DOWN)) and (
-            not _get_bit(self._ioexp.capability, Capability.PULL_UP)
-        ):
+        if not self._cap & (_PULL_UP | _PULL_DOWN):
             raise ValueError("Pull up/down resistors are not supported.")
 
         return self._ioexp.get_pupd(self._pin)
 
     @pull.setter
     def pull(self, val):
+        if self._check_pull(val):
+            self._ioexp.set_pupd(self._pin, val)
+
+    def _check_pull(self, val):
+        # Make sure the requested pull state is supported. Returns True if the pull up/down
+        # registers need to be set, False if there is nothing to do.
+
         # User requests pull up, pull up resistors are not supported.
-        if (val == digitalio.Pull.UP) and (
-            not _get_bit(self._ioexp.capability, Capability.PULL_UP)
-        ):
+        if (Pull.UP == val) and (not self._cap & _PULL_UP):
             raise ValueError("Pull-up resistors are not supported.")
 
         # User requests pull down, pull down resistors are not supported.
-        if (val == digitalio.Pull.DOWN) and (
-            not _get_bit(self._ioexp.capability, Capability.PULL_DOWN)
-        ):
+        if (Pull.DOWN == val) and (not self._cap & _PULL_DOWN):
             raise ValueError("Pull-down resistors are not supported.")
 
+        if not ((val is None) or (Pull.UP == val) or (Pull.DOWN == val)):
+            raise ValueError("Expected UP, DOWN, or None for pull state.")
+
         # User requests no pull up/down. Pull up/down is not supported. There is nothing to do
         # in this case, but we have to catch it here or it will cause an error when the function
         # tries to set non-exsistent registers for no pull up/down.
-        if (
-            (val is None)
-            and (not _get_bit(self._ioexp.capability, Capability.PULL_DOWN))
-            and (not _get_bit(self._ioexp.capability, Capability.PULL_UP))
-        ):
-            return
-
-        self._ioexp.set_pupd(self._pin, val)
+        if not self._cap & (_PULL_UP | _PULL_DOWN):
+            return False
+        return True
 
     # TODO: Check capability on these
     @property
     def invert_polarity(self):
         """The polarity of the pin, either True for an Inverted or False for an normal."""
-        if not _get_bit(self._ioexp.capability, Capability.INVERT_POL):
+        if not self._cap & _INVERT_POL:
             raise ValueError("Polarity inversion not supported.")
 
-        if _get_bit(self._ioexp.ipol, self._pin):
+        if self._ioexp.ipol & self._mask:
             return True
         return False
 
     @invert_polarity.setter
     def invert_polarity(self, val):
-        if not _get_bit(self._ioexp.capability, Capability.INVERT_POL):
+        if not self._cap & _INVERT_POL:
             raise ValueError("Polarity inversion not supported.")
-        if val:
-            self._ioexp.ipol = _enable_bit(self._ioexp.ipol, self._pin)
-        else:
-            self._ioexp.ipol = _clear_bit(self._ioexp.ipol, self._pin)
+        ioexp = self._ioexp
+        ioexp._update_port(ioexp._ipol_reg, self._mask, self._mask if val else 0)
 
     # TODO: Not implemented. The expanders I am using do not support this.
     @property
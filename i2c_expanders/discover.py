@@ -0,0 +1,238 @@
+# SPDX-FileCopyrightText: 2023 Pat Satyshur
+#
+# SPDX-License-Identifier: MIT
+
+"""
+`discover`
+====================================================
+
+Finds the expanders on an I2C bus and creates the right driver for each one.
+
+.. code-block:: python
+
+    import board
+    from i2c_expanders.discover import discover
+
+    expanders = discover(board.I2C(), cache="/expanders.json")
+    for address, expander in expanders.items():
+        print(hex(address), type(expander).__name__)
+
+The addresses used by the supported devices are scanned, and each device found is identified by
+the registers it has. The devices do not acknowledge a register address they do not have, so:
+
+* A device with the extended registers at 0x40 and up is one of the PCAL parts.
+* A device with register 0x0C is a TCA6424.
+* Otherwise a device with register 0x04 has 16 pins (PCA9555), and one without has 8 pins
+  (PCA9554, PCA9538).
+
+The PCAL parts with 8 pins are told apart by the address: 0x70 to 0x73 is a PCAL9538, the
+others are PCAL9554. The PCA9538 has the same registers as the PCA9554, so the PCA9554 driver is
+used for it.
+
+Probing only reads registers, but it does write a register address to each device that answers
+at these addresses. Other devices at the same addresses can be affected by this. For example a
+TCA9548 I2C multiplexer at 0x70 takes the register address as its channel selection. Pass
+addresses to only probe the addresses that have expanders.
+
+If a cache file is given, the result is saved in it, keyed by the name of the bus. The next time,
+the bus is not scanned. Only the devices in the file are probed, to make sure they are still
+there and are the same type. If one is not, the whole bus is scanned again. If the file can not
+be written (for example the CIRCUITPY drive is read only to the board), the result is not cached.
+
+If the bus is in use, discovery waits for it for up to a second, then raises RuntimeError.
+
+* Author(s): Pat Satyshur
+"""
+
+import json
+import time
+
+__version__ = "0.0.0+auto.0"
+__repo__ = "https://github.com/ilikecake/CircuitPython_I2C_Expanders.git"
+
+# The addresses the supported devices can have. 0x38-0x3F are the 'A' versions of the PCA9554.
+ADDRESSES = (
+    tuple(range(0x20, 0x28)) + tuple(range(0x38, 0x40)) + (0x70, 0x71, 0x72, 0x73)
+)
+
+# Registers used to tell the devices apart.
+_INPUT_REG = 0x00  # Input register 0, on all of the devices.
+_EXTENDED_REG = 0x4F  # Output port configuration, only on the PCAL parts.
+_TCA6424_REG = 0x0C  # Configuration register 0, only on the TCA6424.
+_WIDE_REG = 0x04  # Polarity inversion register 0, only on the 16 pin parts.
+
+# The longest time to wait for the bus, in seconds.
+_LOCK_TIMEOUT = 1.0
+
+# Names given to the buses that do not have one, keyed by the id of the bus object. The first bus
+# is "i2c", the next ones "i2c-2", "i2c-3" and so on, so buses do not share an entry in the
+# cache file.
+_bus_names = {}
+
+
+def fingerprint(i2c, address):
+    """Find out which device is at an address. The bus must not be locked.
+
+    :param i2c:     The I2C bus.
+    :param address: The address of the device.
+    :return:        The name of the driver class for the device, or None if no device answers
+                    at the address.
+    """
+    _lock(i2c)
+    try:
+        return _fingerprint(i2c, address)
+    finally:
+        i2c.unlock()
+
+
+def discover(i2c, *, cache=None, bus=None, addresses=ADDRESSES, reset=True):
+    """Find the expanders on a bus, and create a driver for each one.
+
+    :param i2c:         The I2C bus. A busio.I2C, or a bus from the transport module.
+    :param cache:       Optional. The path of a file to save the result in, and to load it from
+                        next time.
+    :param bus:         The name of the bus in the cache file. For a
+                        :class:`~i2c_expanders.transport.LinuxI2CBus`, the path of the bus is
+                        used if this is not given. Other buses are named in the order they are
+                        first used, "i2c" for the first one, then "i2c-2" and so on. Give the
+                        buses names if they are not always discovered in the same order.
+    :param addresses:   The addresses to look for expanders at.
+    :param reset:       Passed to the drivers. Set the registers of the devices to their
+                        defaults.
+    :return:            The drivers, as a dict of {address: expander}.
+    """
+    if bus is None:
+        bus = _bus_name(i2c)
+    saved = {}
+    if cache is not None:
+        saved = _load(cache)
+        found = saved.get(bus)
+        if isinstance(found, dict) and _check(i2c, found):
+            try:
+                return _create(i2c, found, reset)
+            except (OSError, ValueError):
+                # Something changed on the bus, look again. I2CDevice raises ValueError if
+                # there is no device at the address.
+                pass
+
+    found = {}
+    _lock(i2c)
+    try:
+        for address in i2c.scan():
+            if address in addresses:
+                name = _fingerprint(i2c, address)
+                if name is not None:
+                    found[f"0x{address:02X}"] = name
+    finally:
+        i2c.unlock()
+
+    if cache is not None:
+        saved[bus] = found
+        _save(cache, saved)
+    return _create(i2c, found, reset)
+
+
+def _fingerprint(i2c, address):  # pylint: disable=too-many-return-statements
+    # Identify the device at an address. The bus must be locked.
+    if not _probe(i2c, address, _INPUT_REG):
+        return None
+    wide = _probe(i2c, address, _WIDE_REG)
+    if _probe(i2c, address, _EXTENDED_REG):
+        if wide:
+            return "PCAL9555"
+        if 0x70 <= address <= 0x73:
+            return "PCAL9538"
+        return "PCAL9554"
+    if _probe(i2c, address, _TCA6424_REG):
+        return "TCA6424"
+    if wide:
+        return "PCA9555"
+    return "PCA9554"
+
+
+def _check(i2c, found):
+    # Check that the devices from the cache are still on the bus, and are the same type.
+    _lock(i2c)
+    try:
+        for address, name in found.items():
+            if _fingerprint(i2c, int(address, 16)) != name:
+                return False
+    except (TypeError, ValueError):
+        # A broken entry in the cache file.
+        return False
+    finally:
+        i2c.unlock()
+    return True
+
+
+def _bus_name(i2c):
+    # The name of a bus in the cache file, if one is not given.
+    path = getattr(i2c, "path", None)
+    if path is not None:
+        return path
+    name = _bus_names.get(id(i2c))
+    if name is None:
+        name = f"i2c-{len(_bus_names) + 1}" if _bus_names else "i2c"
+        _bus_names[id(i2c)] = name
+    return name
+
+
+def _probe(i2c, address, register):
+    # Read a register, to see if the device has it.
+    buffer = bytearray(1)
+    buffer[0] = register
+    try:
+        i2c.writeto_then_readfrom(address, buffer, buffer)
+    except OSError:
+        return False
+    return True
+
+
+def _create(i2c, found, reset):
+    # Create the drivers for the devices found.
+    expanders = {}
+    for address, name in found.items():
+        module = __import__("i2c_expanders." + name, None, None, (name,))
+        address = int(address, 16)
+        expanders[address] = getattr(module, name)(i2c, address, reset)
+    return expanders
+
+
+def _load(path):
+    # Read the cache file. A missing or broken file is the same as an empty one.
+    try:
+        with open(path, "r") as file:  # pylint: disable=unspecified-encoding
+            saved = json.load(file)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(saved, dict):
+        return {}
+    return saved
+
+
+def _save(path, saved):
+    try:
+        with open(path, "w") as file:  # pylint: disable=unspecified-encoding
+            json.dump(saved, file)
+    except OSError:
+        # The filesystem is read only.
+        pass
+
+
+def _lock(i2c):
+    # Lock the bus, waiting for it if it is in use. Raises RuntimeError if it stays locked, for
+    # example because the code calling discover has it locked.
+    lock = getattr(i2c, "lock", None)
+    if lock is not None:
+        # The buses from the transport module can wait for the lock.
+        if lock(_LOCK_TIMEOUT):
+            return
+    else:
+        deadline = time.monotonic() + _LOCK_TIMEOUT
+        while not i2c.try_lock():
+            if time.monotonic() > deadline:
+                break
+            time.sleep(0.001)
+        else:
+            return
+    raise RuntimeError("Timed out waiting for the I2C bus.")
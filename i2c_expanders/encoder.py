@@ -0,0 +1,164 @@
+# SPDX-FileCopyrightText: 2023 Pat Satyshur
+#
+# SPDX-License-Identifier: MIT
+
+"""
+`encoder`
+====================================================
+
+Decodes quadrature rotary encoders connected to the pins of an expander. All of the encoders on
+an expander are decoded from one read of the inputs, using a lookup table of the state
+transitions.
+
+The inputs must be read faster than the encoders change, or steps are missed. A transition that
+skips a state (both pins changed between reads) can not be decoded, it is counted in
+:attr:`Encoders.missed` instead. To catch fast turns:
+
+* Pass the gpio register to :meth:`Encoders.update` from a faster poller, like
+  :class:`~i2c_expanders.poller.MultiBusPoller`.
+* Use the interrupt output of the expander, so the inputs are only read when something changed.
+* On the PCAL parts, set latch=True. The inputs then hold the first change until they are read,
+  so a pulse shorter than the time between reads is not lost.
+
+.. code-block:: python
+
+    from i2c_expanders.encoder import Encoders
+
+    encoders = Encoders(expander, ((0, 1), (2, 3)))
+    while True:
+        if encoders.update():
+            print(encoders.position(0), encoders.position(1))
+
+* Author(s): Pat Satyshur
+"""
+
+from i2c_expanders.helpers import _get_bit, Capability, Pull
+
+__version__ = "0.0.0+auto.0"
+__repo__ = "https://github.com/ilikecake/CircuitPython_I2C_Expanders.git"
+
+# The change in count for each transition, indexed by (old state << 2) | new state, where the
+# state is (A << 1) | B. 2 marks a transition that skipped a state, the direction is not known.
+_TRANSITIONS = (0, -1, 1, 2, 1, 0, 2, -1, -1, 2, 0, 1, 2, 1, -1, 0)
+
+
+class Encoders:  # pylint: disable=too-many-instance-attributes
+    """Quadrature decoders for encoders connected to an expander.
+
+    :param expander:    The expander the encoders are connected to.
+    :param pins:        The pin numbers of the A and B pins of each encoder on the expander, as
+                        ((a, b), (a, b), ...). The first pair is encoder 0.
+    :param divisor:     The number of transitions per counted step, the same as
+                        rotaryio.IncrementalEncoder. Most encoders with detents need 4. The
+                        position only changes once the encoder has moved a whole step from the
+                        last position, in either direction, so bouncing back and forth at a
+                        detent does not change it.
+    :param pull:        Turn on the pull up resistors, if the expander has them.
+    :param latch:       Latch the encoder inputs and turn on their interrupts (PCAL parts only).
+    :param interrupt:   Optional. A digitalio.DigitalInOut for the board pin connected to the
+                        interrupt output of the expander. The inputs are only read when the
+                        interrupt is active.
+    """
+
+    # pylint: disable-next=too-many-arguments
+    def __init__(
+        self, expander, pins, *, divisor=4, pull=True, latch=False, interrupt=None
+    ):
+        self._expander = expander
+        self._pins = tuple((pin_a, pin_b) for pin_a, pin_b in pins)
+        self._divisor = divisor
+        self._interrupt = interrupt
+        count = len(self._pins)
+        self._positions = [0] * count
+        # The transitions since the last change of position, from -divisor to divisor.
+        self._counts = [0] * count
+        self._states = [0] * count
+
+        #: The number of transitions that skipped a state and could not be decoded, for each
+        #: encoder.
+        self.missed = [0] * count
+        #: The total number of transitions decoded, for all of the encoders.
+        self.transitions = 0
+
+        self._mask = 0
+        for pin_a, pin_b in self._pins:
+            self._mask |= (1 << pin_a) | (1 << pin_b)
+
+        pull_dir = None
+        if pull and _get_bit(expander.capability, Capability.PULL_UP):
+            pull_dir = Pull.UP
+        with expander:
+            for pin_a, pin_b in self._pins:
+                expander.get_pin(pin_a).switch_to_input(pull=pull_dir)
+                expander.get_pin(pin_b).switch_to_input(pull=pull_dir)
+            if (latch or interrupt is not None) and hasattr(expander, "set_int_pin"):
+                for pin_a, pin_b in self._pins:
+                    expander.set_int_pin(pin_a, latch=latch)
+                    expander.set_int_pin(pin_b, latch=latch)
+            gpio = expander.gpio
+        self._last = gpio & self._mask
+        for i, (pin_a, pin_b) in enumerate(self._pins):
+            self._states[i] = (((gpio >> pin_a) & 1) << 1) | ((gpio >> pin_b) & 1)
+
+    @property
+    def count(self):
+        """The number of encoders. Read only."""
+        return len(self._pins)
+
+    def position(self, encoder):
+        """The position of an encoder, in steps.
+
+        :param encoder: The encoder number.
+        :return:        The position.
+        """
+        return self._positions[encoder]
+
+    def set_position(self, encoder, position):
+        """Set the position of an encoder.
+
+        :param encoder:     The encoder number.
+        :param position:    The new position, in steps.
+        :return:            Nothing.
+        """
+        self._positions[encoder] = position
+        self._counts[encoder] = 0
+
+    def update(self, gpio=None):
+        """Read the inputs and decode the encoders.
+
+        :param gpio:    Optional. The value of the gpio register of the expander, if it has
+                        already been read. The encoders are decoded from this value without
+                        using the bus.
+        :return:        True if any position changed.
+        """
+        if gpio is None:
+            if self._interrupt is not None and self._interrupt.value:
+                return False
+            gpio = self._expander.gpio
+        if (gpio & self._mask) == self._last:
+            return False
+        self._last = gpio & self._mask
+
+        moved = False
+        for i, (pin_a, pin_b) in enumerate(self._pins):
+            new = (((gpio >> pin_a) & 1) << 1) | ((gpio >> pin_b) & 1)
+            old = self._states[i]
+            if new == old:
+                continue
+            self._states[i] = new
+            delta = _TRANSITIONS[(old << 2) | new]
+            if delta == 2:
+                self.missed[i] += 1
+                continue
+            self.transitions += 1
+            counts = self._counts[i] + delta
+            if counts >= self._divisor:
+                self._positions[i] += 1
+                counts -= self._divisor
+                moved = True
+            elif counts <= -self._divisor:
+                self._positions[i] -= 1
+                counts += self._divisor
+                moved = True
+            self._counts[i] = counts
+        return moved
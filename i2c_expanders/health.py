@@ -0,0 +1,209 @@
+# SPDX-FileCopyrightText: 2023 Pat Satyshur
+#
+# SPDX-License-Identifier: MIT
+
+"""
+`health`
+====================================================
+
+Watches an expander for resets, and puts its configuration back when one happens. If the power
+to an expander dips (a brown out), it goes back to its power-on defaults without telling anyone:
+the outputs turn into inputs, the pull resistors change, and so on.
+
+The monitor keeps a copy of the configuration registers of the expander (see
+:meth:`~i2c_expanders.i2c_expander.I2c_Expander.enable_shadow`). Each check reads a couple of
+registers (the signature, for example the direction and interrupt mask registers on the PCAL
+parts) and compares them with the copy. If they do not match, all of the configuration
+registers are read, and only the ones that changed are written back.
+
+A signature that matches the power-on values of the device is counted as a reset. Anything else
+is counted as tampering (something else wrote to the expander).
+
+.. code-block:: python
+
+    from i2c_expanders.health import HealthMonitor
+
+    monitor = HealthMonitor(expander, interval=0.5)
+    while True:
+        if monitor.update():
+            print("Recovered in", monitor.recovery_ns, "ns")
+
+A reset can only be seen if the signature registers are not at their power-on values. Set
+full=True to check all of the configuration registers on every check instead. This takes more
+bus time, but catches any change.
+
+* Author(s): Pat Satyshur
+"""
+
+import time
+
+__version__ = "0.0.0+auto.0"
+__repo__ = "https://github.com/ilikecake/CircuitPython_I2C_Expanders.git"
+
+
+class HealthMonitor:  # pylint: disable=too-many-instance-attributes
+    """Checks an expander for resets, and restores its configuration.
+
+    :param expander:    The expander to watch. Shadowing is turned on if it is not already.
+    :param interval:    The time in seconds between checks done by :meth:`update`.
+    :param full:        Check all of the configuration registers instead of the signature.
+    :param callback:    Optional. Called with the monitor after the configuration has been
+                        restored.
+    """
+
+    def __init__(self, expander, *, interval=1.0, full=False, callback=None):
+        if expander.shadow is None:
+            expander.enable_shadow()
+        self._expander = expander
+        self._interval_ns = int(interval * 1000000000)
+        self._full = full
+        self._callback = callback
+        self._next_check = time.monotonic_ns()
+        self._last_good = self._next_check
+        self._thread = None
+        self._running = False
+
+        #: The number of checks done.
+        self.checks = 0
+        #: The number of times the signature was back at the power-on values.
+        self.resets = 0
+        #: The number of times the configuration had changed, but not to the power-on values.
+        self.tampers = 0
+        #: The number of times the configuration was restored.
+        self.recoveries = 0
+        #: The number of register writes used to restore the configuration.
+        self.writes = 0
+        #: The registers written by the last restore, as a list of register addresses.
+        self.restored = []
+        #: The time from finding the problem to the configuration being restored, for the last
+        #: recovery, in nanoseconds.
+        self.recovery_ns = 0
+        #: The time from the last good check to the configuration being restored, for the last
+        #: recovery, in nanoseconds. The expander was wrong for up to this long.
+        self.outage_ns = 0
+        #: The longest outage_ns seen.
+        self.max_outage_ns = 0
+
+    def update(self):
+        """Check the expander if the interval has passed since the last check. Call this from
+        the main loop.
+
+        :return:        True if the configuration was restored.
+        """
+        now = time.monotonic_ns()
+        if now < self._next_check:
+            return False
+        self._next_check = now + self._interval_ns
+        return self.check()
+
+    def check(self):
+        """Check the expander now, and restore the configuration if it has changed.
+
+        :return:        True if the configuration was restored.
+        """
+        expander = self._expander
+        shadow = expander.shadow
+        # pylint: disable=protected-access
+        with expander:
+            # Queued writes are part of the configuration the driver expects.
+            expander.flush()
+            start = time.monotonic_ns()
+            self.checks += 1
+            signature = [
+                expander._bus_read_port(register, width)
+                for register, width, _ in expander._signature_regs
+            ]
+            if self._full:
+                changed = self._changed()
+                healthy = not changed
+            else:
+                healthy = all(
+                    value == _known(shadow, register, width)
+                    for value, (register, width, _) in zip(
+                        signature, expander._signature_regs
+                    )
+                )
+                changed = None if healthy else self._changed()
+            if healthy:
+                self._last_good = start
+                return False
+
+            if all(
+                value == default
+                for value, (_, _, default) in zip(signature, expander._signature_regs)
+            ):
+                self.resets += 1
+            else:
+                self.tampers += 1
+
+            # The direction goes last. Pins that are outputs then drive the restored output
+            # values and pulls from the start, not the power-on ones.
+            changed.sort(key=lambda item: item[0] == expander._iodir_reg)
+            self.restored = []
+            for register, width, value in changed:
+                expander._bus_write_port(register, value, width)
+                self.restored.append(register)
+            self.writes += len(changed)
+            expander.invalidate_reads()
+
+        end = time.monotonic_ns()
+        self.recoveries += 1
+        self.recovery_ns = end - start
+        self.outage_ns = end - self._last_good
+        self.max_outage_ns = max(self.max_outage_ns, self.outage_ns)
+        self._last_good = end
+        if self._callback is not None:
+            self._callback(self)
+        return True
+
+    def start(self):
+        """Check the expander from a background thread until :meth:`stop` is called. Linux
+        only.
+
+        :return:        Nothing.
+        """
+        import threading  # pylint: disable=import-outside-toplevel
+
+        if self._thread is not None:
+            raise RuntimeError("The monitor is already running.")
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background thread.
+
+        :return:        Nothing.
+        """
+        if self._thread is not None:
+            self._running = False
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while self._running:
+            self.update()
+            time.sleep(min(self._interval_ns / 1000000000, 0.1))
+
+    def _changed(self):
+        # Read all of the configuration registers, and list the ones that are not what the
+        # driver wrote, as (register, width, value to write).
+        expander = self._expander
+        shadow = expander.shadow
+        changed = []
+        # pylint: disable-next=protected-access
+        for register, width in expander._config_regs:
+            # pylint: disable-next=protected-access
+            value = expander._bus_read_port(register, width)
+            known = _known(shadow, register, width)
+            if value != known:
+                changed.append((register, width, known))
+        return changed
+
+
+def _known(shadow, register, width):
+    # The value of a register from the shadow.
+    value = 0
+    for i in range(width - 1, -1, -1):
+        value = (value << 8) | shadow[register + i]
+    return value
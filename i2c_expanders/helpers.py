@@ -9,9 +9,15 @@
 Helper functions that are used by the various other classes.
 These are a bunch of helper functions that are collected here to avoid circular import references.
 
+This also has the Direction, Pull and DriveMode constants used by the drivers. These work the same
+as the ones in digitalio, and can be mixed with them. They are defined here so the drivers do not
+need to import digitalio, which is slow to import under Blinka.
+
 * Author(s): Pat Satyshur
 """
 
+import sys
+
 
 # TODO: Look at this later, it does not look right.
 class Capability:  # pylint: disable=too-few-public-methods
@@ -29,6 +35,132 @@ class Capability:  # pylint: disable=too-few-public-methods
 Capability = Capability()
 
 
+class _Constant:
+    """A named constant that can be used in place of the matching digitalio constant. It compares
+    equal to the digitalio constant with the same name (e.g. 'Pull.UP' and 'digitalio.Pull.UP'),
+    without having to import digitalio. Not all ports try the reflected comparison for the
+    digitalio objects, so the drivers return :meth:`public`, which is the digitalio constant once
+    digitalio has been imported. Comparisons then work with either constant on the left side.
+    """
+
+    __slots__ = ("_name", "_alias")
+
+    def __init__(self, name):
+        self._name = name
+        # The matching digitalio object, remembered after the first comparison so later
+        # comparisons are an identity check.
+        self._alias = None
+
+    def __repr__(self):
+        return self._name
+
+    def public(self):
+        """The matching digitalio constant if digitalio has been imported, otherwise this
+        constant. digitalio is not imported here, code that compares with the digitalio constants
+        has already imported it.
+
+        :return:        The constant to hand to user code.
+        """
+        alias = self._alias
+        if alias is not None:
+            return alias
+        digitalio = sys.modules.get("digitalio")
+        if digitalio is None:
+            return self
+        group, name = self._name.split(".")
+        alias = getattr(getattr(digitalio, group, None), name, None)
+        if alias is None:
+            return self
+        self._alias = alias
+        return alias
+
+    def __eq__(self, other):
+        if other is None:
+            return False
+        if other is self or other is self._alias:
+            return True
+        if isinstance(other, _Constant):
+            return False
+        name = repr(other)
+        if name == self._name or name.endswith("." + self._name):
+            self._alias = other
+            return True
+        return False
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        return hash(self._name)
+
+
+class Direction:  # pylint: disable=too-few-public-methods
+    """Pin direction. Interchangeable with 'digitalio.Direction'."""
+
+    INPUT = _Constant("Direction.INPUT")
+    OUTPUT = _Constant("Direction.OUTPUT")
+
+
+class Pull:  # pylint: disable=too-few-public-methods, invalid-name
+    """Pull up/down resistor state. Interchangeable with 'digitalio.Pull'."""
+
+    UP = _Constant("Pull.UP")
+    DOWN = _Constant("Pull.DOWN")
+
+
+class DriveMode:  # pylint: disable=too-few-public-methods
+    """Output drive mode. Interchangeable with 'digitalio.DriveMode'."""
+
+    PUSH_PULL = _Constant("DriveMode.PUSH_PULL")
+    OPEN_DRAIN = _Constant("DriveMode.OPEN_DRAIN")
+
+
+class _Debouncer:
+    """Debounces a group of keys or inputs, one bit per key. A key changes state once it has read
+    the same for all of the last few samples. Used by the matrix and keys modules.
+
+    :param samples: The number of samples in a row a key must read the same to change state.
+    """
+
+    __slots__ = ("state", "_history", "_index")
+
+    def __init__(self, samples):
+        #: The debounced state, one bit per key.
+        self.state = 0
+        self._history = [0] * samples
+        self._index = 0
+
+    @property
+    def idle(self):
+        """True if no key is pressed and none of the samples in the history had a key pressed."""
+        return not (self.state or any(self._history))
+
+    def reset(self):
+        """Forget the history, and set all of the keys to released."""
+        self.state = 0
+        self._history = [0] * len(self._history)
+        self._index = 0
+
+    def update(self, raw):
+        """Add a sample and update the debounced state.
+
+        :param raw:     The raw state of the keys, one bit per key.
+        :return:        The bits of the keys that changed state.
+        """
+        history = self._history
+        history[self._index] = raw
+        self._index = (self._index + 1) % len(history)
+        all_pressed = raw
+        any_pressed = raw
+        for sample in history:
+            all_pressed &= sample
+            any_pressed |= sample
+        state = (self.state & any_pressed) | all_pressed
+        changed = state ^ self.state
+        self.state = state
+        return changed
+
+
 # Internal helpers to simplify setting and getting a bit inside an integer.
 def _get_bit(val, bit):
     return val & (1 << bit) > 0
@@ -16,27 +16,253 @@ Based heavily on the code from Red_M for the MCP230xx library.
 * Author(s): Pat Satyshur
 """
 
+import sys
+import time
+
 from adafruit_bus_device import i2c_device
+
+try:
+    from _thread import get_ident as _get_ident
+except ImportError:
+    # No threads (CircuitPython). Everything runs in the same thread.
+    def _get_ident():
+        return 0
+
+
 from i2c_expanders.digital_inout import DigitalInOut
 
 __version__ = "0.0.0+auto.0"
 __repo__ = "https://github.com/ilikecake/CircuitPython_I2C_Expanders.git"
 
 
+class LockStats:  # pylint: disable=too-few-public-methods
+    """Counters for the thread lock of an expander. See :meth:`I2c_Expander.enable_locking`.
+
+    * acquisitions: Number of times the lock was taken (nested holds are not counted).
+    * contentions: Number of times the lock was held by another thread and had to be waited for.
+    * wait_time_ns: Total time spent waiting for the lock, in nanoseconds.
+    """
+
+    __slots__ = ("acquisitions", "contentions", "wait_time_ns")
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Set all of the counters back to zero.
+
+        :return:        Nothing.
+        """
+        self.acquisitions = 0
+        self.contentions = 0
+        self.wait_time_ns = 0
+
+
+class WriteQueue:  # pylint: disable=too-few-public-methods
+    """The queued writes and counters of an expander with write combining enabled. See
+    :meth:`I2c_Expander.enable_write_combining`.
+
+    * requested: Number of register writes asked for by the driver.
+    * issued: Number of register writes sent to the device. requested - issued is the number of
+      writes saved by combining them.
+    * flushes: Number of times the queue was sent.
+    * max_latency_ns: The longest time a write is held, in nanoseconds. None for no limit.
+    """
+
+    __slots__ = ("entries", "since", "max_latency_ns", "requested", "issued", "flushes")
+
+    def __init__(self):
+        # Queued writes as [register, width, mask, bits], in the order they are sent. A list is
+        # used instead of a dict to keep the order on MicroPython.
+        self.entries = []
+        # When the oldest queued write was queued, from time.monotonic_ns.
+        self.since = 0
+        self.max_latency_ns = None
+        self.reset()
+
+    def reset(self):
+        """Set all of the counters back to zero.
+
+        :return:        Nothing.
+        """
+        self.requested = 0
+        self.issued = 0
+        self.flushes = 0
+
+
+class ReadCache:  # pylint: disable=too-few-public-methods
+    """The cached reads and counters of an expander with read caching enabled. See
+    :meth:`I2c_Expander.enable_read_cache`.
+
+    * hits: Number of reads answered from the cache.
+    * misses: Number of reads that went to the device.
+    * ttl_ns: How long a read is kept, in nanoseconds.
+    """
+
+    __slots__ = ("entries", "ttl_ns", "hits", "misses")
+
+    def __init__(self):
+        # Cached reads as (register, width, value, time read), with the time from
+        # time.monotonic_ns. Replaced as a whole tuple, so a reader never sees a half update.
+        self.entries = []
+        self.ttl_ns = 0
+        self.reset()
+
+    def reset(self):
+        """Set all of the counters back to zero.
+
+        :return:        Nothing.
+        """
+        self.hits = 0
+        self.misses = 0
+
+
+class _DriverModule(type(sys)):
+    """The type of the driver modules, which have the same name as the driver class in them.
+    Importing a driver from the package (``from i2c_expanders import PCA9555``) gives the module,
+    since that is what Python puts in the package. With this, the module can be used in place of
+    the class: calling it creates the driver, and isinstance, issubclass and subclassing work.
+    Everything in the module is still there (``i2c_expanders.PCA9555.PCA9555``).
+    """
+
+    def _driver(self):
+        # pylint: disable=no-member
+        return getattr(self, self.__name__.rpartition(".")[2])
+
+    def __call__(self, *args, **kwargs):
+        return self._driver()(*args, **kwargs)
+
+    def __instancecheck__(self, instance):
+        return isinstance(instance, self._driver())
+
+    def __subclasscheck__(self, subclass):
+        return issubclass(subclass, self._driver())
+
+    def __mro_entries__(self, bases):  # pylint: disable=unused-argument
+        return (self._driver(),)
+
+
 # pylint: disable=too-few-public-methods
 class I2c_Expander:
     """Base class for I2C GPIO expander devices. This class has basic read and write functions that
     are common to all i2c expanders. This class should never be used directly.
     """
 
+    # Many expanders can be created on boards with a lot of IO. Using slots avoids a dict per
+    # object on CPython/Blinka. Subclasses should also define __slots__ (an empty tuple if they
+    # have no attributes of their own), otherwise they get a dict anyway.
+    __slots__ = (
+        "_device",
+        "_buffer",
+        "_pins",
+        "_bus",
+        "_hold_count",
+        "_owner",
+        "_lock",
+        "_lock_stats",
+        "_queue",
+        "_read_cache",
+        "_shadow",
+    )
+
+    #: Set this to True before creating the expanders to have all of the expanders on the same I2C
+    #: bus share one scratch buffer, instead of each expander allocating its own. The buffer is
+    #: only used while the bus is locked (inside 'with self'), so expanders on the same bus never
+    #: use it at the same time, even from different threads. Saves a bit of memory on boards with
+    #: a lot of expanders.
+    share_buffers = False
+
+    # Scratch buffers shared between expanders on the same bus, keyed by the bus object. Only
+    # used if share_buffers is set.
+    _shared_buffers = {}
+
+    # Number of pins (starting at 0), capability and number of 8-bit banks (ports) in the
+    # expander. Registers like the input, output, polarity and direction registers are one byte
+    # per bank. These are the same for all devices of a type, so they are class attributes. They
+    # should be set in the upper level class.
+    _maxpins = 0
+    _capability = 0x00
+    _ports = 1
+
+    # Bit that must be set in the command byte to make the device auto-increment the register
+    # address on multi-byte transfers. Most of the smaller expanders do this automatically and
+    # leave this at zero. Devices with more than two banks (e.g. TCA6424) set this.
+    _auto_increment = 0x00
+
+    # Addresses of the first bank of the registers used by digital_inout. These should be set in
+    # the upper level class. Registers the device does not have are left as None.
+    _input_reg = None
+    _output_reg = None
+    _ipol_reg = None
+    _iodir_reg = None
+    _pupd_en_reg = None
+    _pupd_sel_reg = None
+
+    # Registers that the device changes by itself, like the input registers. Only reads of these
+    # are cached by enable_read_cache. These should be set in the upper level class.
+    _volatile_regs = ()
+
+    # Registers that hold the configuration of the device, as (register, width) in the width the
+    # driver uses for them. These are kept by enable_shadow. Registers that are read and checked
+    # to see if the device has been reset, as (register, width, power-on value). These should be
+    # set in the upper level class.
+    _config_regs = ()
+    _signature_regs = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        module = sys.modules.get(cls.__module__)
+        if (
+            module is not None
+            and cls.__module__.rpartition(".")[2] == cls.__name__
+            and type(module) is type(sys)  # pylint: disable=unidiomatic-typecheck
+        ):
+            try:
+                module.__class__ = _DriverModule
+            except (AttributeError, TypeError):
+                # Changing the module class is not supported on CircuitPython.
+                pass
+
     def __init__(self, bus_device, address):
-        self._device = i2c_device.I2CDevice(bus_device, address)
-        # Initialize capabiltiy and max pins to zero. These should be set in the upper level class.
-        self._maxpins = 0
-        self._capability = 0x00
+        # Buses from the transport module (or anything else with a device method) make the
+        # device object themselves. Otherwise this is a busio.I2C object.
+        device = getattr(bus_device, "device", None)
+        if device is not None:
+            self._device = device(address)
+        else:
+            self._device = i2c_device.I2CDevice(bus_device, address)
         # This used to be a global to save memory. However, I don't think the tradeoff of saving 3
-        # bytes per expander instance is worth the wierdness of using a global for this.
-        self._buffer = bytearray(3)
+        # bytes per expander instance is worth the wierdness of using a global for this, unless
+        # there are a lot of expanders. See share_buffers.
+        # The buffer holds the command byte plus the widest register on the device. The output
+        # drive strength registers use two bits per pin, so they are twice the width of a port.
+        size = 1 + 2 * self._ports
+        if self.share_buffers:
+            buffer = self._shared_buffers.get(bus_device)
+            if buffer is None or len(buffer) < size:
+                # Expanders already on the bus keep using the old buffer, it is big enough for
+                # them.
+                buffer = bytearray(size)
+                self._shared_buffers[bus_device] = buffer
+            self._buffer = buffer
+        else:
+            self._buffer = bytearray(size)
+        # Pin objects handed out by get_pin. Created on first use.
+        self._pins = None
+        # The locked bus device while the expander is held with 'with', how many times it has
+        # been entered, and the thread that holds it.
+        self._bus = None
+        self._hold_count = 0
+        self._owner = None
+        # Optional thread lock, see enable_locking.
+        self._lock = None
+        self._lock_stats = None
+        # Optional write queue, see enable_write_combining.
+        self._queue = None
+        # Optional cache of the volatile registers, see enable_read_cache.
+        self._read_cache = None
+        # Optional copy of the configuration registers, see enable_shadow.
+        self._shadow = None
 
     @property
     def maxpins(self):
@@ -70,51 +296,484 @@ class I2c_Expander:
         # Read only
         pass
 
+    def __enter__(self):
+        """Hold the I2C bus for this expander. All register operations done while the expander
+        is held use the same lock acquisition. This can be nested, the bus is released when
+        the outermost block exits. For example:
+
+        .. code-block:: python
+
+            with expander:
+                expander.gpio = 0x00FF
+                expander.iodir = 0xFF00
+
+        The hold belongs to the thread that took it. Another thread using the expander waits
+        for the bus until the hold is released, so single register operations are safe from
+        several threads. Changes to one pin are read-modify-writes of a register, call
+        :meth:`enable_locking` first so threads changing different pins of the same expander do
+        not overwrite each other's changes.
+        """
+        lock = self._lock
+        if lock is not None:
+            if not lock.acquire(False):
+                start = time.monotonic_ns()
+                lock.acquire()
+                self._lock_stats.wait_time_ns += time.monotonic_ns() - start
+                self._lock_stats.contentions += 1
+            if self._hold_count == 0:
+                self._lock_stats.acquisitions += 1
+        ident = _get_ident()
+        if self._hold_count and self._owner == ident:
+            # Nested hold by the thread that already has the bus.
+            self._hold_count += 1
+            return self
+        # Another thread may be holding the expander, locking the bus waits for it to finish.
+        try:
+            bus = self._device.__enter__()
+        except BaseException:
+            if lock is not None:
+                lock.release()
+            raise
+        self._bus = bus
+        self._owner = ident
+        self._hold_count = 1
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._hold_count -= 1
+        if self._hold_count == 0:
+            self._bus = None
+            self._owner = None
+            self._device.__exit__(exc_type, exc_val, exc_tb)
+        if self._lock is not None:
+            self._lock.release()
+        return False
+
+    def enable_locking(self, lock=None):
+        """Make the expander safe to use from multiple threads. Every register access and
+        read-modify-write (e.g. setting the value of one pin) is done while holding a per-expander
+        lock, so threads changing different pins of the same expander do not overwrite each
+        other's changes. Threads using different expanders do not block each other, except for
+        the time they need the bus.
+
+        This is meant for Linux. CircuitPython does not have threads, and does not need this.
+
+        :param lock:    The lock to use. It must be reentrant, like threading.RLock. If not
+                        given, a new threading.RLock is created.
+        :return:        Nothing.
+        """
+        if lock is None:
+            import threading  # pylint: disable=import-outside-toplevel
+
+            lock = threading.RLock()
+        self._lock_stats = LockStats()
+        self._lock = lock
+
+    @property
+    def lock_stats(self):
+        """The :class:`LockStats` counters for the thread lock, or None if locking is not
+        enabled. Read only.
+        """
+        return self._lock_stats
+
+    def enable_write_combining(self, max_latency=0.005):
+        """Queue register writes instead of sending them right away. Queued writes to the same
+        register are combined into one, with the last write to each bit winning. Changing several
+        pins of an expander one after another then only takes one bus write per register, at the
+        cost of a short delay.
+
+        The queued writes are sent when:
+
+        * :meth:`flush` is called.
+        * :meth:`flush_if_due` is called, or another write is queued, and the oldest queued write
+          is older than max_latency. Call flush_if_due from the main loop so that a write is not
+          held much longer than max_latency.
+        * Any register of the expander is read, so reads always see the queued writes. Reading a
+          register that has a queued write of the whole register returns the queued value
+          without using the bus.
+
+        The queued writes are sent in the order each register was first written.
+
+        :param max_latency: The longest time in seconds that a write is held before it is sent.
+                            Set to None to only send the writes on a read or :meth:`flush`.
+        :return:            Nothing.
+        """
+        with self:
+            if self._queue is None:
+                self._queue = WriteQueue()
+            if max_latency is None:
+                self._queue.max_latency_ns = None
+            else:
+                self._queue.max_latency_ns = int(max_latency * 1000000000)
+
+    def disable_write_combining(self):
+        """Send any queued writes, then go back to sending each write right away.
+
+        :return:        Nothing.
+        """
+        with self:
+            self.flush()
+            self._queue = None
+
+    @property
+    def write_queue(self):
+        """The :class:`WriteQueue` of the expander, or None if write combining is not enabled.
+        Read only.
+        """
+        return self._queue
+
+    def flush(self):
+        """Send all queued writes to the device. Does nothing if write combining is not enabled
+        or there is nothing queued.
+
+        :return:        Nothing.
+        """
+        queue = self._queue
+        if (queue is None) or (not queue.entries):
+            return
+        with self:
+            entries = queue.entries
+            queue.entries = []
+            for register, width, mask, bits in entries:
+                if mask != (1 << (8 * width)) - 1:
+                    # Only some of the bits were written, the rest are read from the device.
+                    old = self._bus_read_port(register, width)
+                    bits |= old & ~mask
+                    if bits == old:
+                        continue
+                self._bus_write_port(register, bits, width)
+                queue.issued += 1
+            queue.flushes += 1
+
+    def flush_if_due(self):
+        """Send the queued writes if the oldest one has been waiting longer than the max_latency
+        given to :meth:`enable_write_combining`.
+
+        :return:        Nothing.
+        """
+        queue = self._queue
+        if (queue is None) or (not queue.entries) or (queue.max_latency_ns is None):
+            return
+        if time.monotonic_ns() - queue.since >= queue.max_latency_ns:
+            self.flush()
+
+    def enable_read_cache(self, ttl=0.001):
+        """Keep the value of the registers that the device changes by itself, like the input
+        register (gpio) and interrupt status, for a short time after they are read. Reads of
+        the same register within that time are answered from the last read without using the
+        bus. Reading the value of several pins one after another then only takes one bus read.
+
+        The other registers only change when they are written, so they are not cached. Any
+        write to the device drops the cached values, since a write to the outputs can change
+        the inputs.
+
+        Values from the cache can be up to ttl seconds old. Use :meth:`invalidate_reads` to
+        make the next read go to the device. Note that on devices that clear the interrupt when
+        the inputs are read, a read from the cache does not clear it.
+
+        :param ttl:     The time in seconds a read is kept.
+        :return:        Nothing.
+        """
+        with self:
+            if self._read_cache is None:
+                self._read_cache = ReadCache()
+            self._read_cache.ttl_ns = int(ttl * 1000000000)
+
+    def disable_read_cache(self):
+        """Stop caching reads. Every read goes to the device.
+
+        :return:        Nothing.
+        """
+        self._read_cache = None
+
+    @property
+    def read_cache(self):
+        """The :class:`ReadCache` of the expander, or None if read caching is not enabled.
+        Read only.
+        """
+        return self._read_cache
+
+    def invalidate_reads(self):
+        """Drop the cached reads, so the next read of each register goes to the device. Does
+        nothing if read caching is not enabled.
+
+        :return:        Nothing.
+        """
+        if self._read_cache is not None:
+            self._read_cache.entries = []
+
+    def enable_shadow(self):
+        """Keep a copy of the configuration registers (outputs, direction, polarity, pull
+        resistors and so on) of the device. The registers are read once, then every write to
+        them is recorded. This is used by :class:`~i2c_expanders.health.HealthMonitor` to put the
+        registers back after the device has been reset. Changes to some of the bits of these
+        registers (like setting one output pin) also use the copy instead of reading the
+        register first, so they take one bus transfer instead of two.
+
+        :return:        Nothing.
+        """
+        with self:
+            self.flush()
+            shadow = {}
+            for register, width in self._config_regs:
+                val = self._bus_read_port(register, width)
+                for i in range(width):
+                    shadow[register + i] = (val >> (8 * i)) & 0xFF
+            self._shadow = shadow
+
+    @property
+    def shadow(self):
+        """The copy of the configuration registers, as a dict of {register: byte}, or None if
+        :meth:`enable_shadow` has not been called. This is what the driver has written, not
+        what is in the device now. Do not change it.
+        """
+        return self._shadow
+
+    def _queue_write(self, register, width, mask, bits):
+        # Add a write to the queue. The bits in 'mask' are replaced with the matching bits from
+        # 'bits'. Merged into the queued write to the same register if there is one.
+        queue = self._queue
+        queue.requested += 1
+        for entry in queue.entries:
+            if entry[0] == register:
+                if entry[1] == width:
+                    entry[2] |= mask
+                    entry[3] = (entry[3] & ~mask) | (bits & mask)
+                    self.flush_if_due()
+                    return
+                # The same register written with a different width. Send the old write first.
+                self.flush()
+                break
+        if not queue.entries:
+            queue.since = time.monotonic_ns()
+        queue.entries.append([register, width, mask, bits & mask])
+        self.flush_if_due()
+
+    def _read_port(self, register, width=None):
+        # Read an unsigned little endian value spanning 'width' 8-bit registers, starting at the
+        # specified register. The width defaults to the number of ports on the device, so all
+        # of the banks of a register are read in a single transaction.
+        if width is None:
+            width = self._ports
+        cache = self._read_cache
+        if (cache is not None) and (register in self._volatile_regs):
+            return self._cached_read(cache, register, width)
+        with self:
+            queue = self._queue
+            if (queue is not None) and queue.entries:
+                for entry in queue.entries:
+                    if (entry[0] == register) and (entry[1] == width):
+                        if entry[2] == (1 << (8 * width)) - 1:
+                            return entry[3]
+                        break
+                self.flush()
+            return self._bus_read_port(register, width)
+
+    def _cached_read(self, cache, register, width):
+        # Read a volatile register, using the value from the cache if it is new enough. Checked
+        # before holding the bus, so a hit does not wait for it.
+        now = time.monotonic_ns()
+        for entry in cache.entries:
+            if (entry[0] == register) and (entry[1] == width):
+                if now - entry[3] < cache.ttl_ns:
+                    cache.hits += 1
+                    return entry[2]
+                break
+        cache.misses += 1
+        with self:
+            # Queued writes to the outputs can change the inputs.
+            self.flush()
+            val = self._bus_read_port(register, width)
+            entries = cache.entries
+            for i, entry in enumerate(entries):
+                if (entry[0] == register) and (entry[1] == width):
+                    entries[i] = (register, width, val, now)
+                    break
+            else:
+                entries.append((register, width, val, now))
+        return val
+
+    def _write_port(self, register, val, width=None):
+        # Write an unsigned little endian value spanning 'width' 8-bit registers, starting at the
+        # specified register. The width defaults to the number of ports on the device.
+        if width is None:
+            width = self._ports
+        with self:
+            if self._queue is not None:
+                self._queue_write(register, width, (1 << (8 * width)) - 1, val)
+            else:
+                self._bus_write_port(register, val, width)
+
+    def _update_port(self, register, mask, bits, width=None):
+        # Read-modify-write of a register. The bits in 'mask' are replaced with the matching
+        # bits from 'bits'. The write is skipped if the register already has the requested value.
+        # The read is skipped if the shadow has the register.
+        if width is None:
+            width = self._ports
+        with self:
+            if self._queue is not None:
+                self._queue_write(register, width, mask, bits)
+                return
+            old = self._shadow_port(register, width)
+            if old is None:
+                old = self._bus_read_port(register, width)
+            new = (old & ~mask) | (bits & mask)
+            if new != old:
+                self._bus_write_port(register, new, width)
+
+    def _shadow_port(self, register, width=None):
+        # The value of a register from the shadow, or None if the shadow is off or does not have
+        # the register. This is the value the driver last wrote, no bus transfer is done.
+        shadow = self._shadow
+        if shadow is None:
+            return None
+        if width is None:
+            width = self._ports
+        val = 0
+        for i in range(width - 1, -1, -1):
+            byte = shadow.get(register + i)
+            if byte is None:
+                return None
+            val = (val << 8) | byte
+        return val
+
+    def _bus_read_port(self, register, width):
+        # Read a register from the device, skipping the write queue. Use _read_port instead.
+        with self:
+            self._buffer[0] = self._command(register, width)
+
+            self._bus.write_then_readinto(
+                self._buffer, self._buffer, out_end=1, in_start=1, in_end=width + 1
+            )
+            val = 0
+            for i in range(width, 0, -1):
+                val = (val << 8) | self._buffer[i]
+            return val
+
+    def _bus_write_port(self, register, val, width):
+        # Write a register on the device, skipping the write queue. Use _write_port instead.
+        if self._read_cache is not None:
+            self._read_cache.entries = []
+        with self:
+            self._buffer[0] = self._command(register, width)
+            for i in range(1, width + 1):
+                self._buffer[i] = val & 0xFF
+                val >>= 8
+            self._bus.write(self._buffer, end=width + 1)
+            # Only record the write once it has been made.
+            shadow = self._shadow
+            if shadow is not None:
+                for i in range(1, width + 1):
+                    shadow[register + i - 1] = self._buffer[i]
+
+    def readinto_register(self, register, buf, *, start=0, end=None):
+        """Read raw register bytes into a buffer supplied by the caller. Reading starts at
+        'register' and the bytes are placed in the buffer in the order the device sends them
+        (bank 0 first). Nothing is decoded and no objects are created, so this is suitable for
+        high rate loops that work with the raw port bytes.
+
+        :param register:    The register to start reading from.
+        :param buf:         A bytearray or memoryview to read into.
+        :param start:       The index of the first byte of buf to fill. Defaults to 0.
+        :param end:         The index after the last byte of buf to fill. Defaults to len(buf).
+        :return:            Nothing.
+        """
+        if end is None:
+            end = len(buf)
+        with self:
+            self.flush()
+            self._buffer[0] = self._command(register, end - start)
+            self._bus.write_then_readinto(
+                self._buffer, buf, out_end=1, in_start=start, in_end=end
+            )
+
+    def write_register_from(self, register, buf, *, start=0, end=None):
+        """Write raw register bytes from a buffer supplied by the caller. Writing starts at
+        'register' and the bytes are sent in the order they are in the buffer (bank 0 first).
+        The bytes are copied into the expander's scratch buffer so the command byte and data go
+        out in one transaction. No objects are created.
+
+        :param register:    The register to start writing to.
+        :param buf:         A bytearray, bytes or memoryview to write from.
+        :param start:       The index of the first byte of buf to write. Defaults to 0.
+        :param end:         The index after the last byte of buf to write. Defaults to len(buf).
+        :return:            Nothing.
+        """
+        if end is None:
+            end = len(buf)
+        count = end - start
+        if count > 2 * self._ports:
+            raise ValueError(
+                f"Can not write {count} bytes. Maximum is {2 * self._ports}."
+            )
+        self.invalidate_reads()
+        with self:
+            self.flush()
+            self._buffer[0] = self._command(register, count)
+            for i in range(count):
+                self._buffer[i + 1] = buf[start + i]
+            self._bus.write(self._buffer, end=count + 1)
+            if self._shadow is not None:
+                for i in range(count):
+                    self._shadow[register + i] = buf[start + i]
+
+    def _write_stream(self, buf, *, start=0, end=None):
+        # Write a buffer that starts with a command byte in one transaction. The data bytes go
+        # to the register in the command byte and the ones after it, the same as a normal write.
+        # Used to send many values to the same register back to back, on devices that wrap the
+        # register address back to the first bank (see _auto_increment).
+        self.invalidate_reads()
+        with self:
+            self.flush()
+            self._bus.write(buf, start=start, end=end)
+            if self._shadow is not None:
+                if end is None:
+                    end = len(buf)
+                register = buf[start] & ~self._auto_increment
+                for i in range(end - start - 1):
+                    self._shadow[register + i % self._ports] = buf[start + 1 + i]
+
+    def _command(self, register, width):
+        # Build the command byte for a transfer of 'width' bytes starting at 'register'.
+        if width > 1:
+            return (register & 0xFF) | self._auto_increment
+        return register & 0xFF
+
     def _read_u16le(self, register):
         # Read an unsigned 16 bit little endian value from the specified 8-bit
         # register.
-        with self._device as bus_device:
-            self._buffer[0] = register & 0xFF
-
-            bus_device.write_then_readinto(
-                self._buffer, self._buffer, out_end=1, in_start=1, in_end=3
-            )
-            return (self._buffer[2] << 8) | self._buffer[1]
+        return self._read_port(register, 2)
 
     def _write_u16le(self, register, val):
         # Write an unsigned 16 bit little endian value to the specified 8-bit
         # register.
-        with self._device as bus_device:
-            self._buffer[0] = register & 0xFF
-            self._buffer[1] = val & 0xFF
-            self._buffer[2] = (val >> 8) & 0xFF
-            bus_device.write(self._buffer, end=3)
+        self._write_port(register, val, 2)
 
     def _read_u8(self, register):
         # Read an unsigned 8 bit value from the specified 8-bit register.
-        with self._device as bus_device:
-            self._buffer[0] = register & 0xFF
-
-            bus_device.write_then_readinto(
-                self._buffer, self._buffer, out_end=1, in_start=1, in_end=2
-            )
-            return self._buffer[1]
+        return self._read_port(register, 1)
 
     def _write_u8(self, register, val):
         # Write an 8 bit value to the specified 8-bit register.
-        with self._device as bus_device:
-            self._buffer[0] = register & 0xFF
-            self._buffer[1] = val & 0xFF
-            bus_device.write(self._buffer, end=2)
+        self._write_port(register, val, 1)
 
     def get_pin(self, pin):
-        """Convenience function to create an instance of the DigitalInOut class
+        """Convenience function to get an instance of the DigitalInOut class
         pointing at the specified pin on the IO expander. This function should
         never be called directly from the I2c_expander class. It is included
         here so that all subclasses have this function by default.
+
+        The pin objects are cached, calling this multiple times for the same pin
+        returns the same object.
         """
         self._validate_pin(pin)
-        return DigitalInOut(pin, self)
+        if self._pins is None:
+            self._pins = [None] * (self.maxpins + 1)
+        pin_obj = self._pins[pin]
+        if pin_obj is None:
+            pin_obj = DigitalInOut(pin, self)
+            self._pins[pin] = pin_obj
+        return pin_obj
 
     def _validate_pin(self, pin):
         """Internal helper function to make sure the pin that is passed to the function is valid.
@@ -124,3 +783,133 @@ class I2c_Expander:
             raise ValueError(
                 f"Invalid pin number {pin}. Pin should be 0-{self.maxpins}."
             )
+
+
+class _InterruptTracking(I2c_Expander):
+    """Base class for expanders with an interrupt output but no interrupt status or mask
+    registers. The driver finds the pins that changed by comparing the inputs with the values
+    from the last read of the gpio register, which gives the same interrupt functions as the
+    expanders that have the registers. Drivers that read the gpio register with
+    :meth:`_read_inputs` get this for free.
+    """
+
+    # The interrupt mask, and the input values from the last read of the gpio register. Used to
+    # find the pins that caused an interrupt, since the device does not tell.
+    __slots__ = ("_irq_mask", "_last_input")
+
+    def __init__(self, bus_device, address):
+        super().__init__(bus_device, address)
+        self._irq_mask = (1 << (self._maxpins + 1)) - 1
+        self._last_input = None
+
+    def _read_inputs(self):
+        # Read the input registers and remember them for the interrupt functions.
+        val = self._read_port(self._input_reg)
+        # Reading the inputs clears the interrupt on the device.
+        self._last_input = val
+        return val
+
+    def set_int_pin(self, pin, latch=False):
+        """Enable interrupt tracking on a pin. This device does not have an interrupt status
+        register, so the driver finds the pins that changed by comparing the inputs with the
+        values from the last read of the gpio register. It only takes one read of the inputs to
+        handle an interrupt.
+
+        Like the interrupt output of the device, only changes since the last read of the inputs
+        are detected. A pin that changes and changes back before the read is missed.
+
+        :param pin:     Pin number to modify.
+        :param latch:   This device can not latch interrupts. Must be False, ValueError is
+                        raised otherwise.
+        :return:        Nothing.
+        """
+        self._validate_pin(pin)
+        if latch:
+            raise ValueError(
+                "This device can not latch interrupts. latch must be False."
+            )
+        self._irq_mask &= ~(1 << pin)
+        if self._last_input is None:
+            # Nothing to compare with yet.
+            self._read_inputs()
+
+    def clear_int_pin(self, pin):
+        """Disable interrupt tracking on a pin.
+
+        :param pin:     Pin number to modify.
+        :return:        Nothing.
+        """
+        self._validate_pin(pin)
+        self._irq_mask |= 1 << pin
+
+    def get_interrupts(self):
+        """Returns a list of pins that caused an interrupt along with the value of those pins.
+        These are the pins with interrupts enabled that changed since the last read of the gpio
+        register. It is possible for multiple pins to have changed. Calling this function reads
+        the inputs once, which also clears the interrupt on the device.
+
+        :return:        Returns a list of dicts containing items "pin" and "value". If no
+                        interrupts are triggered, this function returns none.
+        """
+        last = self._last_input
+        pin_values = self._read_inputs()
+        if last is None:
+            return None
+        int_status = (pin_values ^ last) & ~self._irq_mask
+
+        output = []
+        for i in range(self.maxpins + 1):
+            if (int_status >> i) & 1:
+                output.append({"pin": i, "value": bool((pin_values >> i) & 1)})
+        if not output:
+            return None
+        return output
+
+    def get_int_pins(self):
+        """Returns a list of pins that caused an interrupt. These are the pins with interrupts
+        enabled that changed since the last read of the gpio register. Calling this function
+        reads the inputs once, which clears the interrupt on the device. The values the inputs
+        are compared with are not updated, so the same pins are returned until the gpio register
+        is read.
+
+        :return:        Returns a list of pin numbers.
+        """
+        output = []
+        reg = self.irq_status
+        for i in range(self.maxpins + 1):
+            if (reg >> i) & 1:
+                output.append(i)
+        return output
+
+    @property
+    def irq_mask(self):
+        """The interrupt mask. Setting a bit to one will mask interrupts on that corresponding
+        pin. All interrupts are masked by default. This is kept by the driver, reading and
+        writing it does not use the bus. Read and written as a number with one bit per pin.
+        """
+        return self._irq_mask
+
+    @irq_mask.setter
+    def irq_mask(self, val):
+        all_pins = (1 << (self._maxpins + 1)) - 1
+        self._irq_mask = val & all_pins
+        if self._last_input is None and self._irq_mask != all_pins:
+            self._read_inputs()
+
+    @property
+    def irq_status(self):
+        """The interrupt status. A one in a bit indicates that the corresponding pin has
+        interrupts enabled and changed since the last read of the gpio register. Reading this
+        reads the inputs, which clears the interrupt on the device. The values the inputs are
+        compared with are not updated, so the status stays the same until the gpio register is
+        read. Read only.
+        """
+        if self._last_input is None:
+            return 0
+        val = self._read_port(self._input_reg)
+        return (val ^ self._last_input) & ~self._irq_mask
+
+    @irq_status.setter
+    def irq_status(self, val):
+        # This is read only.
+        pass
@@ -0,0 +1,307 @@
+# SPDX-FileCopyrightText: 2023 Pat Satyshur
+#
+# SPDX-License-Identifier: MIT
+
+"""
+`keys`
+====================================================
+
+Key scanning for expander pins that works like the CircuitPython keypad module. :class:`Keys`,
+:class:`EventQueue` and :class:`Event` have the same methods and behavior as keypad.Keys,
+keypad.EventQueue and keypad.Event, so code written for keys on the board pins can be used with
+keys on an expander.
+
+The differences from keypad:
+
+* The keys are not scanned in the background. Call :meth:`Keys.update` from the main loop. It
+  only scans when the scan interval has passed.
+* All of the keys are read with one read of the inputs. The inputs can also be passed to
+  :meth:`Keys.update`, for example from a :class:`~i2c_expanders.poller.Snapshot`, so the keys
+  do not use the bus at all.
+* If the interrupt output of the expander is connected to the board, the inputs are only read
+  when the interrupt is active or a key is pressed.
+
+The event queue is allocated when the :class:`Keys` is created, and
+:meth:`EventQueue.get_into` does not allocate any memory.
+
+.. code-block:: python
+
+    from i2c_expanders.keys import Event, Keys
+
+    keys = Keys(expander, (0, 1, 2, 3), value_when_pressed=False)
+    event = Event()
+    while True:
+        keys.update()
+        if keys.events.get_into(event):
+            print(event)
+
+* Author(s): Pat Satyshur
+"""
+
+import time
+
+from i2c_expanders.helpers import _get_bit, _Debouncer, Capability, Pull
+
+try:
+    from supervisor import ticks_ms as _ticks_ms
+except ImportError:
+
+    def _ticks_ms():
+        # Milliseconds, wrapping the same as supervisor.ticks_ms.
+        return (time.monotonic_ns() // 1000000) & 0x3FFFFFFF
+
+
+__version__ = "0.0.0+auto.0"
+__repo__ = "https://github.com/ilikecake/CircuitPython_I2C_Expanders.git"
+
+
+class Event:
+    """A key transition event. The same as keypad.Event.
+
+    :param key_number:  The key number.
+    :param pressed:     True if the key was pressed, False if it was released.
+    :param timestamp:   The time of the event, in milliseconds from supervisor.ticks_ms (or a
+                        millisecond counter on Linux).
+    """
+
+    __slots__ = ("key_number", "pressed", "timestamp")
+
+    def __init__(self, key_number=0, pressed=True, timestamp=None):
+        self.key_number = key_number
+        self.pressed = pressed
+        self.timestamp = _ticks_ms() if timestamp is None else timestamp
+
+    @property
+    def released(self):
+        """True if the event is a key release."""
+        return not self.pressed
+
+    def __eq__(self, other):
+        # The timestamp is not compared, the same as keypad.Event.
+        if not isinstance(other, Event):
+            return NotImplemented
+        return self.key_number == other.key_number and self.pressed == other.pressed
+
+    def __hash__(self):
+        return hash((self.key_number, self.pressed))
+
+    def __repr__(self):
+        state = "pressed" if self.pressed else "released"
+        return f"<Event: key_number {self.key_number} {state}>"
+
+
+class EventQueue:
+    """A fixed size queue of key events. The same as keypad.EventQueue. The space for all of the
+    events is allocated when the queue is created. If the queue is full, new events are dropped
+    and :attr:`overflowed` is set.
+
+    :param max_events:  The most events the queue can hold.
+    """
+
+    __slots__ = ("_keys", "_pressed", "_timestamps", "_start", "_count", "_overflowed")
+
+    def __init__(self, max_events=64):
+        if max_events < 1:
+            raise ValueError("max_events must be at least 1")
+        self._keys = [0] * max_events
+        self._pressed = [False] * max_events
+        self._timestamps = [0] * max_events
+        self._start = 0
+        self._count = 0
+        self._overflowed = False
+
+    def get(self):
+        """Remove the next event from the queue and return it.
+
+        :return:        An :class:`Event`, or None if the queue is empty.
+        """
+        event = Event()
+        if self.get_into(event):
+            return event
+        return None
+
+    def get_into(self, event):
+        """Remove the next event from the queue and store it in an existing :class:`Event`.
+        Nothing is allocated.
+
+        :param event:   The Event to fill in.
+        :return:        True if there was an event, False if the queue was empty and event was
+                        not changed.
+        """
+        if not self._count:
+            return False
+        start = self._start
+        event.key_number = self._keys[start]
+        event.pressed = self._pressed[start]
+        event.timestamp = self._timestamps[start]
+        self._start = (start + 1) % len(self._keys)
+        self._count -= 1
+        return True
+
+    def clear(self):
+        """Remove all of the events from the queue, and clear :attr:`overflowed`.
+
+        :return:        Nothing.
+        """
+        self._count = 0
+        self._overflowed = False
+
+    @property
+    def overflowed(self):
+        """True if an event was dropped because the queue was full. Set to False to clear."""
+        return self._overflowed
+
+    @overflowed.setter
+    def overflowed(self, val):
+        self._overflowed = bool(val)
+
+    def __bool__(self):
+        return self._count != 0
+
+    def __len__(self):
+        return self._count
+
+    def _record(self, key_number, pressed, timestamp):
+        # Add an event to the queue. Used by the scanners.
+        size = len(self._keys)
+        if self._count == size:
+            self._overflowed = True
+            return
+        i = (self._start + self._count) % size
+        self._keys[i] = key_number
+        self._pressed[i] = pressed
+        self._timestamps[i] = timestamp
+        self._count += 1
+
+
+class Keys:  # pylint: disable=too-many-instance-attributes
+    """Scans keys connected to pins of an expander. The same as keypad.Keys, except the pins are
+    given as pin numbers on the expander, and :meth:`update` must be called to scan.
+
+    :param expander:            The expander the keys are connected to.
+    :param pins:                The pin numbers of the keys on the expander. The first pin is
+                                key number 0.
+    :param value_when_pressed:  The value of a pin when its key is pressed.
+    :param pull:                Turn on a pull resistor opposite to value_when_pressed, if the
+                                expander has one. The PCA parts always have pull ups.
+    :param interval:            The time between scans in seconds.
+    :param max_events:          The size of the event queue.
+    :param debounce_threshold:  The number of scans in a row that a key must read the same
+                                before the change is reported.
+    :param interrupt:           Optional. A digitalio.DigitalInOut for the board pin connected to
+                                the interrupt output of the expander. The inputs are only read
+                                while the interrupt is active or a key is pressed.
+    """
+
+    # pylint: disable-next=too-many-arguments
+    def __init__(
+        self,
+        expander,
+        pins,
+        *,
+        value_when_pressed,
+        pull=True,
+        interval=0.02,
+        max_events=64,
+        debounce_threshold=1,
+        interrupt=None,
+    ):
+        if debounce_threshold < 1:
+            raise ValueError("debounce_threshold must be at least 1")
+        self._expander = expander
+        self._pins = tuple(pins)
+        self._value_when_pressed = bool(value_when_pressed)
+        self._interval_ms = int(interval * 1000)
+        self._interrupt = interrupt
+        self._last_scan = None
+
+        pull_dir = None
+        if pull:
+            if value_when_pressed:
+                if _get_bit(expander.capability, Capability.PULL_DOWN):
+                    pull_dir = Pull.DOWN
+            elif _get_bit(expander.capability, Capability.PULL_UP):
+                pull_dir = Pull.UP
+        with expander:
+            for pin in self._pins:
+                expander.get_pin(pin).switch_to_input(pull=pull_dir)
+            if interrupt is not None and hasattr(expander, "set_int_pin"):
+                for pin in self._pins:
+                    expander.set_int_pin(pin)
+
+        self._debouncer = _Debouncer(debounce_threshold)
+        self._events = EventQueue(max_events)
+
+    @property
+    def events(self):
+        """The :class:`EventQueue` with the key events. Read only."""
+        return self._events
+
+    @property
+    def key_count(self):
+        """The number of keys. Read only."""
+        return len(self._pins)
+
+    def reset(self):
+        """Assume that all of the keys are released. Keys that are pressed will give a pressed
+        event on the next scan.
+
+        :return:        Nothing.
+        """
+        self._debouncer.reset()
+
+    def deinit(self):
+        """Stop using the expander. Interrupts are turned off on the key pins.
+
+        :return:        Nothing.
+        """
+        if self._interrupt is not None and hasattr(self._expander, "clear_int_pin"):
+            for pin in self._pins:
+                self._expander.clear_int_pin(pin)
+        self._interrupt = None
+
+    def update(self, gpio=None):
+        """Scan the keys if the scan interval has passed since the last scan, and add any changes
+        to the event queue. Call this regularly from the main loop.
+
+        :param gpio:    Optional. The value of the gpio register of the expander, if it has
+                        already been read. The keys are scanned from this value without using
+                        the bus, and the scan interval is ignored.
+        :return:        True if a scan was done.
+        """
+        now = _ticks_ms()
+        if gpio is None:
+            last = self._last_scan
+            if last is not None and ((now - last) & 0x3FFFFFFF) < self._interval_ms:
+                return False
+            if (
+                self._interrupt is not None
+                and self._interrupt.value
+                and self._debouncer.idle
+            ):
+                # No key is pressed, and the inputs have not changed since the last read.
+                self._last_scan = now
+                return False
+            gpio = self._expander.gpio
+        self._last_scan = now
+        self._scan(gpio, now)
+        return True
+
+    def _scan(self, gpio, now):
+        if not self._value_when_pressed:
+            gpio = ~gpio
+        raw = 0
+        for i, pin in enumerate(self._pins):
+            if (gpio >> pin) & 1:
+                raw |= 1 << i
+
+        changed = self._debouncer.update(raw)
+        state = self._debouncer.state
+        key_number = 0
+        while changed:
+            if changed & 1:
+                self._events._record(  # pylint: disable=protected-access
+                    key_number, bool((state >> key_number) & 1), now
+                )
+            changed >>= 1
+            key_number += 1
@@ -0,0 +1,215 @@
+# SPDX-FileCopyrightText: 2023 Pat Satyshur
+#
+# SPDX-License-Identifier: MIT
+
+"""
+`matrix`
+====================================================
+
+Scans a key matrix connected to the pins of an expander. Each row is selected with one write to
+the direction register, and all of the columns are read with one read of the inputs. Scanning an
+8x8 matrix on a PCA9555 with a key pressed takes 18 transactions, instead of one or more per key
+when the pins are read one at a time.
+
+Before each scan, all of the columns are read once with all of the rows selected. If no key is
+pressed, the rest of the scan is skipped, so a scan of an idle keypad takes one read.
+If the interrupt output of the expander is connected to the board, no reads are needed at all
+while the keypad is idle.
+
+The rows are selected by making that row an output driving low. The other rows are inputs, so
+pressing more than one key does not short the outputs together. The columns are inputs with
+pull up resistors. The PCA parts always have pull ups, on the PCAL parts they are turned on by
+the scanner. Diodes are needed to prevent ghosting if more than two keys are pressed at once, the
+same as any key matrix.
+
+.. code-block:: python
+
+    from i2c_expanders.matrix import KeyMatrix
+
+    keys = KeyMatrix(expander, row_pins=range(8), column_pins=range(8, 16))
+    while True:
+        for key_number, pressed in keys.update():
+            print(key_number, pressed)
+
+The scanner sets the direction of the row pins every scan. Do not change the direction of the
+other pins of the expander while it is being used.
+
+* Author(s): Pat Satyshur
+"""
+
+import time
+
+from i2c_expanders.helpers import _get_bit, _Debouncer, Capability, Pull
+
+__version__ = "0.0.0+auto.0"
+__repo__ = "https://github.com/ilikecake/CircuitPython_I2C_Expanders.git"
+
+
+class KeyMatrix:  # pylint: disable=too-many-instance-attributes
+    """A key matrix scanner. The keys are numbered row by row, the key in row r and column c is
+    key number r * len(column_pins) + c. This is the same as keypad.KeyMatrix.
+
+    :param expander:    The expander the matrix is connected to.
+    :param row_pins:    The pin numbers of the rows on the expander.
+    :param column_pins: The pin numbers of the columns on the expander.
+    :param interval:    The time between scans in seconds, when :meth:`update` is used.
+    :param debounce:    The number of scans in a row that a key must read the same before the
+                        change is reported. 1 turns off debouncing.
+    :param interrupt:   Optional. A digitalio.DigitalInOut for the board pin connected to the
+                        interrupt output of the expander. The scanner does not use the bus while
+                        no key is pressed and the interrupt is not active.
+    """
+
+    def __init__(
+        self,
+        expander,
+        row_pins,
+        column_pins,
+        *,
+        interval=0.02,
+        debounce=2,
+        interrupt=None,
+    ):  # pylint: disable=too-many-arguments
+        if debounce < 1:
+            raise ValueError("debounce must be at least 1")
+        self._expander = expander
+        self._rows = tuple(row_pins)
+        self._columns = tuple(column_pins)
+        self._interval_ns = int(interval * 1000000000)
+        self._interrupt = interrupt
+        self._next_scan = 0
+
+        # The column bits in the gpio register, and how to move them into a row of the key word.
+        # Columns on pins next to each other in order only need a shift.
+        self._column_mask = 0
+        for pin in self._columns:
+            self._column_mask |= 1 << pin
+        first = self._columns[0]
+        if self._column_mask == ((1 << len(self._columns)) - 1) << first and (
+            self._columns == tuple(sorted(self._columns))
+        ):
+            self._column_shift = first
+        else:
+            self._column_shift = None
+
+        pull = None
+        if _get_bit(expander.capability, Capability.PULL_UP):
+            pull = Pull.UP
+        with expander:
+            for pin in self._columns:
+                expander.get_pin(pin).switch_to_input(pull=pull)
+            for pin in self._rows:
+                expander.get_pin(pin).switch_to_output(value=False)
+            # The direction register with all of the rows selected (outputs), and the value to
+            # write to select each row on its own.
+            self._all_rows = expander.iodir
+            row_mask = 0
+            for pin in self._rows:
+                row_mask |= 1 << pin
+            self._row_words = tuple(
+                self._all_rows | (row_mask & ~(1 << pin)) for pin in self._rows
+            )
+            if interrupt is not None and hasattr(expander, "set_int_pin"):
+                for pin in self._columns:
+                    expander.set_int_pin(pin)
+
+        # The debounced state of the keys, one bit per key.
+        self._debouncer = _Debouncer(debounce)
+
+        #: Number of scans done, including the ones skipped because no key was pressed.
+        self.scans = 0
+        #: The time the last scan took, in nanoseconds.
+        self.scan_time_ns = 0
+        #: The longest time a scan took, in nanoseconds.
+        self.max_scan_time_ns = 0
+
+    @property
+    def key_count(self):
+        """The number of keys in the matrix. Read only."""
+        return len(self._rows) * len(self._columns)
+
+    @property
+    def pressed(self):
+        """The debounced state of all of the keys, as an integer with one bit per key number.
+        A one means the key is pressed. Read only.
+        """
+        return self._debouncer.state
+
+    def key_number_to_row_column(self, key_number):
+        """Convert a key number to a row and column.
+
+        :param key_number:  The key number.
+        :return:            A tuple of (row, column).
+        """
+        return divmod(key_number, len(self._columns))
+
+    def update(self):
+        """Scan the matrix if the scan interval has passed since the last scan. Call this
+        regularly from the main loop.
+
+        :return:        A list of (key_number, pressed) tuples for the keys that changed. Empty
+                        if nothing changed, or it is not time to scan.
+        """
+        now = time.monotonic_ns()
+        if now < self._next_scan:
+            return []
+        self._next_scan = now + self._interval_ns
+        return self.scan()
+
+    def scan(self):
+        """Scan the matrix now.
+
+        :return:        A list of (key_number, pressed) tuples for the keys that changed.
+        """
+        start = time.monotonic_ns()
+        raw = self._read_keys()
+        changed = self._debouncer.update(raw)
+        state = self._debouncer.state
+
+        events = []
+        key_number = 0
+        while changed:
+            if changed & 1:
+                events.append((key_number, bool((state >> key_number) & 1)))
+            changed >>= 1
+            key_number += 1
+
+        self.scans += 1
+        self.scan_time_ns = time.monotonic_ns() - start
+        self.max_scan_time_ns = max(self.max_scan_time_ns, self.scan_time_ns)
+        return events
+
+    def _read_keys(self):
+        # Read the raw state of the keys, one bit per key number.
+        if (
+            self._interrupt is not None
+            and self._interrupt.value
+            and self._debouncer.idle
+        ):
+            # No key is pressed, and the inputs have not changed since the last read.
+            return 0
+        expander = self._expander
+        with expander:
+            # All of the rows are selected between scans.
+            if not self._columns_active(expander.gpio):
+                return 0
+            keys = 0
+            shift = 0
+            for word in self._row_words:
+                expander.iodir = word
+                keys |= self._columns_active(expander.gpio) << shift
+                shift += len(self._columns)
+            expander.iodir = self._all_rows
+        return keys
+
+    def _columns_active(self, gpio):
+        # The pressed columns from the inputs, as one bit per column. The columns are low when
+        # a key is pressed.
+        gpio = ~gpio & self._column_mask
+        if self._column_shift is not None:
+            return gpio >> self._column_shift
+        columns = 0
+        for i, pin in enumerate(self._columns):
+            if (gpio >> pin) & 1:
+                columns |= 1 << i
+        return columns
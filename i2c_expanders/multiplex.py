@@ -0,0 +1,283 @@
+# SPDX-FileCopyrightText: 2023 Pat Satyshur
+#
+# SPDX-License-Identifier: MIT
+
+"""
+`multiplex`
+====================================================
+
+Refreshes multiplexed LED displays (7-segment digits or LED matrices) connected to the outputs of
+an expander. The segments (or matrix columns) are shared between the digits (or rows), and one
+digit is turned on at a time.
+
+The display is held in a frame buffer. The value of the output register for each digit is worked
+out when the frame buffer changes, so each digit only takes one write of the output register.
+
+With streamed=True, the whole frame is sent in a single write. The device moves to the next
+output register after each byte, and back to the first one after the last, so the values for
+all of the digits can be sent back to back in one transaction. The time each digit is on is then
+set by the bus clock instead of by the code, which gives a much higher and steadier refresh rate.
+This only works on devices that wrap the register address this way (PCA9555, PCA9554 and the PCAL
+parts), not the TCA6424.
+
+.. code-block:: python
+
+    from i2c_expanders.multiplex import Multiplexer
+
+    display = Multiplexer(expander, segment_pins=range(8), digit_pins=range(8, 12))
+    display.show("12.34")
+    while True:
+        display.refresh()
+
+On Linux, :meth:`Multiplexer.start` refreshes the display from a background thread.
+
+* Author(s): Pat Satyshur
+"""
+
+import time
+
+__version__ = "0.0.0+auto.0"
+__repo__ = "https://github.com/ilikecake/CircuitPython_I2C_Expanders.git"
+
+# 7-segment patterns, bit 0 is segment a through bit 6 segment g. Bit 7 is the decimal point.
+_FONT = {
+    "0": 0x3F,
+    "1": 0x06,
+    "2": 0x5B,
+    "3": 0x4F,
+    "4": 0x66,
+    "5": 0x6D,
+    "6": 0x7D,
+    "7": 0x07,
+    "8": 0x7F,
+    "9": 0x6F,
+    "A": 0x77,
+    "B": 0x7C,
+    "C": 0x39,
+    "D": 0x5E,
+    "E": 0x79,
+    "F": 0x71,
+    "-": 0x40,
+    "_": 0x08,
+    " ": 0x00,
+}
+_DECIMAL_POINT = 0x80
+
+
+class Multiplexer:  # pylint: disable=too-many-instance-attributes
+    """A multiplexed display refresher.
+
+    :param expander:            The expander the display is connected to.
+    :param segment_pins:        The pin numbers of the segments (or columns). The first pin is
+                                bit 0 of the digit values. For 7-segment digits, give the pins
+                                for segments a to g, then the decimal point.
+    :param digit_pins:          The pin numbers of the digit (or row) selects. The first pin is
+                                digit 0.
+    :param segments_active_low: True if a segment is lit when its pin is low (common anode).
+    :param digits_active_low:   True if a digit is on when its select pin is low (common
+                                cathode, or a PNP/P-channel driver).
+    :param streamed:            Send the whole frame in one write. See above.
+    :param repeat:              With streamed=True, the number of times each digit is sent in a
+                                row. Higher numbers keep each digit on for longer.
+    """
+
+    # pylint: disable-next=too-many-arguments
+    def __init__(
+        self,
+        expander,
+        segment_pins,
+        digit_pins,
+        *,
+        segments_active_low=False,
+        digits_active_low=True,
+        streamed=False,
+        repeat=1,
+    ):
+        # pylint: disable=protected-access
+        if streamed and expander._auto_increment:
+            raise ValueError("Streamed writes are not supported by this device.")
+        self._expander = expander
+        self._segment_pins = tuple(segment_pins)
+        self._digit_pins = tuple(digit_pins)
+        self._segments_invert = 0
+        if segments_active_low:
+            self._segments_invert = (1 << len(self._segment_pins)) - 1
+        self._digits_active_low = digits_active_low
+        self._repeat = repeat
+        self._ports = expander._ports
+
+        # The output register with all digits off. Other pins on the expander keep the value
+        # they had when the display was set up.
+        with expander:
+            for pin in self._segment_pins:
+                expander.get_pin(pin).switch_to_output(value=segments_active_low)
+            for pin in self._digit_pins:
+                expander.get_pin(pin).switch_to_output(value=digits_active_low)
+            self._blank = expander._read_port(expander._output_reg)
+
+        self._frame = [0] * len(self._digit_pins)
+        self._words = [self._blank] * len(self._digit_pins)
+        self._stream = None
+        if streamed:
+            size = self._ports * (len(self._digit_pins) * repeat + 1)
+            self._stream = bytearray(1 + size)
+            self._stream[0] = expander._command(expander._output_reg, self._ports)
+        self._digit = 0
+        for i in range(len(self._frame)):
+            self._update_word(i)
+
+        #: The number of full frames sent.
+        self.frames = 0
+        #: The refresh rate, in frames per second, measured over about the last second.
+        self.refresh_rate = 0.0
+        self._window_start = time.monotonic_ns()
+        self._window_frames = 0
+        self._thread = None
+        self._running = False
+
+    def __len__(self):
+        return len(self._frame)
+
+    def __getitem__(self, digit):
+        return self._frame[digit]
+
+    def __setitem__(self, digit, segments):
+        self._frame[digit] = segments
+        self._update_word(digit)
+
+    def fill(self, segments):
+        """Set all of the digits to the same value.
+
+        :param segments:    The segments to light, one bit per segment pin.
+        :return:            Nothing.
+        """
+        for i in range(len(self._frame)):
+            self[i] = segments
+
+    def show(self, text):
+        """Show text on 7-segment digits. Supports 0-9, A-F, '-', '_' and space. A '.' lights
+        the decimal point of the digit before it. The text is aligned to the right, and digits
+        without text are blank.
+
+        :param text:    The text to show.
+        :return:        Nothing.
+        """
+        values = []
+        for char in str(text).upper():
+            if char == "." and values:
+                values[-1] |= _DECIMAL_POINT
+                continue
+            if char == ".":
+                values.append(_DECIMAL_POINT)
+                continue
+            if char not in _FONT:
+                raise ValueError(f"Can not show {char!r} on a 7-segment digit.")
+            values.append(_FONT[char])
+        if len(values) > len(self._frame):
+            raise ValueError(f"{text!r} does not fit in {len(self._frame)} digits.")
+        values = [0] * (len(self._frame) - len(values)) + values
+        for i, segments in enumerate(values):
+            self[i] = segments
+
+    def refresh(self):
+        """Show the next digit, or the whole frame if streamed is set. Call this regularly, at the
+        rate each digit should be shown for.
+
+        :return:        Nothing.
+        """
+        expander = self._expander
+        # pylint: disable=protected-access
+        if self._stream is not None:
+            expander._write_stream(self._stream)
+            self._count_frame()
+            return
+        with expander:
+            expander.flush()
+            expander._bus_write_port(
+                expander._output_reg, self._words[self._digit], self._ports
+            )
+        self._digit += 1
+        if self._digit == len(self._words):
+            self._digit = 0
+            self._count_frame()
+
+    def blank(self):
+        """Turn off all of the digits. The frame buffer is not changed.
+
+        :return:        Nothing.
+        """
+        # pylint: disable=protected-access
+        self._expander._write_port(self._expander._output_reg, self._blank)
+
+    def start(self, digit_time=0.001):
+        """Refresh the display from a background thread until :meth:`stop` is called. Linux
+        only.
+
+        :param digit_time:  The time each digit is shown for, in seconds. With streamed=True,
+                            the time between frames. Set to 0 to refresh as fast as the bus
+                            allows.
+        :return:            Nothing.
+        """
+        import threading  # pylint: disable=import-outside-toplevel
+
+        if self._thread is not None:
+            raise RuntimeError("The display is already being refreshed.")
+        self._running = True
+        self._thread = threading.Thread(
+            target=self._run, args=(digit_time,), daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background thread, and turn off the display.
+
+        :return:        Nothing.
+        """
+        if self._thread is not None:
+            self._running = False
+            self._thread.join()
+            self._thread = None
+            self.blank()
+
+    def _run(self, digit_time):
+        while self._running:
+            self.refresh()
+            if digit_time:
+                time.sleep(digit_time)
+
+    def _update_word(self, digit):
+        # Work out the output register for a digit, and put it in the stream.
+        segments = self._frame[digit] ^ self._segments_invert
+        word = self._blank
+        for i, pin in enumerate(self._segment_pins):
+            if (segments >> i) & 1:
+                word |= 1 << pin
+            else:
+                word &= ~(1 << pin)
+        if self._digits_active_low:
+            word &= ~(1 << self._digit_pins[digit])
+        else:
+            word |= 1 << self._digit_pins[digit]
+        self._words[digit] = word
+
+        if self._stream is not None:
+            # The frame ends with all digits off, so the last digit is not left on longer.
+            ports = self._ports
+            index = 1 + digit * self._repeat * ports
+            for _ in range(self._repeat):
+                for port in range(ports):
+                    self._stream[index] = (word >> (8 * port)) & 0xFF
+                    index += 1
+            index = len(self._stream) - ports
+            for port in range(ports):
+                self._stream[index + port] = (self._blank >> (8 * port)) & 0xFF
+
+    def _count_frame(self):
+        self.frames += 1
+        self._window_frames += 1
+        now = time.monotonic_ns()
+        elapsed = now - self._window_start
+        if elapsed >= 1000000000:
+            self.refresh_rate = self._window_frames * 1000000000 / elapsed
+            self._window_start = now
+            self._window_frames = 0
@@ -0,0 +1,473 @@
+# SPDX-FileCopyrightText: 2023 Pat Satyshur
+#
+# SPDX-License-Identifier: MIT
+
+"""
+`poller`
+====================================================
+
+Polls the inputs of expanders spread over several I2C buses. Each bus is read by its own worker
+thread, so the buses are read at the same time and the time for a cycle is the time of the
+slowest bus instead of the total of all of them.
+
+Each cycle gives a :class:`Snapshot` with the input values of all of the expanders. A snapshot is
+only made once every bus has been read, and is never changed after that, so it is a consistent
+view of one cycle.
+
+.. code-block:: python
+
+    from i2c_expanders.poller import MultiBusPoller
+
+    poller = MultiBusPoller({"i2c-1": [exp1, exp2], "i2c-3": [exp3]})
+    snapshot = poller.poll()
+    print(snapshot.values[exp1], snapshot.bus_cycle_ns["i2c-3"])
+    poller.close()
+
+:class:`AdaptivePoller` reads each expander at a rate that follows its activity. The rate goes
+up to the maximum as soon as an input changes, and falls back toward the minimum while the
+inputs stay the same. All of the expanders share a bus time budget, the rates are lowered
+together if they would use more of the bus than that.
+
+.. code-block:: python
+
+    from i2c_expanders.poller import AdaptivePoller
+
+    poller = AdaptivePoller([exp1, exp2], min_rate=10, max_rate=1000, budget=0.2)
+    while True:
+        for expander, value in poller.update():
+            print(expander, hex(value))
+
+This is meant for Linux (Blinka). MultiBusPoller is for more than one I2C bus. CircuitPython
+does not have threads.
+
+* Author(s): Pat Satyshur
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+__version__ = "0.0.0+auto.0"
+__repo__ = "https://github.com/ilikecake/CircuitPython_I2C_Expanders.git"
+
+
+class Snapshot:  # pylint: disable=too-few-public-methods
+    """The input values of all of the expanders from one poll cycle. Do not change these.
+
+    * cycle: The number of the cycle, starting at 1.
+    * timestamp_ns: When the cycle started, from time.monotonic_ns.
+    * values: The value of the gpio register of each expander, keyed by the expander object.
+    * bus_cycle_ns: The time it took to read each bus, in nanoseconds, keyed by bus.
+    * cycle_ns: The time it took to read all of the buses, in nanoseconds.
+    * errors: The error from each expander that could not be read, keyed by the expander
+      object. These expanders are not in values.
+    """
+
+    __slots__ = (
+        "cycle",
+        "timestamp_ns",
+        "values",
+        "bus_cycle_ns",
+        "cycle_ns",
+        "errors",
+    )
+
+    # pylint: disable-next=too-many-arguments
+    def __init__(
+        self, cycle, timestamp_ns, values, bus_cycle_ns, cycle_ns, errors=None
+    ):
+        self.cycle = cycle
+        self.timestamp_ns = timestamp_ns
+        self.values = values
+        self.bus_cycle_ns = bus_cycle_ns
+        self.cycle_ns = cycle_ns
+        self.errors = {} if errors is None else errors
+
+
+class MultiBusPoller:
+    """Reads the gpio register of every expander, with one thread per bus.
+
+    :param buses:   A dict with the expanders on each bus, as {bus: [expander, ...]}. The keys
+                    can be anything that names the bus, like the bus object or "i2c-1". Use
+                    :meth:`group_by_bus` to make this from a list of expanders.
+    """
+
+    def __init__(self, buses):
+        self._buses = {bus: tuple(expanders) for bus, expanders in buses.items()}
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, len(self._buses)), thread_name_prefix="i2c-poller"
+        )
+        self._cycle = 0
+        self._snapshot = None
+        self._thread = None
+        self._stop = threading.Event()
+
+        #: The number of times reading an expander or a bus failed.
+        self.failures = 0
+        #: The last error from reading an expander, or from the callback when polling in the
+        #: background, or None.
+        self.error = None
+
+    @staticmethod
+    def group_by_bus(expanders):
+        """Sort expanders by the I2C bus they are on.
+
+        :param expanders:   The expanders to sort.
+        :return:            A dict of {bus: [expander, ...]}, keyed by the I2C bus object.
+        """
+        buses = {}
+        for expander in expanders:
+            # pylint: disable-next=protected-access
+            buses.setdefault(expander._device.i2c, []).append(expander)
+        return buses
+
+    @property
+    def snapshot(self):
+        """The :class:`Snapshot` from the last poll cycle, or None if nothing has been polled
+        yet. Read only.
+        """
+        return self._snapshot
+
+    def poll(self):
+        """Read all of the expanders once. The buses are read at the same time. If reading an
+        expander fails with an OSError, the other expanders are still read. The error is put in
+        the errors of the snapshot, and the last one in :attr:`error`. Any other error is put
+        in :attr:`error` and raised after all of the buses have been read, and the snapshot is
+        not updated.
+
+        :return:        The new :class:`Snapshot`.
+        """
+        start = time.monotonic_ns()
+        futures = {
+            bus: self._executor.submit(_read_bus, expanders)
+            for bus, expanders in self._buses.items()
+        }
+        values = {}
+        bus_cycle_ns = {}
+        errors = {}
+        error = None
+        for bus, future in futures.items():
+            try:
+                bus_values, bus_errors, bus_cycle_ns[bus] = future.result()
+            except Exception as err:  # pylint: disable=broad-exception-caught
+                self.failures += 1
+                error = err
+                continue
+            values.update(bus_values)
+            errors.update(bus_errors)
+        for err in errors.values():
+            self.failures += 1
+            self.error = err
+        if error is not None:
+            self.error = error
+            raise error
+        self._cycle += 1
+        snapshot = Snapshot(
+            self._cycle,
+            start,
+            values,
+            bus_cycle_ns,
+            time.monotonic_ns() - start,
+            errors,
+        )
+        self._snapshot = snapshot
+        return snapshot
+
+    def start(self, interval=0.01, callback=None):
+        """Poll continuously in a background thread until :meth:`stop` is called. Get the latest
+        values from :attr:`snapshot`, or pass a callback.
+
+        :param interval:    The time in seconds from the start of one cycle to the start of the
+                            next. If a cycle takes longer than this, the next one starts right
+                            away.
+        :param callback:    Called with each new :class:`Snapshot`, from the background thread.
+                            Expanders that could not be read are in the errors of the snapshot,
+                            polling goes on with the others. Errors raised by the poll or the
+                            callback are put in :attr:`error`, and polling goes on.
+        :return:            Nothing.
+        """
+        if self._thread is not None:
+            raise RuntimeError("The poller is already running.")
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, args=(interval, callback), daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """Stop polling in the background, and wait for the current cycle to finish.
+
+        :return:        Nothing.
+        """
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def close(self):
+        """Stop polling and shut down the worker threads.
+
+        :return:        Nothing.
+        """
+        self.stop()
+        self._executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+    def _run(self, interval, callback):
+        interval_ns = int(interval * 1000000000)
+        next_cycle = time.monotonic_ns()
+        while not self._stop.is_set():
+            try:
+                snapshot = self.poll()
+                if callback is not None:
+                    callback(snapshot)
+            except Exception as err:  # pylint: disable=broad-exception-caught
+                # poll has already stored its own errors. Keep the thread running, a bad cycle
+                # or a bug in the callback should not stop the polling for good.
+                self.error = err
+            next_cycle += interval_ns
+            delay = next_cycle - time.monotonic_ns()
+            if delay < 0:
+                # Running behind, do not try to catch up.
+                next_cycle = time.monotonic_ns()
+            else:
+                self._stop.wait(delay / 1000000000)
+
+
+def _read_bus(expanders):
+    # Read the inputs of all of the expanders on one bus. Runs in a worker thread. An expander
+    # that does not answer does not stop the others from being read.
+    start = time.monotonic_ns()
+    values = {}
+    errors = {}
+    for expander in expanders:
+        try:
+            values[expander] = expander.gpio
+        except OSError as err:
+            errors[expander] = err
+    return values, errors, time.monotonic_ns() - start
+
+
+class _Input:  # pylint: disable=too-few-public-methods
+    # The polling state of one expander in an AdaptivePoller.
+
+    __slots__ = ("expander", "rate", "next_ns", "value", "changed_ns", "read_ns")
+
+    def __init__(self, expander, rate, now):
+        self.expander = expander
+        # The rate the activity asks for, in reads per second, before the budget.
+        self.rate = rate
+        # When the next read is due.
+        self.next_ns = now
+        self.value = None
+        # When the inputs last changed, or None if they have not changed since the first read.
+        self.changed_ns = None
+        # The average time a read takes, in nanoseconds.
+        self.read_ns = 0
+
+
+class AdaptivePoller:  # pylint: disable=too-many-instance-attributes
+    """Reads the gpio register of expanders at rates that follow their activity.
+
+    :param expanders:   The expanders to read.
+    :param min_rate:    The lowest rate, in reads per second, for an expander with no activity.
+    :param max_rate:    The rate right after an input of an expander changes.
+    :param decay:       The time in seconds for the rate to halve while the inputs stay the same.
+    :param budget:      The largest part of the bus time the reads may use, from 0 to 1. If the
+                        rates would use more than this, they are all lowered by the same factor,
+                        even below min_rate.
+    :param callback:    Optional. Called with (expander, value) when the inputs of an expander
+                        change.
+    """
+
+    # pylint: disable-next=too-many-arguments
+    def __init__(
+        self,
+        expanders,
+        *,
+        min_rate=10.0,
+        max_rate=1000.0,
+        decay=0.5,
+        budget=0.5,
+        callback=None,
+    ):
+        if not 0 < min_rate <= max_rate:
+            raise ValueError("Need 0 < min_rate <= max_rate")
+        if not 0 < budget <= 1:
+            raise ValueError("budget must be more than 0 and at most 1")
+        self._min_rate = min_rate
+        self._max_rate = max_rate
+        self._decay_ns = decay * 1000000000
+        self._budget = budget
+        self._callback = callback
+        now = time.monotonic_ns()
+        self._inputs = [_Input(expander, min_rate, now) for expander in expanders]
+        # The factor the rates are multiplied by to stay within the budget.
+        self._scale = 1.0
+        self._thread = None
+        self._stop = threading.Event()
+
+        #: The number of reads done.
+        self.reads = 0
+        #: The number of reads that found a change.
+        self.changes = 0
+        #: The number of reads that failed.
+        self.failures = 0
+        #: The last error from reading an expander, or from the callback when polling in the
+        #: background, or None.
+        self.error = None
+        #: The part of the bus time used by the reads, measured over about the last second.
+        self.measured_utilization = 0.0
+        self._window_start = now
+        self._window_busy_ns = 0
+
+    @property
+    def values(self):
+        """The last value read from each expander, as a dict of {expander: value}. Read only."""
+        return {item.expander: item.value for item in self._inputs}
+
+    @property
+    def utilization(self):
+        """The part of the bus time the reads use at the current rates, from 0 to 1. Read
+        only.
+        """
+        return self._load() * self._scale
+
+    @property
+    def next_deadline(self):
+        """When the next read is due, in nanoseconds from time.monotonic_ns, or None if there
+        are no expanders. Read only.
+        """
+        if not self._inputs:
+            return None
+        return min(item.next_ns for item in self._inputs)
+
+    def rate(self, expander):
+        """The current rate of an expander, after the budget.
+
+        :param expander:    The expander.
+        :return:            The rate in reads per second.
+        """
+        for item in self._inputs:
+            if item.expander is expander:
+                return item.rate * self._scale
+        raise ValueError("The expander is not polled.")
+
+    def update(self):
+        """Read the expanders that are due. Call this as often as possible from the main
+        loop. If reading an expander fails with an OSError, the error is put in :attr:`error`,
+        the others are still read, and it is tried again at its current rate.
+
+        :return:        A list of (expander, value) for the expanders whose inputs changed.
+        """
+        changed = []
+        now = time.monotonic_ns()
+        for item in self._inputs:
+            if now < item.next_ns:
+                continue
+            start = time.monotonic_ns()
+            try:
+                value = item.expander.gpio
+            except OSError as err:
+                self.failures += 1
+                self.error = err
+                continue
+            end = time.monotonic_ns()
+            took = end - start
+            if item.read_ns:
+                item.read_ns = (item.read_ns * 7 + took) // 8
+            else:
+                item.read_ns = took
+            self._window_busy_ns += took
+            self.reads += 1
+            if self._set_rate(item, value, end):
+                changed.append((item.expander, value))
+            item.value = value
+        self._apply_budget()
+        for item in self._inputs:
+            if now >= item.next_ns:
+                item.next_ns = now + int(1000000000 / (item.rate * self._scale))
+
+        elapsed = now - self._window_start
+        if elapsed >= 1000000000:
+            self.measured_utilization = self._window_busy_ns / elapsed
+            self._window_start = now
+            self._window_busy_ns = 0
+
+        if self._callback is not None:
+            for expander, value in changed:
+                self._callback(expander, value)
+        return changed
+
+    def start(self):
+        """Poll in a background thread until :meth:`stop` is called. Use the callback to get the
+        changes. Errors raised by the callback are put in :attr:`error`, and polling goes on.
+
+        :return:        Nothing.
+        """
+        if self._thread is not None:
+            raise RuntimeError("The poller is already running.")
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop polling in the background.
+
+        :return:        Nothing.
+        """
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.update()
+            except Exception as err:  # pylint: disable=broad-exception-caught
+                # A bug in the callback should not stop the polling for good.
+                self.error = err
+            deadline = self.next_deadline
+            if deadline is None:
+                # Nothing to poll.
+                self._stop.wait(1 / self._min_rate)
+                continue
+            delay = deadline - time.monotonic_ns()
+            if delay > 0:
+                self._stop.wait(delay / 1000000000)
+
+    def _set_rate(self, item, value, now):
+        # Set the rate of an expander from a new value read from it. Returns True if the value
+        # changed.
+        if item.value is not None and value != item.value:
+            self.changes += 1
+            item.rate = self._max_rate
+            item.changed_ns = now
+            return True
+        if item.changed_ns is None:
+            # The first read only gives the starting value, it is not activity.
+            item.rate = self._min_rate
+        else:
+            idle = now - item.changed_ns
+            item.rate = max(
+                self._min_rate, self._max_rate * 0.5 ** (idle / self._decay_ns)
+            )
+        return False
+
+    def _load(self):
+        # The part of the bus time the reads would use at the rates the activity asks for.
+        return sum(item.rate * item.read_ns for item in self._inputs) / 1000000000
+
+    def _apply_budget(self):
+        load = self._load()
+        if load > self._budget:
+            self._scale = self._budget / load
+        else:
+            self._scale = 1.0
@@ -0,0 +1,326 @@
+# SPDX-FileCopyrightText: 2023 Pat Satyshur
+#
+# SPDX-License-Identifier: MIT
+
+"""
+`pwm`
+====================================================
+
+Software PWM on the outputs of an expander, for dimming LEDs. All of the PWM pins of an expander
+share one period. The pins turn on at the start of the period and each one turns off at its own
+duty cycle. The value of the output register at each of these edges is worked out when a duty
+cycle changes, so playing a period takes one write of the output register per distinct edge,
+no matter how many pins there are.
+
+There are three ways to run it:
+
+* :meth:`SoftPWM.update` from the main loop. It writes the output register if an edge has passed
+  since the last call. The timing is only as good as how often it is called.
+* :meth:`SoftPWM.start` on Linux, which plays the edges from a background thread.
+* streamed=True, which splits the period into steps and sends the output register value for
+  every step back to back in one write. The bus clock sets the timing, so there is very little
+  jitter, but the frequency is set by the bus speed and the number of steps. Only on devices
+  that wrap the register address (PCA9555, PCA9554 and the PCAL parts), not the TCA6424.
+
+Only the PWM pins are changed, so the other outputs of the expander can still be used while the
+PWM runs. The PWM turns on the shadow of the expander (see I2c_Expander.enable_shadow) and builds
+each write from the last value written to the output register, so a write is one bus transfer
+with no read before it.
+
+The achieved frequency and the jitter (the difference between the longest and shortest period)
+are measured over about the last second.
+
+.. code-block:: python
+
+    from i2c_expanders.pwm import SoftPWM
+
+    pwm = SoftPWM(expander, pins=(0, 1, 2), frequency=100)
+    pwm.set_duty_cycle(0, 0x4000)   # 25%
+    while True:
+        pwm.update()
+
+* Author(s): Pat Satyshur
+"""
+
+import time
+
+__version__ = "0.0.0+auto.0"
+__repo__ = "https://github.com/ilikecake/CircuitPython_I2C_Expanders.git"
+
+
+class SoftPWM:  # pylint: disable=too-many-instance-attributes
+    """Software PWM for the pins of an expander. The duty cycles are 16 bit, the same as
+    pwmio.PWMOut.duty_cycle.
+
+    :param expander:    The expander the pins are on.
+    :param pins:        The pin numbers to use for PWM. The pins are set to outputs. The first
+                        pin is PWM channel 0.
+    :param frequency:   The PWM frequency in Hz. Not used with streamed=True.
+    :param streamed:    Send a whole period in one write. See above.
+    :param steps:       With streamed=True, the number of steps in a period.
+    """
+
+    # pylint: disable-next=too-many-arguments
+    def __init__(self, expander, pins, *, frequency=100, streamed=False, steps=16):
+        # pylint: disable=protected-access
+        if streamed and expander._auto_increment:
+            raise ValueError("Streamed writes are not supported by this device.")
+        self._expander = expander
+        self._pins = tuple(pins)
+        self._duty = [0] * len(self._pins)
+        self._ports = expander._ports
+        self._period_ns = int(1000000000 / frequency)
+        self._steps = steps
+
+        self._mask = 0
+        for pin in self._pins:
+            self._mask |= 1 << pin
+        with expander:
+            if expander._shadow is None:
+                # Keeps the output word, so the writes do not need to read it first.
+                expander.enable_shadow()
+            for pin in self._pins:
+                expander.get_pin(pin).switch_to_output(value=False)
+            # The other pins of the output register, for the streamed writes.
+            self._others = self._outputs() & ~self._mask
+
+        # The edges of a period as a list of (time, PWM pins) with the time in nanoseconds from
+        # the start of the period. The first edge is at 0.
+        self._edges = [(0, 0)]
+        self._stream = None
+        if streamed:
+            self._stream = bytearray(1 + steps * self._ports)
+            self._stream[0] = expander._command(expander._output_reg, self._ports)
+        self._build()
+
+        self._edge = None
+        self._period_start = None
+        self._thread = None
+        self._running = False
+
+        #: The number of writes to the output register.
+        self.writes = 0
+        #: The measured PWM frequency in Hz.
+        self.frequency = 0.0
+        #: The difference between the longest and shortest period, in nanoseconds.
+        self.jitter_ns = 0
+        self._window_start = None
+        self._last_period = None
+        self._window_periods = 0
+        self._min_period = None
+        self._max_period = 0
+
+    @property
+    def channels(self):
+        """The number of PWM channels. Read only."""
+        return len(self._pins)
+
+    @property
+    def edges(self):
+        """The number of distinct edges in a period, and so the number of writes per period.
+        Read only.
+        """
+        if self._stream is not None:
+            return 1
+        return len(self._edges)
+
+    def duty_cycle(self, channel):
+        """Get the duty cycle of a channel.
+
+        :param channel: The PWM channel.
+        :return:        The duty cycle, 0 to 65535.
+        """
+        return self._duty[channel]
+
+    def set_duty_cycle(self, channel, duty_cycle):
+        """Set the duty cycle of a channel. Takes effect at the next period.
+
+        :param channel:     The PWM channel.
+        :param duty_cycle:  The duty cycle, 0 (always off) to 65535 (always on).
+        :return:            Nothing.
+        """
+        if not 0 <= duty_cycle <= 0xFFFF:
+            raise ValueError("duty_cycle must be 0-65535")
+        self._duty[channel] = duty_cycle
+        self._build()
+
+    def update(self):
+        """Write the output register if an edge has passed since the last call. With
+        streamed=True, send one period. Call this as often as possible.
+
+        :return:        True if the output register was written.
+        """
+        now = time.monotonic_ns()
+        if self._stream is not None:
+            self._write_period()
+            self._count_period(now)
+            return True
+        if self._period_start is None or now - self._period_start >= self._period_ns:
+            if self._period_start is None:
+                self._period_start = now
+            else:
+                # Stay in step with the period, unless more than a period was missed.
+                self._period_start += self._period_ns
+                if now - self._period_start >= self._period_ns:
+                    self._period_start = now
+            self._edge = None
+        phase = now - self._period_start
+        edge = 0
+        for i in range(1, len(self._edges)):
+            if self._edges[i][0] > phase:
+                break
+            edge = i
+        if edge == self._edge:
+            return False
+        self._edge = edge
+        self._write(self._edges[edge][1])
+        if edge == 0:
+            self._count_period(now)
+        return True
+
+    def start(self):
+        """Play the PWM from a background thread until :meth:`stop` is called. Linux only.
+
+        :return:        Nothing.
+        """
+        import threading  # pylint: disable=import-outside-toplevel
+
+        if self._thread is not None:
+            raise RuntimeError("The PWM is already running.")
+        self._running = True
+        self._restart_measurement()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background thread, and turn off all of the PWM pins.
+
+        :return:        Nothing.
+        """
+        if self._thread is not None:
+            self._running = False
+            self._thread.join()
+            self._thread = None
+        self._period_start = None
+        self._restart_measurement()
+        self._write(0)
+
+    def _run(self):
+        if self._stream is not None:
+            while self._running:
+                self.update()
+            return
+        start = time.monotonic_ns()
+        while self._running:
+            for offset, word in self._edges:
+                due = start + offset
+                delay = due - time.monotonic_ns()
+                if delay > 2000000:
+                    # Sleep for most of the wait, and spin for the rest.
+                    time.sleep((delay - 1000000) / 1000000000)
+                while time.monotonic_ns() < due:
+                    pass
+                self._write(word)
+                if not offset:
+                    self._count_period(time.monotonic_ns())
+            start += self._period_ns
+            if time.monotonic_ns() - start > self._period_ns:
+                # More than a period behind, start again from now.
+                start = time.monotonic_ns()
+
+    def _write(self, word):
+        # Set the PWM pins, and keep the others.
+        expander = self._expander
+        # pylint: disable=protected-access
+        with expander:
+            expander.flush()
+            old = self._outputs()
+            new = (old & ~self._mask) | word
+            if new != old:
+                expander._bus_write_port(expander._output_reg, new, self._ports)
+                self.writes += 1
+
+    def _write_period(self):
+        # Send a whole period in one write, with the current values of the other pins.
+        expander = self._expander
+        # pylint: disable=protected-access
+        with expander:
+            expander.flush()
+            others = self._outputs() & ~self._mask
+            if others != self._others:
+                self._others = others
+                self._build()
+            expander._write_stream(self._stream)
+        self.writes += 1
+
+    def _outputs(self):
+        # The output register, from the shadow. Read from the device only if the shadow has been
+        # turned off. Call with the expander held and the write queue flushed.
+        expander = self._expander
+        # pylint: disable=protected-access
+        val = expander._shadow_port(expander._output_reg, self._ports)
+        if val is None:
+            val = expander._bus_read_port(expander._output_reg, self._ports)
+        return val
+
+    def _build(self):
+        # Work out the edges of a period from the duty cycles.
+        on_word = 0
+        off_times = []
+        for pin, duty in zip(self._pins, self._duty):
+            if duty:
+                on_word |= 1 << pin
+                if duty < 0xFFFF:
+                    off_times.append((duty * self._period_ns // 0xFFFF, pin))
+        off_times.sort()
+        edges = [(0, on_word)]
+        word = on_word
+        for when, pin in off_times:
+            word &= ~(1 << pin)
+            if when == edges[-1][0]:
+                edges[-1] = (when, word)
+            else:
+                edges.append((when, word))
+        self._edges = edges
+
+        if self._stream is not None:
+            ports = self._ports
+            steps = self._steps
+            index = 1
+            for step in range(steps):
+                word = self._others
+                for pin, duty in zip(self._pins, self._duty):
+                    # Round to the nearest step.
+                    if step < (duty * steps + 0x7FFF) // 0xFFFF:
+                        word |= 1 << pin
+                for port in range(ports):
+                    self._stream[index] = (word >> (8 * port)) & 0xFF
+                    index += 1
+
+    def _restart_measurement(self):
+        # Start measuring the frequency and jitter again, after a gap in the output.
+        self._window_start = None
+        self._last_period = None
+        self._window_periods = 0
+        self._min_period = None
+        self._max_period = 0
+
+    def _count_period(self, start):
+        # Measure the frequency and jitter from the start times of the periods.
+        if self._window_start is None:
+            self._window_start = start
+            self._last_period = start
+            return
+        period = start - self._last_period
+        self._last_period = start
+        self._window_periods += 1
+        if self._min_period is None or period < self._min_period:
+            self._min_period = period
+        self._max_period = max(self._max_period, period)
+        elapsed = start - self._window_start
+        if elapsed >= 1000000000:
+            self.frequency = self._window_periods * 1000000000 / elapsed
+            self.jitter_ns = self._max_period - self._min_period
+            self._restart_measurement()
+            self._window_start = start
+            self._last_period = start
@@ -0,0 +1,224 @@
+# SPDX-FileCopyrightText: 2023 Pat Satyshur
+#
+# SPDX-License-Identifier: MIT
+
+"""
+`scheduler`
+====================================================
+
+Timed output changes for expander pins that do not block. Instead of
+
+.. code-block:: python
+
+    pin.value = True
+    time.sleep(0.1)
+    pin.value = False
+
+schedule the change and keep going:
+
+.. code-block:: python
+
+    from i2c_expanders.scheduler import Scheduler
+
+    scheduler = Scheduler()
+    scheduler.pulse(pin, 0.1)
+    while True:
+        scheduler.update()
+        # Do other things here.
+
+The changes are made by :meth:`Scheduler.update`, so call it often. Changes that are due at the
+same time for pins on the same expander are made with one write of the output register. Changes
+to the same pin are never combined: each one gets its own write, in order. A pulse that is
+shorter than the time between calls to update is made late and short, but it is not lost.
+
+The pins must already be outputs, see DigitalInOut.switch_to_output. The scheduler turns on the
+shadow of the expanders it drives (see I2c_Expander.enable_shadow), so each write is made from
+the last value written to the output register, without reading it first.
+
+If a write fails, the changes that were not made stay scheduled and the error is raised. The next
+call to update tries them again.
+
+* Author(s): Pat Satyshur
+"""
+
+import time
+
+__version__ = "0.0.0+auto.0"
+__repo__ = "https://github.com/ilikecake/CircuitPython_I2C_Expanders.git"
+
+
+class Scheduler:
+    """Makes timed changes to expander output pins. Times are in nanoseconds from
+    time.monotonic_ns, durations and delays are in seconds.
+
+    :param tick:    Changes due within this many seconds of each other are made together. This
+                    lets changes that are almost due go out in the same write as the ones that
+                    are due, at the cost of making them up to tick seconds early.
+    """
+
+    def __init__(self, tick=0.0):
+        self._tick_ns = int(tick * 1000000000)
+        # Changes that are waiting, as [when, expander, mask, bits], sorted by when. A sorted list
+        # is used instead of heapq, which is not on all CircuitPython boards.
+        self._pending = []
+
+        #: The number of pin changes made.
+        self.edges = 0
+        #: The number of writes to the output registers.
+        self.writes = 0
+        #: The latest a change was made after it was due, in nanoseconds.
+        self.max_late_ns = 0
+
+    def __len__(self):
+        return len(self._pending)
+
+    @property
+    def next_deadline(self):
+        """The time of the next change, in nanoseconds from time.monotonic_ns, or None if nothing
+        is scheduled. Read only.
+        """
+        if not self._pending:
+            return None
+        return self._pending[0][0]
+
+    def set_at(self, pin, value, when):
+        """Set a pin to a value at a time.
+
+        :param pin:     A DigitalInOut from an expander.
+        :param value:   The value to set the pin to.
+        :param when:    The time to set it, in nanoseconds from time.monotonic_ns.
+        :return:        Nothing.
+        """
+        # pylint: disable=protected-access
+        expander = pin._ioexp
+        if expander._shadow is None:
+            # Keeps the output word, so the writes do not need to read it first.
+            expander.enable_shadow()
+        mask = pin._mask
+        entry = [when, expander, mask, mask if value else 0]
+        pending = self._pending
+        # Insert after the changes with the same time, so they are made in order.
+        low = 0
+        high = len(pending)
+        while low < high:
+            mid = (low + high) // 2
+            if pending[mid][0] <= when:
+                low = mid + 1
+            else:
+                high = mid
+        pending.insert(low, entry)
+
+    def set_after(self, pin, value, delay):
+        """Set a pin to a value after a delay.
+
+        :param pin:     A DigitalInOut from an expander.
+        :param value:   The value to set the pin to.
+        :param delay:   The delay in seconds.
+        :return:        Nothing.
+        """
+        self.set_at(pin, value, time.monotonic_ns() + int(delay * 1000000000))
+
+    def pulse(self, pin, duration, value=True):
+        """Set a pin to a value now, then back after a time. The first change is made by the next
+        call to :meth:`update`.
+
+        :param pin:         A DigitalInOut from an expander.
+        :param duration:    The length of the pulse in seconds.
+        :param value:       The value during the pulse. Defaults to True (high).
+        :return:            Nothing.
+        """
+        now = time.monotonic_ns()
+        self.set_at(pin, value, now)
+        self.set_at(pin, not value, now + int(duration * 1000000000))
+
+    def cancel(self, pin):
+        """Remove all of the scheduled changes for a pin.
+
+        :param pin:     A DigitalInOut from an expander.
+        :return:        Nothing.
+        """
+        # pylint: disable=protected-access
+        expander = pin._ioexp
+        mask = pin._mask
+        pending = []
+        for entry in self._pending:
+            if entry[1] is expander and entry[2] & mask:
+                entry[2] &= ~mask
+                entry[3] &= ~mask
+                if not entry[2]:
+                    continue
+            pending.append(entry)
+        self._pending = pending
+
+    def clear(self):
+        """Remove all of the scheduled changes.
+
+        :return:        Nothing.
+        """
+        self._pending = []
+
+    def update(self):
+        """Make the changes that are due. If a write fails, the changes in it and the ones after
+        it stay scheduled, and the error is raised.
+
+        :return:        The number of writes done.
+        """
+        pending = self._pending
+        if not pending:
+            return 0
+        now = time.monotonic_ns()
+        limit = now + self._tick_ns
+        if pending[0][0] > limit:
+            return 0
+
+        # Combine the changes into as few writes as possible, in time order. A change joins the
+        # last write for its expander, unless that write already changes one of its pins. Then it
+        # needs a write of its own after that one, so the pin sees both changes.
+        writes = []
+        last = {}
+        count = 0
+        for entry in pending:
+            when, expander, mask, bits = entry
+            if when > limit:
+                break
+            count += 1
+            write = last.get(expander)
+            if write is not None and not write[1] & mask:
+                write[1] |= mask
+                write[2] |= bits
+                write[3].append(entry)
+            else:
+                write = [expander, mask, bits, [entry]]
+                writes.append(write)
+                last[expander] = write
+
+        done = 0
+        try:
+            for expander, mask, bits, _ in writes:
+                # pylint: disable-next=protected-access
+                expander._update_port(expander._output_reg, mask, bits)
+                done += 1
+        finally:
+            self._remove_made(writes[:done], count, now)
+        return done
+
+    def _remove_made(self, made, count, now):
+        # Remove the changes in the writes that were made from the first 'count' changes, and
+        # count them. The others are tried again by the next update.
+        pending = self._pending
+        total = 0
+        for write in made:
+            total += len(write[3])
+            for entry in write[3]:
+                self.max_late_ns = max(self.max_late_ns, now - entry[0])
+        if total == count:
+            del pending[:count]
+        elif total:
+            ids = set()
+            for write in made:
+                ids.update(id(entry) for entry in write[3])
+            pending[:count] = [
+                entry for entry in pending[:count] if id(entry) not in ids
+            ]
+        self.edges += total
+        self.writes += len(made)
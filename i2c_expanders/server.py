@@ -0,0 +1,544 @@
+# SPDX-FileCopyrightText: 2023 Pat Satyshur
+#
+# SPDX-License-Identifier: MIT
+
+"""
+`server`
+====================================================
+
+Shares expanders between processes on Linux. An :class:`ExpanderServer` owns the expander objects
+and the bus, and listens on a Unix domain socket. Other processes connect with
+:class:`Connection` and get :class:`ExpanderClient` objects, which have the same properties and
+methods as the driver class of the expander on the server (PCA9555, PCAL9555, ...), including
+get_pin.
+
+Every operation runs on the server, one request at a time, so read-modify-write operations from
+different processes do not overwrite each other's changes. For example, two processes can set
+different pins of the same expander without any locking of their own.
+
+Operations that do not return anything (writes, and setting properties) can be batched. In a
+batch, they are held by the client and sent in one request with the next operation that returns
+a value, or at the end of the batch. The server combines the writes in a request to the same
+register into one write (see
+:meth:`~i2c_expanders.i2c_expander.I2c_Expander.enable_write_combining`). Using an
+:class:`ExpanderClient` in a with block makes a batch, so setting up a pin with
+switch_to_output takes one request, and as few bus transactions as possible.
+
+.. code-block:: python
+
+    # In the process that owns the bus:
+    from i2c_expanders.server import ExpanderServer
+
+    server = ExpanderServer("/tmp/expanders.sock", {"io1": expander1, "io2": expander2})
+    server.serve_forever()
+
+    # In any other process:
+    from i2c_expanders.server import Connection
+
+    connection = Connection("/tmp/expanders.sock")
+    io1 = connection.expander("io1")
+    pin = io1.get_pin(3)
+    pin.switch_to_output(value=True)
+    with connection.batch():
+        io1.gpio = 0x00FF
+        connection.expander("io2").gpio = 0xFF00
+
+The requests and replies are lines of JSON, so the server can also be used from other languages.
+The server and clients can be tested without hardware by giving the server expanders on a
+:class:`~i2c_expanders.transport.FakeI2CBus`.
+
+This is meant for Linux. It is not supported on CircuitPython.
+
+* Author(s): Pat Satyshur
+"""
+
+import json
+import os
+import socket
+import socketserver
+import threading
+
+from i2c_expanders.digital_inout import DigitalInOut
+from i2c_expanders.helpers import Direction, DriveMode, Pull
+
+__version__ = "0.0.0+auto.0"
+__repo__ = "https://github.com/ilikecake/CircuitPython_I2C_Expanders.git"
+
+# The digitalio style constants, by name. These are sent as {"constant": name}.
+_CONSTANTS = {}
+for _group in (Direction, DriveMode, Pull):
+    for _key in dir(_group):
+        if not _key.startswith("_"):
+            _CONSTANTS[repr(getattr(_group, _key))] = getattr(_group, _key)
+
+# Methods and properties of the expanders that are not available to the clients. get_pin is done
+# by the client. The rest set up or report on the expander in the process that owns it, and would
+# change it for every client, or return objects that can not be sent.
+_LOCAL_NAMES = (
+    "get_pin",
+    "enable_locking",
+    "lock_stats",
+    "enable_write_combining",
+    "disable_write_combining",
+    "write_queue",
+    "flush",
+    "flush_if_due",
+    "enable_read_cache",
+    "disable_read_cache",
+    "read_cache",
+    "invalidate_reads",
+    "enable_shadow",
+    "shadow",
+    "readinto_register",
+    "write_register_from",
+)
+
+# The errors that are sent back to the client as the same type. Others become RuntimeError.
+_ERRORS = {
+    "ValueError": ValueError,
+    "TypeError": TypeError,
+    "NotImplementedError": NotImplementedError,
+    "OSError": OSError,
+    "KeyError": KeyError,
+    "AttributeError": AttributeError,
+}
+
+
+def _encode(value):
+    # Make a value JSON safe. The digitalio style constants are sent by name.
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, (list, tuple)):
+        return [_encode(item) for item in value]
+    if isinstance(value, dict):
+        return {key: _encode(item) for key, item in value.items()}
+    for name, constant in _CONSTANTS.items():
+        # The library constant on the left, it also matches the digitalio constants.
+        if constant == value:
+            return {"constant": name}
+    raise TypeError(f"Can not send {value!r} to the expander server.")
+
+
+def _decode(value):
+    if isinstance(value, list):
+        return [_decode(item) for item in value]
+    if isinstance(value, dict):
+        if "constant" in value and len(value) == 1:
+            return _CONSTANTS[value["constant"]]
+        return {key: _decode(item) for key, item in value.items()}
+    return value
+
+
+class ExpanderServer:
+    """Serves expanders to other processes over a Unix domain socket.
+
+    The server turns on write combining for all of the expanders, and sends the combined writes
+    at the end of each request. Do not use the expanders directly while the server is running.
+
+    :param path:        The path of the socket to create. An old socket at this path is
+                        removed.
+    :param expanders:   The expanders to serve, as a dict of {name: expander}. The clients use
+                        the names to pick an expander.
+    """
+
+    def __init__(self, path, expanders):
+        self.path = path
+        self._expanders = dict(expanders)
+        self._lock = threading.Lock()
+        self._descriptions = {}
+        for name, expander in self._expanders.items():
+            expander.enable_write_combining(None)
+            self._descriptions[name] = self._describe(expander)
+
+        #: The number of requests handled.
+        self.requests = 0
+        #: The number of operations handled.
+        self.operations = 0
+
+        if os.path.exists(path):
+            os.unlink(path)
+        server = self
+
+        class _Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    reply = server.handle_request(line)
+                    self.wfile.write(reply)
+
+        self._server = socketserver.ThreadingUnixStreamServer(path, _Handler)
+        self._server.daemon_threads = True
+        self._thread = None
+
+    def serve_forever(self):
+        """Handle requests until :meth:`close` is called from another thread.
+
+        :return:        Nothing.
+        """
+        self._server.serve_forever()
+
+    def start(self):
+        """Handle requests in a background thread.
+
+        :return:        Nothing.
+        """
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+
+    def close(self):
+        """Stop the server and remove the socket. The writes waiting in the expanders are sent,
+        and write combining is turned off again.
+
+        :return:        Nothing.
+        """
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._server.server_close()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        with self._lock:
+            for expander in self._expanders.values():
+                expander.disable_write_combining()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+    def handle_request(self, line):
+        """Run one request, and return the reply. This is what the socket handler uses. It can
+        also be called directly to test the server without a socket.
+
+        :param line:    The request, a line of JSON as bytes.
+        :return:        The reply, a line of JSON as bytes.
+        """
+        try:
+            request = json.loads(line)
+        except ValueError as err:
+            return self._reply({"error": "ValueError", "message": str(err)})
+        if not isinstance(request, dict):
+            return self._reply(
+                {"error": "ValueError", "message": "The request must be a JSON object."}
+            )
+        reply = {"id": request.get("id")}
+        results = []
+        touched = []
+        with self._lock:
+            self.requests += 1
+            try:
+                for operation in request["ops"]:
+                    self.operations += 1
+                    expander = self._expanders[operation[1]]
+                    if expander not in touched:
+                        touched.append(expander)
+                    results.append(_encode(self._run(operation, expander)))
+            except Exception as err:  # pylint: disable=broad-exception-caught
+                reply["error"] = type(err).__name__
+                reply["message"] = str(err)
+                reply["index"] = len(results)
+            finally:
+                for expander in touched:
+                    try:
+                        expander.flush()
+                    except Exception as err:  # pylint: disable=broad-exception-caught
+                        if "error" not in reply:
+                            reply["error"] = type(err).__name__
+                            reply["message"] = str(err)
+                            reply["index"] = len(results)
+        reply["results"] = results
+        return self._reply(reply)
+
+    @staticmethod
+    def _reply(reply):
+        return json.dumps(reply).encode() + b"\n"
+
+    def _run(self, operation, expander):
+        # pylint: disable=protected-access, too-many-return-statements
+        kind = operation[0]
+        args = operation[2:]
+        if kind == "read":
+            return expander._read_port(*args)
+        if kind == "write":
+            return expander._write_port(*args)
+        if kind == "update":
+            return expander._update_port(*args)
+        if kind == "describe":
+            return self._descriptions[operation[1]]
+        description = self._descriptions[operation[1]]
+        if kind == "get":
+            if args[0] not in description["properties"]:
+                raise AttributeError(f"No property {args[0]!r}")
+            return getattr(expander, args[0])
+        if kind == "set":
+            if args[0] not in description["properties"]:
+                raise AttributeError(f"No property {args[0]!r}")
+            setattr(expander, args[0], _decode(args[1]))
+            return None
+        if kind == "call":
+            if args[0] not in description["methods"]:
+                raise AttributeError(f"No method {args[0]!r}")
+            return getattr(expander, args[0])(*_decode(args[1]))
+        raise ValueError(f"Unknown operation {kind!r}")
+
+    @staticmethod
+    def _describe(expander):
+        # The things a client needs to look like the expander.
+        # pylint: disable=protected-access
+        cls = type(expander)
+        properties = []
+        methods = []
+        for name in dir(cls):
+            if name.startswith("_") or name in _LOCAL_NAMES:
+                continue
+            attr = getattr(cls, name)
+            if isinstance(attr, property):
+                properties.append(name)
+            elif callable(attr) and not isinstance(attr, type):
+                methods.append(name)
+        return {
+            "class": cls.__name__,
+            "maxpins": expander._maxpins,
+            "capability": expander._capability,
+            "ports": expander._ports,
+            "registers": {
+                "output": expander._output_reg,
+                "ipol": expander._ipol_reg,
+                "iodir": expander._iodir_reg,
+                "pupd_en": expander._pupd_en_reg,
+                "pupd_sel": expander._pupd_sel_reg,
+            },
+            "properties": properties,
+            "methods": methods,
+        }
+
+
+class Connection:
+    """A connection to an :class:`ExpanderServer`. One connection can be used for all of the
+    expanders on the server, and by more than one thread.
+
+    :param path:    The path of the server socket.
+    """
+
+    def __init__(self, path):
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._socket.connect(path)
+        self._file = self._socket.makefile("rb")
+        self._lock = threading.RLock()
+        self._pending = []
+        self._batch_depth = 0
+        self._next_id = 0
+        self._clients = {}
+
+        #: The number of requests sent.
+        self.requests = 0
+
+    def expander(self, name):
+        """Get a client for an expander on the server.
+
+        :param name:    The name the server gave the expander.
+        :return:        An :class:`ExpanderClient`.
+        """
+        client = self._clients.get(name)
+        if client is None:
+            client = ExpanderClient(self, name)
+            self._clients[name] = client
+        return client
+
+    def close(self):
+        """Send any batched operations, and close the connection.
+
+        :return:        Nothing.
+        """
+        with self._lock:
+            self.flush()
+            self._file.close()
+            self._socket.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+    def batch(self):
+        """Hold the operations that do not return a value until the end of the with block, or
+        the next operation that does. Batches can be nested. Other threads using the connection
+        wait until the batch is done.
+
+        :return:        A context manager.
+        """
+        return _Batch(self)
+
+    def flush(self):
+        """Send the batched operations now.
+
+        :return:        Nothing.
+        """
+        with self._lock:
+            if self._pending:
+                self._send([])
+
+    def run(self, operation, result=True):
+        """Run an operation on the server. Used by :class:`ExpanderClient`.
+
+        :param operation:   The operation, as a list of [kind, expander name, args...].
+        :param result:      True if the result is needed. If False, the operation is batched
+                            if a batch is open.
+        :return:            The result of the operation, or None if it was batched.
+        """
+        with self._lock:
+            if not result and self._batch_depth:
+                self._pending.append(operation)
+                return None
+            return self._send([operation])
+
+    def _send(self, operations):
+        # Send the batched operations and these ones in one request. Returns the result of the
+        # last operation.
+        operations = self._pending + operations
+        self._pending = []
+        self._next_id += 1
+        request = {"id": self._next_id, "ops": operations}
+        self._socket.sendall(json.dumps(request).encode() + b"\n")
+        line = self._file.readline()
+        if not line:
+            raise OSError("The expander server closed the connection.")
+        self.requests += 1
+        reply = json.loads(line)
+        if "error" in reply:
+            raise _ERRORS.get(reply["error"], RuntimeError)(reply["message"])
+        results = reply["results"]
+        if not results:
+            return None
+        return _decode(results[-1])
+
+
+class _Batch:
+    # Context manager for Connection.batch.
+    def __init__(self, connection):
+        self._connection = connection
+
+    def __enter__(self):
+        # pylint: disable=protected-access
+        self._connection._lock.acquire()
+        self._connection._batch_depth += 1
+        return self._connection
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        # pylint: disable=protected-access
+        connection = self._connection
+        try:
+            connection._batch_depth -= 1
+            if connection._batch_depth == 0:
+                connection.flush()
+        finally:
+            connection._lock.release()
+        return False
+
+
+class ExpanderClient:
+    """An expander on an :class:`ExpanderServer`. Has the same properties and methods as the
+    driver class of the expander on the server. Get these from :meth:`Connection.expander`.
+
+    Using the client in a with block makes a batch on the connection.
+    """
+
+    def __init__(self, connection, name):
+        description = connection.run(["describe", name])
+        self.__dict__.update(
+            {
+                "_connection": connection,
+                "_name": name,
+                "_properties": frozenset(description["properties"]),
+                "_methods": frozenset(description["methods"]),
+                "_maxpins": description["maxpins"],
+                "_capability": description["capability"],
+                "_ports": description["ports"],
+                "_output_reg": description["registers"]["output"],
+                "_ipol_reg": description["registers"]["ipol"],
+                "_iodir_reg": description["registers"]["iodir"],
+                "_pupd_en_reg": description["registers"]["pupd_en"],
+                "_pupd_sel_reg": description["registers"]["pupd_sel"],
+                "_pins": {},
+                "device_class": description["class"],
+            }
+        )
+
+    @property
+    def maxpins(self):
+        """Number of pins in the expander. Starts at 0. Read only."""
+        return self._maxpins
+
+    @property
+    def capability(self):
+        """The capability of the expander. See the driver class. Read only."""
+        return self._capability
+
+    def __enter__(self):
+        # The batch only holds the connection, so a new one can be used to end it.
+        _Batch(self._connection).__enter__()  # pylint: disable=unnecessary-dunder-call
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return _Batch(self._connection).__exit__(exc_type, exc_val, exc_tb)
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        if name in self._properties:
+            return self._connection.run(["get", self._name, name])
+        if name in self._methods:
+            connection = self._connection
+            expander = self._name
+
+            def method(*args):
+                return connection.run(["call", expander, name, _encode(args)])
+
+            return method
+        raise AttributeError(f"{self.device_class} has no attribute {name!r}")
+
+    def __setattr__(self, name, value):
+        if name in self._properties:
+            self._connection.run(["set", self._name, name, _encode(value)], False)
+        else:
+            super().__setattr__(name, value)
+
+    def get_pin(self, pin):
+        """Get a DigitalInOut for a pin of the expander. The pins work the same as the pins from
+        the expander on the server.
+
+        :param pin:     The pin number.
+        :return:        A DigitalInOut.
+        """
+        self._validate_pin(pin)
+        pin_obj = self._pins.get(pin)
+        if pin_obj is None:
+            pin_obj = DigitalInOut(pin, self)
+            self._pins[pin] = pin_obj
+        return pin_obj
+
+    def flush(self):
+        """Send the batched operations now.
+
+        :return:        Nothing.
+        """
+        self._connection.flush()
+
+    def _validate_pin(self, pin):
+        if (pin > self._maxpins) or (pin < 0):
+            raise ValueError(
+                f"Invalid pin number {pin}. Pin should be 0-{self._maxpins}."
+            )
+
+    def _read_port(self, register, width=None):
+        return self._connection.run(["read", self._name, register, width])
+
+    def _write_port(self, register, val, width=None):
+        self._connection.run(["write", self._name, register, val, width], False)
+
+    def _update_port(self, register, mask, bits, width=None):
+        self._connection.run(["update", self._name, register, mask, bits, width], False)
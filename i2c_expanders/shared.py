@@ -0,0 +1,388 @@
+# SPDX-FileCopyrightText: 2023 Pat Satyshur
+#
+# SPDX-License-Identifier: MIT
+
+"""
+`shared`
+====================================================
+
+Shares the input values of expanders with other processes through shared memory, so any number
+of readers can use them without touching the bus. A :class:`Publisher` reads the inputs of each
+expander once per cycle and writes them to a memory mapped file. A :class:`Reader` in another
+process gets the values from the file.
+
+The file is a seqlock. The publisher makes the sequence number odd while it writes a cycle, and
+even again when it is done. A reader reads the sequence number before and after it reads the
+values, and tries again if the number was odd or changed, so it never sees part of one cycle and
+part of the next. Readers never block the publisher.
+
+.. code-block:: python
+
+    # In the process that owns the bus:
+    from i2c_expanders.shared import Publisher
+
+    publisher = Publisher("/dev/shm/expanders", {"io1": expander1, "io2": expander2})
+    publisher.start(interval=0.01)
+
+    # In any other process:
+    from i2c_expanders.shared import Reader
+
+    reader = Reader("/dev/shm/expanders")
+    print(hex(reader.value("io1")))
+    snapshot = reader.read()
+    print(snapshot.cycle, snapshot.values["io2"])
+
+To read expanders on more than one bus at the same time, use a
+:class:`~i2c_expanders.poller.MultiBusPoller` and pass :meth:`Publisher.publish` as its callback.
+
+File layout, little endian:
+
+* 0: magic b"I2CX", 4 bytes.
+* 4: layout version, 2 bytes.
+* 6: number of expanders, 2 bytes.
+* 8: sequence number, 8 bytes.
+* 16: cycle number, 8 bytes.
+* 24: start time of the cycle from time.monotonic_ns, 8 bytes.
+* 32: time to read the cycle in nanoseconds, 8 bytes.
+* 40: one slot of 8 bytes per expander: the input value, 4 bytes, then the age of the value,
+  4 bytes. The age is the number of cycles since the value was read. It is 0 if the value is
+  from the last cycle, and goes up by one for every cycle the expander could not be read. It
+  stops at 0xFFFFFFFF.
+* After the slots: the length of the names, 2 bytes, then the names of the expanders in UTF-8,
+  separated by newlines.
+
+This is meant for Linux. It is not supported on CircuitPython.
+
+* Author(s): Pat Satyshur
+"""
+
+import mmap
+import os
+import struct
+import threading
+import time
+
+from i2c_expanders.poller import Snapshot
+
+__version__ = "0.0.0+auto.0"
+__repo__ = "https://github.com/ilikecake/CircuitPython_I2C_Expanders.git"
+
+_MAGIC = b"I2CX"
+_VERSION = 2
+_HEADER = struct.Struct("<4sHH")
+_SEQUENCE = struct.Struct("<Q")
+_CYCLE = struct.Struct("<QQQ")
+_SLOT = struct.Struct("<II")
+_MAX_AGE = 0xFFFFFFFF
+_SEQUENCE_OFFSET = 8
+_CYCLE_OFFSET = 16
+_VALUES_OFFSET = 40
+
+
+class StaleValue(Exception):
+    """Put in the errors of a snapshot from :meth:`Reader.read` for an expander that the
+    publisher could not read in the last cycle.
+
+    * name: The name of the expander.
+    * age: The number of cycles since the value was read, or None if it has never been read.
+    """
+
+    def __init__(self, name, age):
+        if age is None:
+            super().__init__(f"{name} has not been read.")
+        else:
+            super().__init__(f"The value of {name} is {age} cycles old.")
+        self.name = name
+        self.age = age
+
+
+class Publisher:  # pylint: disable=too-many-instance-attributes
+    """Writes the input values of expanders to shared memory.
+
+    :param path:        The file to create. Use a path in /dev/shm so the file is only in
+                        memory. An existing file is replaced by a new one, it is not changed.
+                        Readers that have the old file open keep the last values in it, open
+                        them again to get the new one.
+    :param expanders:   The expanders to publish, as a dict of {name: expander}. The readers use
+                        the names to get the values.
+    """
+
+    def __init__(self, path, expanders):
+        self.path = path
+        self._names = tuple(expanders)
+        self._expanders = tuple(expanders.values())
+        self._index = {expander: i for i, expander in enumerate(self._expanders)}
+        count = len(self._names)
+        names = "\n".join(self._names).encode("utf-8")
+        names_offset = _VALUES_OFFSET + _SLOT.size * count
+        size = names_offset + 2 + len(names)
+
+        # Make the file under another name, and then move it into place. Changing the size of
+        # a file that a reader has mapped would crash the reader.
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "w+b") as file:
+            file.truncate(size)
+            self._map = mmap.mmap(file.fileno(), size)
+        _HEADER.pack_into(self._map, 0, _MAGIC, _VERSION, count)
+        struct.pack_into("<H", self._map, names_offset, len(names))
+        self._map[names_offset + 2 : size] = names
+        os.replace(temp_path, path)
+
+        self._sequence = 0
+        self._cycle = 0
+        # The slots, as they are written to the file. Nothing has been read yet, so the values
+        # start out as old as they can be.
+        self._values = bytearray(_SLOT.size * count)
+        for i in range(count):
+            _SLOT.pack_into(self._values, i * _SLOT.size, 0, _MAX_AGE)
+        self._thread = None
+        self._stop = threading.Event()
+
+        #: The number of cycles published.
+        self.cycles = 0
+        #: The number of times reading an expander failed.
+        self.failures = 0
+        #: The last error from reading an expander, or None.
+        self.error = None
+
+    def poll(self):
+        """Read the inputs of all of the expanders once, and publish them. If reading an expander
+        fails with an OSError, the other expanders are still read and its last value is
+        published again, with its age one cycle higher. The error is kept in :attr:`error`.
+
+        :return:        Nothing.
+        """
+        start = time.monotonic_ns()
+        for i, expander in enumerate(self._expanders):
+            try:
+                value = expander.gpio
+            except OSError as err:
+                self.failures += 1
+                self.error = err
+                self._age(i)
+                continue
+            _SLOT.pack_into(self._values, i * _SLOT.size, value, 0)
+        self._cycle += 1
+        self._write(self._cycle, start, time.monotonic_ns() - start)
+
+    def publish(self, snapshot):
+        """Publish the values from a :class:`~i2c_expanders.poller.Snapshot`. This can be used
+        as the callback of a :class:`~i2c_expanders.poller.MultiBusPoller` that reads the
+        expanders. Values for expanders that are not in the snapshot are not changed, and their
+        age goes up by one.
+
+        :param snapshot:    The snapshot to publish.
+        :return:            Nothing.
+        """
+        fresh = set()
+        for expander, value in snapshot.values.items():
+            index = self._index.get(expander)
+            if index is not None:
+                _SLOT.pack_into(self._values, index * _SLOT.size, value, 0)
+                fresh.add(index)
+        for index in range(len(self._expanders)):
+            if index not in fresh:
+                self._age(index)
+        self._cycle = snapshot.cycle
+        self._write(snapshot.cycle, snapshot.timestamp_ns, snapshot.cycle_ns)
+
+    def start(self, interval=0.01):
+        """Poll and publish in a background thread until :meth:`stop` is called.
+
+        :param interval:    The time in seconds from the start of one cycle to the start of the
+                            next.
+        :return:            Nothing.
+        """
+        if self._thread is not None:
+            raise RuntimeError("The publisher is already running.")
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(interval,), daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background thread, and wait for the current cycle to finish.
+
+        :return:        Nothing.
+        """
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def close(self, unlink=True):
+        """Stop publishing and close the file.
+
+        :param unlink:  Remove the file. Readers that already have it open can still read the
+                        last values.
+        :return:        Nothing.
+        """
+        self.stop()
+        self._map.close()
+        if unlink and os.path.exists(self.path):
+            os.unlink(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+    def _age(self, index):
+        # Make the value of an expander one cycle older.
+        value, age = _SLOT.unpack_from(self._values, index * _SLOT.size)
+        if age < _MAX_AGE:
+            _SLOT.pack_into(self._values, index * _SLOT.size, value, age + 1)
+
+    def _write(self, cycle, timestamp_ns, cycle_ns):
+        shared = self._map
+        # Odd while the values are being written.
+        self._sequence += 1
+        _SEQUENCE.pack_into(shared, _SEQUENCE_OFFSET, self._sequence)
+        _CYCLE.pack_into(shared, _CYCLE_OFFSET, cycle, timestamp_ns, cycle_ns)
+        shared[_VALUES_OFFSET : _VALUES_OFFSET + len(self._values)] = self._values
+        self._sequence += 1
+        _SEQUENCE.pack_into(shared, _SEQUENCE_OFFSET, self._sequence)
+        self.cycles += 1
+
+    def _run(self, interval):
+        interval_ns = int(interval * 1000000000)
+        next_cycle = time.monotonic_ns()
+        while not self._stop.is_set():
+            self.poll()
+            next_cycle += interval_ns
+            delay = next_cycle - time.monotonic_ns()
+            if delay < 0:
+                # Running behind, do not try to catch up.
+                next_cycle = time.monotonic_ns()
+            else:
+                self._stop.wait(delay / 1000000000)
+
+
+class Reader:
+    """Reads the input values written by a :class:`Publisher`. Reading does not use the bus.
+
+    :param path:        The file the publisher made.
+    :param retries:     The number of times to try again if the publisher is writing. If the
+                        values can not be read after this many tries, RuntimeError is raised.
+    """
+
+    def __init__(self, path, retries=1000):
+        with open(path, "rb") as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count = _HEADER.unpack_from(self._map, 0)
+        if magic != _MAGIC or version != _VERSION:
+            self._map.close()
+            raise ValueError(f"{path} is not an expander input file.")
+        names_offset = _VALUES_OFFSET + _SLOT.size * count
+        (length,) = struct.unpack_from("<H", self._map, names_offset)
+        names = bytes(self._map[names_offset + 2 : names_offset + 2 + length])
+        self._names = tuple(names.decode("utf-8").split("\n")) if count else ()
+        self._index = {name: i for i, name in enumerate(self._names)}
+        self._layout = struct.Struct(f"<{2 * count}I")
+        self._retries = retries
+
+        #: The number of times a read was tried again because the publisher was writing.
+        self.retries = 0
+
+    @property
+    def names(self):
+        """The names of the expanders. Read only."""
+        return self._names
+
+    @property
+    def sequence(self):
+        """The sequence number. It goes up by 2 for each cycle published, and is odd while the
+        publisher is writing. Can be used to check for new values without reading them.
+        Read only.
+        """
+        return _SEQUENCE.unpack_from(self._map, _SEQUENCE_OFFSET)[0]
+
+    def value(self, name):
+        """Get the input value of one expander from the last cycle. Only this value is read. If
+        the expander could not be read in the last cycle, this is an older value, see
+        :meth:`age`.
+
+        :param name:    The name of the expander.
+        :return:        The value of the gpio register, or None if nothing has been published.
+        """
+        slot = self._slot(name)
+        return None if slot is None else slot[0]
+
+    def age(self, name):
+        """Get the age of the value of one expander: the number of cycles since it was read.
+        0 means the value is from the last cycle.
+
+        :param name:    The name of the expander.
+        :return:        The age in cycles, or None if the expander has never been read.
+        """
+        slot = self._slot(name)
+        if slot is None or slot[1] == _MAX_AGE:
+            return None
+        return slot[1]
+
+    def _slot(self, name):
+        # Read the value and age of one expander, or None if nothing has been published.
+        offset = _VALUES_OFFSET + _SLOT.size * self._index[name]
+        shared = self._map
+        for _ in range(self._retries):
+            sequence = _SEQUENCE.unpack_from(shared, _SEQUENCE_OFFSET)[0]
+            if not sequence & 1:
+                slot = _SLOT.unpack_from(shared, offset)
+                if _SEQUENCE.unpack_from(shared, _SEQUENCE_OFFSET)[0] == sequence:
+                    return slot if sequence else None
+            self.retries += 1
+        raise RuntimeError("Could not read the values, the publisher is stuck.")
+
+    def read(self):
+        """Get the input values of all of the expanders from the last cycle.
+
+        :return:        A :class:`~i2c_expanders.poller.Snapshot` with the values keyed by the
+                        expander names, or None if nothing has been published. bus_cycle_ns is
+                        empty, cycle_ns is the time the publisher took to read the cycle.
+                        Expanders that could not be read in the last cycle are in the errors
+                        of the snapshot, as a :class:`StaleValue`. Their last value is still in
+                        values, if they have been read before.
+        """
+        shared = self._map
+        layout = self._layout
+        for _ in range(self._retries):
+            sequence = _SEQUENCE.unpack_from(shared, _SEQUENCE_OFFSET)[0]
+            if not sequence & 1:
+                cycle, timestamp_ns, cycle_ns = _CYCLE.unpack_from(
+                    shared, _CYCLE_OFFSET
+                )
+                slots = layout.unpack_from(shared, _VALUES_OFFSET)
+                if _SEQUENCE.unpack_from(shared, _SEQUENCE_OFFSET)[0] == sequence:
+                    if not sequence:
+                        return None
+                    return self._snapshot(cycle, timestamp_ns, cycle_ns, slots)
+            self.retries += 1
+        raise RuntimeError("Could not read the values, the publisher is stuck.")
+
+    def _snapshot(self, cycle, timestamp_ns, cycle_ns, slots):
+        # Make a snapshot from the values and ages of all of the expanders.
+        values = {}
+        errors = {}
+        for i, name in enumerate(self._names):
+            value = slots[2 * i]
+            age = slots[2 * i + 1]
+            if age != _MAX_AGE:
+                values[name] = value
+            if age:
+                errors[name] = StaleValue(name, None if age == _MAX_AGE else age)
+        return Snapshot(cycle, timestamp_ns, values, {}, cycle_ns, errors)
+
+    def close(self):
+        """Close the file.
+
+        :return:        Nothing.
+        """
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
@@ -0,0 +1,497 @@
+# SPDX-FileCopyrightText: 2023 Pat Satyshur
+#
+# SPDX-License-Identifier: MIT
+
+"""
+`transport`
+====================================================
+
+I2C buses that the expanders can use instead of a busio.I2C object and
+adafruit_bus_device.I2CDevice.
+
+* :class:`LinuxI2CBus` talks to a Linux /dev/i2c-N device directly with the I2C_RDWR ioctl.
+  This skips most of the Python code in Blinka, and can send several register operations, even
+  to different expanders, in one ioctl.
+* :class:`FakeI2CBus` is a simulated bus with register-file devices. It is meant for testing
+  code without hardware.
+
+Pass the bus to the expander in place of the busio.I2C object:
+
+.. code-block:: python
+
+    from i2c_expanders.PCA9555 import PCA9555
+    from i2c_expanders.transport import LinuxI2CBus
+
+    bus = LinuxI2CBus(1)    # /dev/i2c-1
+    exp1 = PCA9555(bus, address=0x20)
+    exp2 = PCA9555(bus, address=0x21)
+
+    # Both writes and the read are sent in a single ioctl, when the read is done.
+    with bus.batch():
+        exp1.gpio = 0x00FF
+        exp2.gpio = 0xFF00
+        inputs = exp1.gpio
+
+In a batch, writes are held until a read is done or the batch ends, then everything is sent in
+one ioctl with repeated starts between the messages. This means an error from a write (for
+example a device that does not respond) is raised by the read or at the end of the batch. The
+bus is locked for the whole batch, so keep batches short if other threads use the bus.
+
+The buses also have the busio.I2C methods (try_lock, unlock, scan, writeto, readfrom_into and
+writeto_then_readfrom), so they can be used with other drivers too.
+
+Any object with a device(address) method that returns an object with the I2CDevice methods
+(a context manager with write, readinto and write_then_readinto) can be used as a transport.
+
+This is meant for Linux. On CircuitPython, use busio.I2C.
+
+* Author(s): Pat Satyshur
+"""
+
+import ctypes
+import errno
+import threading
+
+from micropython import const
+
+__version__ = "0.0.0+auto.0"
+__repo__ = "https://github.com/ilikecake/CircuitPython_I2C_Expanders.git"
+
+# From linux/i2c-dev.h and linux/i2c.h
+_I2C_RDWR = const(0x0707)
+_I2C_M_RD = const(0x0001)
+# The most messages the kernel accepts in one I2C_RDWR ioctl.
+_I2C_RDWR_IOCTL_MAX_MSGS = const(42)
+
+
+class _I2cMsg(ctypes.Structure):  # pylint: disable=too-few-public-methods
+    # struct i2c_msg
+    _fields_ = [
+        ("addr", ctypes.c_uint16),
+        ("flags", ctypes.c_uint16),
+        ("len", ctypes.c_uint16),
+        ("buf", ctypes.POINTER(ctypes.c_uint8)),
+    ]
+
+
+class _I2cRdwrIoctlData(ctypes.Structure):  # pylint: disable=too-few-public-methods
+    # struct i2c_rdwr_ioctl_data
+    _fields_ = [
+        ("msgs", ctypes.POINTER(_I2cMsg)),
+        ("nmsgs", ctypes.c_uint32),
+    ]
+
+
+class BusDevice:
+    """One device on a :class:`LinuxI2CBus` or :class:`FakeI2CBus`. Works the same as
+    adafruit_bus_device.I2CDevice. Get these from the device method of the bus.
+    """
+
+    __slots__ = ("i2c", "device_address")
+
+    def __init__(self, i2c, device_address):
+        self.i2c = i2c
+        self.device_address = device_address
+
+    def __enter__(self):
+        self.i2c._lock.acquire()  # pylint: disable=protected-access
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.i2c._lock.release()  # pylint: disable=protected-access
+        return False
+
+    def readinto(self, buf, *, start=0, end=None):
+        """Read from the device into a buffer.
+
+        :param buf:     The buffer to read into.
+        :param start:   The index of the first byte of buf to fill. Defaults to 0.
+        :param end:     The index after the last byte of buf to fill. Defaults to len(buf).
+        :return:        Nothing.
+        """
+        self.i2c.readfrom_into(self.device_address, buf, start=start, end=end)
+
+    def write(self, buf, *, start=0, end=None):
+        """Write a buffer to the device.
+
+        :param buf:     The buffer to write.
+        :param start:   The index of the first byte of buf to write. Defaults to 0.
+        :param end:     The index after the last byte of buf to write. Defaults to len(buf).
+        :return:        Nothing.
+        """
+        self.i2c.writeto(self.device_address, buf, start=start, end=end)
+
+    # pylint: disable-next=too-many-arguments
+    def write_then_readinto(
+        self,
+        out_buffer,
+        in_buffer,
+        *,
+        out_start=0,
+        out_end=None,
+        in_start=0,
+        in_end=None,
+    ):
+        """Write to the device, then read from it with a repeated start in between.
+
+        :param out_buffer:  The buffer to write.
+        :param in_buffer:   The buffer to read into.
+        :param out_start:   The index of the first byte of out_buffer to write.
+        :param out_end:     The index after the last byte of out_buffer to write.
+        :param in_start:    The index of the first byte of in_buffer to fill.
+        :param in_end:      The index after the last byte of in_buffer to fill.
+        :return:            Nothing.
+        """
+        self.i2c.writeto_then_readfrom(
+            self.device_address,
+            out_buffer,
+            in_buffer,
+            out_start=out_start,
+            out_end=out_end,
+            in_start=in_start,
+            in_end=in_end,
+        )
+
+
+class Batch:
+    """Context manager returned by :meth:`I2CBus.batch`."""
+
+    __slots__ = ("_bus",)
+
+    def __init__(self, bus):
+        self._bus = bus
+
+    def __enter__(self):
+        # pylint: disable=protected-access
+        self._bus._lock.acquire()
+        self._bus._batch_depth += 1
+        return self._bus
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        # pylint: disable=protected-access
+        bus = self._bus
+        try:
+            bus._batch_depth -= 1
+            if bus._batch_depth == 0:
+                if exc_type is None:
+                    bus.flush()
+                else:
+                    # Do not send half of the batch.
+                    bus._pending = []
+        finally:
+            bus._lock.release()
+        return False
+
+
+class I2CBus:
+    """The common parts of the buses in this module. Use :class:`LinuxI2CBus` or
+    :class:`FakeI2CBus`.
+
+    * transfers: The number of transfers (ioctls) done.
+    * messages: The number of I2C messages sent. One register read is two messages.
+    """
+
+    #: The most messages sent in one transfer. Larger batches are split.
+    max_messages = _I2C_RDWR_IOCTL_MAX_MSGS
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        # Messages waiting to be sent in a batch, as (address, read, buffer, start, end).
+        self._pending = []
+        self._batch_depth = 0
+        self.transfers = 0
+        self.messages = 0
+
+    def device(self, address):
+        """Get the device at an address on this bus. The expanders call this if it exists.
+
+        :param address: The I2C address of the device.
+        :return:        A :class:`BusDevice`.
+        """
+        return BusDevice(self, address)
+
+    def batch(self):
+        """Collect the operations done in a with block, and send them in as few transfers as
+        possible. Writes are held until the next read, or the end of the block. Batches can be
+        nested, the writes are sent at the end of the outer block.
+
+        :return:        A context manager.
+        """
+        return Batch(self)
+
+    def flush(self):
+        """Send the writes that are waiting in a batch now.
+
+        :return:        Nothing.
+        """
+        with self._lock:
+            messages = self._pending
+            if messages:
+                self._pending = []
+                self._send(messages)
+
+    def try_lock(self):
+        """Lock the bus, the same as busio.I2C.try_lock.
+
+        :return:        True if the bus was locked.
+        """
+        return self._lock.acquire(False)
+
+    def lock(self, timeout=-1):
+        """Lock the bus, waiting for it if another thread has it locked. busio.I2C does not have
+        this, it can only try once with try_lock.
+
+        :param timeout: The longest time to wait in seconds. Defaults to -1, wait as long as it
+                        takes.
+        :return:        True if the bus was locked.
+        """
+        return self._lock.acquire(True, timeout)
+
+    def unlock(self):
+        """Unlock the bus, the same as busio.I2C.unlock.
+
+        :return:        Nothing.
+        """
+        self._lock.release()
+
+    def scan(self):
+        """Find the devices on the bus. Each address is checked by reading one byte from it.
+
+        :return:        A list of the addresses that responded.
+        """
+        found = []
+        buf = bytearray(1)
+        with self._lock:
+            self.flush()
+            for address in range(0x08, 0x78):
+                try:
+                    self._send([(address, True, buf, 0, 1)])
+                except OSError:
+                    continue
+                found.append(address)
+        return found
+
+    def writeto(self, address, buffer, *, start=0, end=None):
+        """Write to a device, the same as busio.I2C.writeto. In a batch, the data is copied and
+        sent later.
+
+        :return:        Nothing.
+        """
+        if end is None:
+            end = len(buffer)
+        if self._batch_depth:
+            self._queue([(address, False, bytes(buffer[start:end]), 0, end - start)])
+        else:
+            self._send([(address, False, buffer, start, end)])
+
+    def readfrom_into(self, address, buffer, *, start=0, end=None):
+        """Read from a device, the same as busio.I2C.readfrom_into. In a batch, this is sent
+        with the writes that are waiting.
+
+        :return:        Nothing.
+        """
+        if end is None:
+            end = len(buffer)
+        self._queue([(address, True, buffer, start, end)])
+        self.flush()
+
+    # pylint: disable-next=too-many-arguments
+    def writeto_then_readfrom(
+        self,
+        address,
+        buffer_out,
+        buffer_in,
+        *,
+        out_start=0,
+        out_end=None,
+        in_start=0,
+        in_end=None,
+    ):
+        """Write to a device then read from it, the same as busio.I2C.writeto_then_readfrom.
+        In a batch, this is sent with the writes that are waiting.
+
+        :return:        Nothing.
+        """
+        if out_end is None:
+            out_end = len(buffer_out)
+        if in_end is None:
+            in_end = len(buffer_in)
+        self._queue(
+            [
+                (address, False, buffer_out, out_start, out_end),
+                (address, True, buffer_in, in_start, in_end),
+            ]
+        )
+        self.flush()
+
+    def _queue(self, messages):
+        # Add messages to the batch. The messages are kept in the same transfer, so a register
+        # read is not split from its command byte.
+        with self._lock:
+            if len(self._pending) + len(messages) > self.max_messages:
+                self.flush()
+            self._pending.extend(messages)
+
+    def _send(self, messages):
+        # Send messages, in as few transfers as the bus allows.
+        for i in range(0, len(messages), self.max_messages):
+            chunk = messages[i : i + self.max_messages]
+            self._transfer(chunk)
+            self.transfers += 1
+            self.messages += len(chunk)
+
+    def _transfer(self, messages):
+        # Send up to max_messages messages in one transfer. Defined by the bus classes.
+        raise NotImplementedError()
+
+
+class LinuxI2CBus(I2CBus):
+    """A Linux I2C bus, using the /dev/i2c-N device directly.
+
+    :param bus:     The bus number (1 for /dev/i2c-1) or the path of the device.
+    """
+
+    def __init__(self, bus):
+        import fcntl  # pylint: disable=import-outside-toplevel
+        import os  # pylint: disable=import-outside-toplevel
+
+        super().__init__()
+        if isinstance(bus, int):
+            bus = f"/dev/i2c-{bus}"
+        self.path = bus
+        self._ioctl = fcntl.ioctl
+        self._close = os.close
+        self._fd = os.open(bus, os.O_RDWR)
+
+    def close(self):
+        """Close the bus device.
+
+        :return:        Nothing.
+        """
+        if self._fd is not None:
+            self._close(self._fd)
+            self._fd = None
+
+    def deinit(self):
+        """Close the bus device, the same as busio.I2C.deinit.
+
+        :return:        Nothing.
+        """
+        self.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+    def _transfer(self, messages):
+        count = len(messages)
+        msgs = (_I2cMsg * count)()
+        # The ctypes buffers must be kept until the ioctl is done.
+        buffers = []
+        for i, (address, read, buffer, start, end) in enumerate(messages):
+            length = end - start
+            if read:
+                # The kernel reads straight into the caller's buffer.
+                cbuf = (ctypes.c_uint8 * length).from_buffer(buffer, start)
+                msgs[i].flags = _I2C_M_RD
+            else:
+                cbuf = (ctypes.c_uint8 * length).from_buffer_copy(buffer, start)
+                msgs[i].flags = 0
+            buffers.append(cbuf)
+            msgs[i].addr = address
+            msgs[i].len = length
+            msgs[i].buf = ctypes.cast(cbuf, ctypes.POINTER(ctypes.c_uint8))
+        data = _I2cRdwrIoctlData(msgs, count)
+        self._ioctl(self._fd, _I2C_RDWR, data)
+
+
+class FakeI2CBus(I2CBus):
+    """A simulated I2C bus for testing. Add devices with :meth:`add_device`. Each device is a
+    256 byte register file. Writes set the register pointer from the first byte and store the
+    rest, reads return the registers from the pointer on. Addresses with no device raise
+    OSError, the same as a device that does not acknowledge.
+
+    Note that the input registers of the simulated devices do not follow the outputs. Set the
+    registers directly to simulate inputs.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._devices = {}
+
+    # pylint: disable-next=too-many-arguments
+    def add_device(
+        self, address, *, block=2, auto_increment=0x00, registers=None, valid=None
+    ):
+        """Add a simulated device.
+
+        :param address:         The I2C address of the device.
+        :param block:           The size of the register groups that the register pointer
+                                wraps around in. 2 for the 16 pin expanders, 1 for the 8 pin
+                                ones. Ignored if the auto increment bit is set.
+        :param auto_increment:  The bit in the command byte that makes the pointer count up
+                                through all of the registers (0x80 for the TCA6424), or 0.
+        :param registers:       The initial register values. Defaults to all zero.
+        :param valid:           The addresses of the registers the device has. A write that
+                                sets the register pointer to any other register is not
+                                acknowledged (raises OSError), like the real devices. Defaults
+                                to all of them.
+        :return:                The registers of the device, as a bytearray that can be changed.
+        """
+        regs = bytearray(256)
+        if registers is not None:
+            regs[: len(registers)] = registers
+        if valid is not None:
+            valid = frozenset(valid)
+        # [registers, pointer, block, auto increment bit, pointer counting up, valid registers]
+        self._devices[address] = [regs, 0, block, auto_increment, False, valid]
+        return regs
+
+    def remove_device(self, address):
+        """Remove a simulated device. The address no longer responds.
+
+        :param address: The I2C address of the device.
+        :return:        Nothing.
+        """
+        del self._devices[address]
+
+    def registers(self, address):
+        """The registers of a simulated device.
+
+        :param address: The I2C address of the device.
+        :return:        The registers, as a bytearray that can be changed.
+        """
+        return self._devices[address][0]
+
+    def _transfer(self, messages):
+        for address, read, buffer, start, end in messages:
+            dev = self._devices.get(address)
+            if dev is None:
+                raise OSError(errno.EIO, f"No device at address 0x{address:02X}")
+            regs, pointer, block, auto_increment, incrementing, valid = dev
+            if read:
+                for i in range(start, end):
+                    buffer[i] = regs[pointer]
+                    pointer = self._next(pointer, block, incrementing)
+            elif end > start:
+                pointer = buffer[start] & ~auto_increment
+                if valid is not None and pointer not in valid:
+                    raise OSError(
+                        errno.EIO,
+                        f"Device 0x{address:02X} has no register 0x{pointer:02X}",
+                    )
+                incrementing = (buffer[start] & auto_increment) != 0
+                for i in range(start + 1, end):
+                    regs[pointer] = buffer[i]
+                    pointer = self._next(pointer, block, incrementing)
+                dev[4] = incrementing
+            dev[1] = pointer
+
+    @staticmethod
+    def _next(pointer, block, incrementing):
+        if incrementing:
+            return (pointer + 1) & 0xFF
+        return (pointer & ~(block - 1)) | ((pointer + 1) & (block - 1))
@@ -0,0 +1,366 @@
+# SPDX-FileCopyrightText: 2023 Pat Satyshur
+#
+# SPDX-License-Identifier: MIT
+
+"""
+`virtual_port`
+====================================================
+
+Treats pins spread over several expanders as one wide port. Bit 0 of the port is the first pin
+given, bit 1 the second, and so on. For example, two PCA9555 make a 32 bit port:
+
+.. code-block:: python
+
+    from i2c_expanders.virtual_port import VirtualPort
+
+    port = VirtualPort((expander1, expander2))
+    port.switch_to_output()
+    port.value = 0x12345678
+    print(port.write_skew_ns)
+
+A write is split into one write of the output register per expander. The writes are done back
+to back while the buses are locked, so nothing else can use the bus between them and the time
+between the first and last expander changing (the skew) is as short as the bus allows. On a
+:class:`~i2c_expanders.transport.LinuxI2CBus`, the writes are sent in a single transfer. Reads of
+the inputs are done the same way. The skew of the last write and read is measured.
+
+If the port only has some of the pins of an expander, the output register of that expander is
+read first so the other pins keep their values. This read is not part of the skew.
+
+The pins of each expander are used directly on the bus, so the port works with write combining
+and read caching turned on (see :class:`~i2c_expanders.i2c_expander.I2c_Expander`): queued
+writes are sent and cached reads are dropped first. The writes are recorded in the shadow of the
+expanders, so a :class:`~i2c_expanders.health.HealthMonitor` does not undo them. If the
+expanders have locking enabled, their locks are held for the whole write or read. The expander
+locks and then the buses are always taken in the same order, no matter the order of the pins, so
+ports that share expanders can be used from different threads.
+
+Do not use the port inside a with block of another expander on the same bus. On CircuitPython the
+bus can not be locked twice, and RuntimeError is raised.
+
+* Author(s): Pat Satyshur
+"""
+
+import sys
+import time
+
+__version__ = "0.0.0+auto.0"
+__repo__ = "https://github.com/ilikecake/CircuitPython_I2C_Expanders.git"
+
+
+class _Member:  # pylint: disable=too-few-public-methods
+    # The pins of one expander in a virtual port.
+
+    __slots__ = ("expander", "bits", "shift", "run", "pin_mask", "all_pins", "buffer")
+
+    def __init__(self, expander, bits):
+        # pylint: disable=protected-access
+        self.expander = expander
+        # The port bits and expander pins, as (bit, pin).
+        self.bits = bits
+        self.pin_mask = 0
+        for _, pin in bits:
+            self.pin_mask |= 1 << pin
+        # The mask with all of the pins of the expander.
+        self.all_pins = (1 << (8 * expander._ports)) - 1
+        # If the pins are in order with no gaps, the value can be shifted into place instead of
+        # moving one bit at a time.
+        self.shift = None
+        self.run = len(bits)
+        first_bit, first_pin = bits[0]
+        if all(
+            (bit - first_bit == i) and (pin - first_pin == i)
+            for i, (bit, pin) in enumerate(bits)
+        ):
+            self.shift = (first_bit, first_pin)
+        # Command byte and register values for a transfer.
+        self.buffer = bytearray(1 + expander._ports)
+
+    def to_pins(self, value):
+        """The expander pin values for a port value."""
+        if self.shift is not None:
+            first_bit, first_pin = self.shift
+            return ((value >> first_bit) & ((1 << self.run) - 1)) << first_pin
+        pins = 0
+        for bit, pin in self.bits:
+            if (value >> bit) & 1:
+                pins |= 1 << pin
+        return pins
+
+    def from_pins(self, pins):
+        """The port value for the expander pin values."""
+        if self.shift is not None:
+            first_bit, first_pin = self.shift
+            return ((pins >> first_pin) & ((1 << self.run) - 1)) << first_bit
+        value = 0
+        for bit, pin in self.bits:
+            if (pins >> pin) & 1:
+                value |= 1 << bit
+        return value
+
+
+class VirtualPort:  # pylint: disable=too-many-instance-attributes
+    """A port made of pins from several expanders.
+
+    :param pins:    The pins of the port, bit 0 first. Each item is either an (expander, pin)
+                    pair, or an expander for all of its pins in order.
+    """
+
+    def __init__(self, pins):
+        order = []
+        members = {}
+        bit = 0
+        for item in pins:
+            if isinstance(item, tuple):
+                expander, pin = item
+                expander._validate_pin(pin)  # pylint: disable=protected-access
+                pairs = ((expander, pin),)
+            else:
+                pairs = tuple((item, pin) for pin in range(item.maxpins + 1))
+            for expander, pin in pairs:
+                if expander not in members:
+                    members[expander] = []
+                    order.append(expander)
+                if any(used == pin for _, used in members[expander]):
+                    raise ValueError(f"Pin {pin} is used twice.")
+                members[expander].append((bit, pin))
+                bit += 1
+        self._width = bit
+
+        # The members grouped by bus, so each bus is only locked once. The buses are kept in
+        # the order of their ids, which is the order they are locked in, the same for every port.
+        self._buses = []
+        for expander in order:
+            member = _Member(expander, members[expander])
+            # pylint: disable-next=protected-access
+            i2c = expander._device.i2c
+            for bus in self._buses:
+                if bus[0] is i2c:
+                    bus[1].append(member)
+                    break
+            else:
+                self._buses.append((i2c, [member]))
+        self._buses.sort(key=lambda bus: id(bus[0]))
+        self._members = tuple(m for _, bus_members in self._buses for m in bus_members)
+        # The members in the order their expander locks are taken.
+        self._lock_order = tuple(sorted(self._members, key=lambda m: id(m.expander)))
+
+        #: The time from the start of the first write to the end of the last one, in
+        #: nanoseconds, for the last write.
+        self.write_skew_ns = 0
+        #: The largest write skew seen, in nanoseconds.
+        self.max_write_skew_ns = 0
+        #: The time from the start of the first read to the end of the last one, in
+        #: nanoseconds, for the last read.
+        self.read_skew_ns = 0
+        #: The largest read skew seen, in nanoseconds.
+        self.max_read_skew_ns = 0
+
+    @property
+    def width(self):
+        """The number of bits in the port. Read only."""
+        return self._width
+
+    @property
+    def value(self):
+        """The value of the inputs. Setting this writes all of the outputs of the port."""
+        return self.read()
+
+    @value.setter
+    def value(self, val):
+        self.write(val)
+
+    def switch_to_output(self, value=0):
+        """Make all of the pins of the port outputs.
+
+        :param value:   The value to set the outputs to first.
+        :return:        Nothing.
+        """
+        self.write(value)
+        for member in self._members:
+            expander = member.expander
+            # pylint: disable-next=protected-access
+            expander._update_port(expander._iodir_reg, member.pin_mask, 0)
+
+    def switch_to_input(self):
+        """Make all of the pins of the port inputs.
+
+        :return:        Nothing.
+        """
+        for member in self._members:
+            expander = member.expander
+            # pylint: disable=protected-access
+            expander._update_port(expander._iodir_reg, member.pin_mask, member.pin_mask)
+
+    def write(
+        self, value, mask=None
+    ):  # pylint: disable=too-many-branches, too-many-locals
+        """Set the outputs of the port.
+
+        :param value:   The value to write.
+        :param mask:    Optional. Only the bits of the port set in mask are changed. Expanders
+                        with none of these bits are not written.
+        :return:        Nothing.
+        """
+        if mask is None:
+            mask = (1 << self._width) - 1
+        writes = []
+        for i2c, members in self._buses:
+            bus_writes = []
+            for member in members:
+                pin_mask = member.to_pins(mask)
+                if pin_mask:
+                    bus_writes.append((member, pin_mask, member.to_pins(value)))
+            if bus_writes:
+                writes.append((i2c, bus_writes))
+        if not writes:
+            return
+        held = self._hold()
+        locked = []
+        try:
+            for i2c, _ in writes:
+                _lock(i2c)
+                locked.append(i2c)
+            # pylint: disable=protected-access
+            for i2c, bus_writes in writes:
+                for member, pin_mask, pins in bus_writes:
+                    if pin_mask != member.all_pins:
+                        # Keep the other pins of the expander.
+                        old = self._read_register(
+                            i2c, member, member.expander._output_reg
+                        )
+                        pins = (old & ~pin_mask) | (pins & pin_mask)
+                    self._fill(member, member.expander._output_reg, pins)
+            start = time.monotonic_ns()
+            for i2c, bus_writes in writes:
+                batch = getattr(i2c, "batch", None)
+                if batch is not None:
+                    with batch():
+                        self._send(i2c, bus_writes)
+                else:
+                    self._send(i2c, bus_writes)
+            skew = time.monotonic_ns() - start
+        finally:
+            for i2c in locked:
+                i2c.unlock()
+            self._release(held)
+        self.write_skew_ns = skew
+        self.max_write_skew_ns = max(self.max_write_skew_ns, skew)
+
+    def read(self):
+        """Read the inputs of the port.
+
+        :return:        The value of the port.
+        """
+        value = 0
+        held = self._hold()
+        locked = []
+        try:
+            for i2c, _ in self._buses:
+                _lock(i2c)
+                locked.append(i2c)
+            start = time.monotonic_ns()
+            for i2c, members in self._buses:
+                for member in members:
+                    # pylint: disable-next=protected-access
+                    register = member.expander._input_reg
+                    value |= member.from_pins(
+                        self._read_register(i2c, member, register)
+                    )
+            skew = time.monotonic_ns() - start
+        finally:
+            for i2c in locked:
+                i2c.unlock()
+            self._release(held)
+        self.read_skew_ns = skew
+        self.max_read_skew_ns = max(self.max_read_skew_ns, skew)
+        return value
+
+    def _hold(self):
+        # Take the thread locks of the expanders, and get them ready for using the bus
+        # directly. The locks are taken in the order of the expander ids, so two ports with the
+        # same expanders in a different order can not each hold a lock the other is waiting for.
+        # pylint: disable=protected-access
+        held = []
+        try:
+            for member in self._lock_order:
+                lock = member.expander._lock
+                if lock is not None:
+                    lock.acquire()
+                    held.append(lock)
+            for member in self._members:
+                member.expander.flush()
+                member.expander.invalidate_reads()
+        except BaseException:
+            self._release(held)
+            raise
+        return held
+
+    @staticmethod
+    def _release(held):
+        # Release the locks taken by _hold.
+        for lock in reversed(held):
+            lock.release()
+
+    @staticmethod
+    def _fill(member, register, pins):
+        # Put a register write in the buffer of a member.
+        buffer = member.buffer
+        # pylint: disable-next=protected-access
+        buffer[0] = member.expander._command(register, len(buffer) - 1)
+        for i in range(1, len(buffer)):
+            buffer[i] = pins & 0xFF
+            pins >>= 8
+
+    @staticmethod
+    def _send(i2c, writes):
+        # Write the buffers of the members back to back.
+        # pylint: disable=protected-access
+        for member, _, _ in writes:
+            expander = member.expander
+            buffer = member.buffer
+            i2c.writeto(expander._device.device_address, buffer)
+            # Record the new outputs, the same as a write done by the expander.
+            shadow = expander._shadow
+            if shadow is not None:
+                register = expander._output_reg
+                for i in range(1, len(buffer)):
+                    shadow[register + i - 1] = buffer[i]
+
+    @staticmethod
+    def _read_register(i2c, member, register):
+        # Read a register of a member into its buffer, and return the value.
+        buffer = member.buffer
+        width = len(buffer) - 1
+        # pylint: disable=protected-access
+        buffer[0] = member.expander._command(register, width)
+        i2c.writeto_then_readfrom(
+            member.expander._device.device_address,
+            buffer,
+            buffer,
+            out_end=1,
+            in_start=1,
+        )
+        value = 0
+        for i in range(width, 0, -1):
+            value = (value << 8) | buffer[i]
+        return value
+
+
+def _lock(i2c):
+    # Lock the bus, waiting for it if another thread is using it. The Linux buses can be locked
+    # again by the thread that has them locked.
+    if i2c.try_lock():
+        return
+    if sys.implementation.name == "circuitpython":
+        # There are no threads, so the bus is locked by the code calling the port, and would
+        # never be unlocked.
+        raise RuntimeError("The I2C bus is already locked.")
+    lock = getattr(i2c, "lock", None)
+    if lock is not None:
+        # The buses from the transport module can wait for the lock.
+        lock()
+        return
+    # busio.I2C can only try. Sleep between tries, so the thread that has the bus can run.
+    while not i2c.try_lock():
+        time.sleep(0.0001)
@@ -0,0 +1,52 @@
+# SPDX-FileCopyrightText: Copyright (c) 2023 Pat Satyshur
+#
+# SPDX-License-Identifier: MIT
+
+"""Fixtures shared by the tests. Everything runs on the simulated bus from the transport
+module, no hardware is needed.
+"""
+
+import threading
+
+import pytest
+
+from i2c_expanders.transport import FakeI2CBus
+
+
+@pytest.fixture
+def bus():
+    """A simulated bus with a 16 pin expander at 0x20 and 0x21."""
+    fake = FakeI2CBus()
+    fake.add_device(0x20)
+    fake.add_device(0x21)
+    return fake
+
+
+@pytest.fixture
+def run_threads():
+    """Run functions in threads and wait for them. Returns the number of threads still running
+    after the timeout, so a deadlock fails the test instead of hanging it.
+    """
+
+    def run(targets, timeout=30):
+        errors = []
+
+        def wrap(target):
+            try:
+                target()
+            except BaseException as err:  # pylint: disable=broad-exception-caught
+                errors.append(err)
+
+        threads = [
+            threading.Thread(target=wrap, args=(target,), daemon=True)
+            for target in targets
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout)
+        if errors:
+            raise errors[0]
+        return sum(thread.is_alive() for thread in threads)
+
+    return run
@@ -0,0 +1,49 @@
+# SPDX-FileCopyrightText: Copyright (c) 2023 Pat Satyshur
+#
+# SPDX-License-Identifier: MIT
+
+"""Tests for the bus worker thread."""
+
+# pylint: disable=missing-function-docstring, protected-access
+
+import pytest
+
+from i2c_expanders.bus_worker import BusWorker
+from i2c_expanders.PCA9555 import PCA9555
+
+
+def test_operations_run_in_order(bus):
+    expander = PCA9555(bus, 0x20)
+    with BusWorker() as worker:
+        worker.write_port(expander, expander._output_reg, 0x1234)
+        value = worker.read_port(expander, 2)
+        assert value.result(5) == 0x1234
+
+
+def test_close_fails_queued_calls():
+    worker = BusWorker(start=False)
+    future = worker.submit(lambda: 1)
+    worker.close()
+    with pytest.raises(RuntimeError):
+        future.result(5)
+    with pytest.raises(RuntimeError):
+        worker.submit(lambda: 2)
+    with pytest.raises(RuntimeError):
+        worker.start()
+
+
+def test_close_runs_queued_calls(run_threads):
+    futures = []
+    worker = BusWorker()
+
+    def submit():
+        for value in range(200):
+            try:
+                futures.append(worker.submit(lambda v=value: v))
+            except RuntimeError:
+                return
+
+    assert run_threads([submit, worker.close]) == 0
+    # Every call that was accepted has run.
+    for future in futures:
+        future.result(5)
@@ -0,0 +1,64 @@
+# SPDX-FileCopyrightText: Copyright (c) 2023 Pat Satyshur
+#
+# SPDX-License-Identifier: MIT
+
+"""Tests for finding the expanders on a bus."""
+
+# pylint: disable=missing-function-docstring, protected-access
+
+import json
+
+import pytest
+
+from i2c_expanders import discover as discovery
+from i2c_expanders.transport import FakeI2CBus
+
+
+@pytest.fixture(autouse=True)
+def fresh_bus_names(monkeypatch):
+    monkeypatch.setattr(discovery, "_bus_names", {})
+
+
+def test_cache_entry_per_bus(tmp_path):
+    cache = str(tmp_path / "expanders.json")
+    first = FakeI2CBus()
+    first.add_device(0x20)
+    second = FakeI2CBus()
+    second.add_device(0x21)
+    assert sorted(discovery.discover(first, cache=cache, reset=False)) == [0x20]
+    assert sorted(discovery.discover(second, cache=cache, reset=False)) == [0x21]
+    with open(cache, "r", encoding="utf-8") as file:
+        assert json.load(file) == {
+            "i2c": {"0x20": "PCAL9555"},
+            "i2c-2": {"0x21": "PCAL9555"},
+        }
+
+
+def test_stale_cache_is_rescanned(tmp_path):
+    cache = str(tmp_path / "expanders.json")
+    fake = FakeI2CBus()
+    fake.add_device(0x20)
+    discovery.discover(fake, cache=cache, reset=False)
+    fake.remove_device(0x20)
+    fake.add_device(0x22)
+    assert sorted(discovery.discover(fake, cache=cache, reset=False)) == [0x22]
+
+
+def test_locked_bus_times_out(monkeypatch, run_threads):
+    monkeypatch.setattr(discovery, "_LOCK_TIMEOUT", 0.05)
+    fake = FakeI2CBus()
+    fake.add_device(0x20)
+    assert fake.try_lock()
+    errors = []
+
+    def probe():
+        try:
+            discovery.fingerprint(fake, 0x20)
+        except RuntimeError as err:
+            errors.append(err)
+
+    try:
+        assert run_threads([probe]) == 0
+    finally:
+        fake.unlock()
+    assert errors
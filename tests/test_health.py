@@ -0,0 +1,35 @@
+# SPDX-FileCopyrightText: Copyright (c) 2023 Pat Satyshur
+#
+# SPDX-License-Identifier: MIT
+
+"""Tests for restoring the registers of a reset device."""
+
+# pylint: disable=missing-function-docstring, protected-access
+
+from i2c_expanders.health import HealthMonitor
+from i2c_expanders.PCA9555 import PCA9555
+
+
+def test_reset_device_is_restored(bus, monkeypatch):
+    expander = PCA9555(bus, 0x20)
+    pin = expander.get_pin(3)
+    pin.switch_to_output(value=False)
+    monitor = HealthMonitor(expander)
+
+    # A power glitch puts the registers back to their defaults.
+    registers = bus.registers(0x20)
+    registers[expander._output_reg] = 0xFF
+    registers[expander._iodir_reg] = 0xFF
+    written = []
+    writeto = bus.writeto
+
+    def record(address, buffer, **kwargs):
+        written.append(buffer[0])
+        writeto(address, buffer, **kwargs)
+
+    monkeypatch.setattr(bus, "writeto", record)
+    assert monitor.check()
+    # The output is set before the pin is made an output again.
+    assert written[-1] == expander._iodir_reg
+    assert not registers[expander._output_reg] & 0x08
+    assert not registers[expander._iodir_reg] & 0x08
@@ -0,0 +1,89 @@
+# SPDX-FileCopyrightText: Copyright (c) 2023 Pat Satyshur
+#
+# SPDX-License-Identifier: MIT
+
+"""Tests for the expander base class."""
+
+# pylint: disable=missing-function-docstring, protected-access, redefined-outer-name
+
+import pytest
+
+from i2c_expanders.i2c_expander import I2c_Expander
+from i2c_expanders.PCA9554 import PCA9554
+from i2c_expanders.PCA9555 import PCA9555
+
+
+def test_threads_share_one_expander(bus, run_threads):
+    expander = PCA9555(bus, 0x20)
+    expander.enable_locking()
+
+    def work(value):
+        def run():
+            for _ in range(500):
+                with expander:
+                    with expander:
+                        expander.gpio = value
+                        assert expander._read_port(expander._output_reg) == value
+                    expander.gpio  # pylint: disable=pointless-statement
+
+        return run
+
+    assert run_threads([work(value) for value in (0x1111, 0x2222, 0x4444, 0x8888)]) == 0
+    # The hold is given back by every thread.
+    assert expander._hold_count == 0
+    assert expander._owner is None
+
+
+def test_shared_buffer(bus, run_threads, monkeypatch):
+    monkeypatch.setattr(I2c_Expander, "share_buffers", True)
+    monkeypatch.setattr(I2c_Expander, "_shared_buffers", {})
+    bus.add_device(0x22, block=1)
+    wide = PCA9555(bus, 0x20)
+    narrow = PCA9554(bus, 0x22)
+    assert wide._buffer is narrow._buffer
+
+    def work(expander, value):
+        def run():
+            for _ in range(500):
+                expander.gpio = value
+                assert expander._read_port(expander._output_reg) == value
+
+        return run
+
+    assert run_threads([work(wide, 0x1234), work(narrow, 0x56)]) == 0
+
+
+def test_pin_write_uses_shadow(bus):
+    expander = PCA9555(bus, 0x20)
+    expander.enable_shadow()
+    pin = expander.get_pin(3)
+    pin.switch_to_output(value=False)
+    before = bus.transfers
+    pin.value = True
+    # One write, no read of the output register first.
+    assert bus.transfers - before == 1
+    assert bus.registers(0x20)[expander._output_reg] & 0x08
+
+
+def test_failed_write_keeps_shadow(bus):
+    expander = PCA9555(bus, 0x20)
+    expander.enable_shadow()
+    expander.gpio = 0x00F0
+    shadow = dict(expander.shadow)
+    bus.remove_device(0x20)
+    with pytest.raises(OSError):
+        expander.gpio = 0x1234
+    assert expander.shadow == shadow
+
+
+def test_software_interrupts(bus):
+    expander = PCA9555(bus, 0x20)
+    assert expander.irq_mask == 0xFFFF
+    registers = bus.registers(0x20)
+    expander.set_int_pin(9)
+    registers[1] = 0x02
+    assert expander.get_int_pins() == [9]
+    assert expander.get_interrupts() == [{"pin": 9, "value": True}]
+    assert expander.get_interrupts() is None
+    with pytest.raises(ValueError):
+        expander.set_int_pin(0, latch=True)
@@ -0,0 +1,31 @@
+# SPDX-FileCopyrightText: Copyright (c) 2023 Pat Satyshur
+#
+# SPDX-License-Identifier: MIT
+
+"""Tests for the key event queue."""
+
+# pylint: disable=missing-function-docstring, protected-access
+
+from i2c_expanders.keys import Event, EventQueue
+
+
+def test_queue_order_and_overflow():
+    queue = EventQueue(2)
+    queue._record(1, True, 0)
+    queue._record(2, False, 1)
+    queue._record(3, True, 2)
+    assert queue.overflowed
+    assert len(queue) == 2
+    assert queue.get() == Event(1, True)
+    assert queue.get() == Event(2, False)
+    assert queue.get() is None
+
+
+def test_clear_resets_overflow():
+    queue = EventQueue(1)
+    queue._record(1, True, 0)
+    queue._record(2, True, 1)
+    assert queue.overflowed
+    queue.clear()
+    assert not queue
+    assert not queue.overflowed
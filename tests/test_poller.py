@@ -0,0 +1,71 @@
+# SPDX-FileCopyrightText: Copyright (c) 2023 Pat Satyshur
+#
+# SPDX-License-Identifier: MIT
+
+"""Tests for the pollers."""
+
+# pylint: disable=missing-function-docstring
+
+import time
+
+import pytest
+
+from i2c_expanders.PCA9555 import PCA9555
+from i2c_expanders.poller import AdaptivePoller, MultiBusPoller
+
+
+def test_poll_survives_errors(bus):
+    first = PCA9555(bus, 0x20)
+    second = PCA9555(bus, 0x21)
+    with MultiBusPoller({"bus": [first, second]}) as poller:
+        bus.remove_device(0x20)
+        snapshot = poller.poll()
+        assert first in snapshot.errors
+        assert second in snapshot.values
+        assert poller.failures == 1
+        assert poller.error is snapshot.errors[first]
+
+        # The error is the last one of the cycle.
+        bus.remove_device(0x21)
+        snapshot = poller.poll()
+        assert poller.error is snapshot.errors[second]
+        assert poller.failures == 3
+
+
+def test_run_survives_callback(bus):
+    expander = PCA9555(bus, 0x20)
+    calls = []
+
+    def callback(snapshot):
+        calls.append(snapshot)
+        raise ValueError("callback failed")
+
+    with MultiBusPoller({"bus": [expander]}) as poller:
+        poller.start(0.001, callback)
+        time.sleep(0.1)
+        poller.stop()
+    assert len(calls) > 2
+    assert isinstance(poller.error, ValueError)
+
+
+def test_adaptive_skips_failures(bus):
+    first = PCA9555(bus, 0x20)
+    second = PCA9555(bus, 0x21)
+    poller = AdaptivePoller([first, second], min_rate=1000, max_rate=1000)
+    bus.remove_device(0x20)
+    assert not poller.update()
+    assert poller.failures == 1
+    assert isinstance(poller.error, OSError)
+    assert poller.values[second] == 0
+
+    time.sleep(0.002)
+    bus.registers(0x21)[0] = 0x05
+    assert poller.update() == [(second, 0x05)]
+
+
+def test_adaptive_starts_at_min(bus):
+    expander = PCA9555(bus, 0x20)
+    poller = AdaptivePoller([expander], min_rate=10, max_rate=1000)
+    poller.update()
+    assert poller.rate(expander) == pytest.approx(10)
+    assert AdaptivePoller([]).next_deadline is None
@@ -0,0 +1,55 @@
+# SPDX-FileCopyrightText: Copyright (c) 2023 Pat Satyshur
+#
+# SPDX-License-Identifier: MIT
+
+"""Tests for the timed output changes."""
+
+# pylint: disable=missing-function-docstring, protected-access
+
+import time
+
+import pytest
+
+from i2c_expanders.PCA9555 import PCA9555
+from i2c_expanders.scheduler import Scheduler
+
+
+def test_changes_share_a_write(bus):
+    expander = PCA9555(bus, 0x20)
+    pins = [expander.get_pin(pin) for pin in range(2)]
+    for pin in pins:
+        pin.switch_to_output(value=False)
+    scheduler = Scheduler()
+    now = time.monotonic_ns()
+    for pin in pins:
+        scheduler.set_at(pin, True, now)
+    before = bus.transfers
+    assert scheduler.update() == 1
+    # No read of the output register before the write.
+    assert bus.transfers - before == 1
+    assert expander._read_port(expander._output_reg) & 0x03 == 0x03
+
+
+def test_failed_write_is_retried(bus):
+    first = PCA9555(bus, 0x20)
+    second = PCA9555(bus, 0x21)
+    pin1 = first.get_pin(0)
+    pin2 = second.get_pin(0)
+    pin1.switch_to_output(value=False)
+    pin2.switch_to_output(value=False)
+    scheduler = Scheduler()
+    now = time.monotonic_ns()
+    scheduler.set_at(pin1, True, now)
+    scheduler.set_at(pin2, True, now + 1)
+
+    bus.remove_device(0x21)
+    with pytest.raises(OSError):
+        scheduler.update()
+    # The change that was made is gone, the one that failed is still there.
+    assert len(scheduler) == 1
+    assert scheduler.edges == 1
+
+    registers = bus.add_device(0x21)
+    assert scheduler.update() == 1
+    assert not scheduler
+    assert registers[second._output_reg] & 0x01
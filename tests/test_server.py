@@ -0,0 +1,33 @@
+# SPDX-FileCopyrightText: Copyright (c) 2023 Pat Satyshur
+#
+# SPDX-License-Identifier: MIT
+
+"""Tests for the request handling of the expander server."""
+
+# pylint: disable=missing-function-docstring, redefined-outer-name
+
+import json
+
+import pytest
+
+from i2c_expanders.PCA9555 import PCA9555
+from i2c_expanders.server import ExpanderServer
+
+
+@pytest.fixture
+def server(bus, tmp_path):
+    with ExpanderServer(
+        str(tmp_path / "expanders.sock"), {"io": PCA9555(bus, 0x20)}
+    ) as srv:
+        yield srv
+
+
+def test_request(server):
+    reply = json.loads(server.handle_request(b'{"id": 7, "ops": [["read", "io", 0]]}'))
+    assert reply == {"id": 7, "results": [0]}
+
+
+@pytest.mark.parametrize("line", [b"[1, 2]", b"3", b"null", b'"ops"', b"not json"])
+def test_bad_request_gets_an_error(server, line):
+    reply = json.loads(server.handle_request(line))
+    assert reply["error"] == "ValueError"
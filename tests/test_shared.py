@@ -0,0 +1,38 @@
+# SPDX-FileCopyrightText: Copyright (c) 2023 Pat Satyshur
+#
+# SPDX-License-Identifier: MIT
+
+"""Tests for sharing the inputs through a file."""
+
+# pylint: disable=missing-function-docstring
+
+from i2c_expanders.PCA9555 import PCA9555
+from i2c_expanders.shared import Publisher, Reader, StaleValue
+
+
+def test_values_are_marked_stale(bus, tmp_path):
+    path = str(tmp_path / "inputs")
+    with Publisher(
+        path, {"a": PCA9555(bus, 0x20), "b": PCA9555(bus, 0x21)}
+    ) as publisher:
+        with Reader(path) as reader:
+            assert reader.read() is None
+            assert reader.age("a") is None
+
+            bus.registers(0x20)[0] = 0x12
+            publisher.poll()
+            snapshot = reader.read()
+            assert snapshot.values == {"a": 0x12, "b": 0}
+            assert not snapshot.errors
+
+            bus.remove_device(0x20)
+            publisher.poll()
+            publisher.poll()
+            snapshot = reader.read()
+            # The last value is kept, and marked with its age.
+            assert snapshot.values["a"] == 0x12
+            assert isinstance(snapshot.errors["a"], StaleValue)
+            assert snapshot.errors["a"].age == 2
+            assert reader.age("a") == 2
+            assert reader.age("b") == 0
+            assert publisher.failures == 2
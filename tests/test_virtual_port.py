@@ -0,0 +1,58 @@
+# SPDX-FileCopyrightText: Copyright (c) 2023 Pat Satyshur
+#
+# SPDX-License-Identifier: MIT
+
+"""Tests for ports made of pins from several expanders."""
+
+# pylint: disable=missing-function-docstring, protected-access
+
+from i2c_expanders.PCA9555 import PCA9555
+from i2c_expanders.transport import FakeI2CBus
+from i2c_expanders.virtual_port import VirtualPort
+
+
+def test_write_and_read(bus):
+    first = PCA9555(bus, 0x20)
+    second = PCA9555(bus, 0x21)
+    port = VirtualPort((first, second))
+    port.switch_to_output()
+    port.value = 0x12345678
+    assert first._read_port(first._output_reg) == 0x5678
+    assert second._read_port(second._output_reg) == 0x1234
+    bus.registers(0x20)[0:2] = b"\x21\x43"
+    bus.registers(0x21)[0:2] = b"\x65\x87"
+    assert port.value == 0x87654321
+
+
+def test_opposite_orders(run_threads):
+    # Two ports with the same expanders in the opposite order, on two buses, used from
+    # several threads at once, together with plain writes to the expanders.
+    bus1 = FakeI2CBus()
+    bus2 = FakeI2CBus()
+    bus1.add_device(0x20)
+    bus2.add_device(0x21)
+    bus1.add_device(0x22)
+    expanders = (PCA9555(bus1, 0x20), PCA9555(bus2, 0x21), PCA9555(bus1, 0x22))
+    for expander in expanders:
+        expander.enable_locking()
+    forward = VirtualPort(expanders)
+    backward = VirtualPort(tuple(reversed(expanders)))
+
+    def use_port(port):
+        def run():
+            for value in range(500):
+                port.write(value)
+                port.read()
+
+        return run
+
+    def use_expander(expander):
+        def run():
+            for value in range(500):
+                expander.gpio = value
+
+        return run
+
+    targets = [use_port(forward), use_port(backward)] * 2
+    targets += [use_expander(expander) for expander in expanders]
+    assert run_threads(targets) == 0